@@ -34,6 +34,6 @@ class TeamViewSet(viewsets.ReadOnlyModelViewSet):
         except (FieldError, TypeError) as e:
             log.warning("TeamViewSet: Failed processing api request %s", repr(e))
             return Response(
-                {{"error": "TeamViewSet: Failed processing api request"}},
+                {"error": "TeamViewSet: Failed processing api request"},
                 status=status.HTTP_400_BAD_REQUEST,
             )
@@ -3,6 +3,7 @@ Django settings for Athletes project.
 """
 
 import os
+import sys
 from datetime import timedelta
 import requests
 
@@ -37,6 +38,8 @@ def get_env_var(name: str, default: str = "") -> str:
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
+TESTING = sys.argv[1:2] == ["test"]
+
 
 # SECURITY WARNING: keep the secret key used in production secret!
 SECRET_KEY = get_env_var(
@@ -132,7 +135,8 @@ DATABASES = {
 CACHES = {
     "default": {
         "BACKEND": "django_redis.cache.RedisCache",
-        "LOCATION": "redis://localhost:6379/9",
+        # Tests don't touch the cache, queues and rate limits of the site.
+        "LOCATION": f"redis://localhost:6379/{10 if TESTING else 9}",
         "OPTIONS": {
             "CLIENT_CLASS": "django_redis.client.DefaultClient",
         },
@@ -275,6 +279,17 @@ DUEDIL_API_KEY = get_env_var("DUEDIL_API_KEY")
 
 NEWSAPI_API_KEY = get_env_var("NEWSAPI_API_KEY")
 
+# Shared API rate limits, {provider: (requests, period in seconds)}
+RATE_LIMITS = {
+    "twitter": (60, 60),
+    "youtube": (100, 60),
+    "alphavantage": (5, 60),
+    "newsapi": (100, 24 * 60 * 60),
+}
+
+# Get Wiki, geocoding and Youtube data in save() instead of Celery workers.
+ENRICHMENT_SYNC = TESTING or bool(get_env_var("ENRICHMENT_SYNC"))
+
 DJSTRIPE_FOREIGN_KEY_TO_FIELD = "djstripe_id"
 DJSTRIPE_USE_NATIVE_JSONFIELD = True
 
@@ -12,6 +12,7 @@ from core.models import (
     LeaguesList,
     Profile,
     TeamArticle,
+    update_from_wiki,
 )
 
 AthleteForm = select2_modelform(Athlete)
@@ -50,9 +51,7 @@ class DomesticMarketListFilter(admin.SimpleListFilter):
 
 def update_data_from_wiki(_, __, queryset):
     """Update information for selected athletes with data from Wikipedia."""
-    for obj in queryset:
-        obj.get_data_from_wiki()
-        obj.save()
+    update_from_wiki(list(queryset))
 
 
 update_data_from_wiki.short_description = "Update data from Wikipedia"
@@ -0,0 +1,85 @@
+"""Autocomplete suggestions for athletes, teams and leagues."""
+
+import hashlib
+import json
+import time
+
+from django.contrib.postgres.search import TrigramDistance
+from django.core.cache import cache
+
+from core.constans import CATEGORIES, COUNTRIES
+from core.resolver import match_categories, match_countries
+
+LIMIT = 5
+MAX_DISTANCE = 0.9  # similarity > 0.1
+CACHE_TIMEOUT = 60
+VERSION_KEY = "autocomplete_version_{}"
+
+
+def invalidate_autocomplete(model_name):
+    """Drop cached suggestions of the model (cache keys contain the version)."""
+    cache.set(VERSION_KEY.format(model_name), time.time_ns(), None)
+
+
+def _get_similar(model, field, search, limit):
+    """[(distance, value)] of the closest values, served by the trigram index."""
+    return list(
+        model.objects.annotate(distance=TrigramDistance(field, search))
+        .filter(distance__lt=MAX_DISTANCE)
+        .order_by("distance")
+        # The same value can be in many rows (team of athletes).
+        .values_list("distance", field)[: limit * 4]
+    )
+
+
+def _find(model, fields, search, limit):
+    """The most similar values of the fields."""
+    found = []
+    for field in fields:
+        found += _get_similar(model, field, search, limit)
+
+    found.sort(key=lambda row: row[0])
+
+    return list(dict.fromkeys(value for _, value in found))[:limit]
+
+
+def autocomplete(model, search, fields, limit=LIMIT):
+    """Suggestions for the search, cached for a short time."""
+    model_name = model._meta.model_name
+    version = cache.get(VERSION_KEY.format(model_name), 0)
+    params = hashlib.md5(json.dumps([fields, search]).encode()).hexdigest()
+    key = f"autocomplete_{model_name}_{version}_{params}"
+
+    result = cache.get(key)
+    if result is not None:
+        return result
+
+    result = []
+
+    # Search for similar name in database.
+    if (not fields and model_name == "athlete") or (
+        "name" in fields and "team" in fields
+    ):
+        # Search in name and team fields (2 fields).
+        result += _find(model, ("name", "team"), search, limit)
+    elif "name" in fields or "team" in fields:
+        # Search in name or team fields (1 field).
+        field = "name" if "name" in fields else "team"
+        result += _find(model, (field,), search, limit)
+
+    # Check categories.
+    if not fields or "category" in fields:
+        result += [CATEGORIES[key] for key in match_categories(search)[:limit]]
+
+    # Check countries.
+    if not fields or "country" in fields:
+        result += [COUNTRIES[code] for code in match_countries(search)[:limit]]
+
+    # Check genders.
+    if not fields or "gender" in fields:
+        result += [val for val in ("male", "female") if search.lower() in val]
+
+    result = list(dict.fromkeys(result))
+    cache.set(key, result, CACHE_TIMEOUT)
+
+    return result
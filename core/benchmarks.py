@@ -0,0 +1,126 @@
+"""Saved wiki pages with expected parsing results, for benchmarks and tests."""
+
+import contextlib
+import json
+import os
+
+import requests
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from requests.adapters import BaseAdapter
+
+from core import http_client
+from core.models import Athlete, League, Team, WikiPage
+from core.parsers import get_soup
+from core.tasks import get_roster_links
+
+CORPUS_DIR = os.path.join(os.path.dirname(__file__), "tests", "fixtures", "wiki")
+
+# {parser: (model, fields which are compared besides additional_info)}
+MODELS = {
+    "athlete": (
+        Athlete,
+        (
+            "name",
+            "birthday",
+            "team",
+            "category",
+            "domestic_market",
+            "location_market",
+            "international",
+            "photo",
+        ),
+    ),
+    "team": (Team, ("photo",)),
+    "league": (League, ("name", "photo")),
+}
+
+
+class PageAdapter(BaseAdapter):
+    """Serve the saved page for its url, other requests fail."""
+
+    def __init__(self, url, content):
+        super().__init__()
+        self.url = url
+        self.content = content
+
+    def send(self, request, **kwargs):
+        if request.method != "GET" or request.url != self.url:
+            raise requests.ConnectionError("HTTP is stubbed", request=request)
+
+        res = requests.Response()
+        res.status_code = 200
+        res.url = request.url
+        res.request = request
+        res._content = self.content
+        return res
+
+    def close(self):
+        pass
+
+
+@contextlib.contextmanager
+def serve_page(url, content):
+    """The shared HTTP session gets only the page while in the context."""
+    session = http_client.get_session()
+    adapters = dict(session.adapters)
+    adapter = PageAdapter(url, content)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    try:
+        yield
+    finally:
+        for prefix, adapter in adapters.items():
+            session.mount(prefix, adapter)
+
+
+def load_page(name):
+    """Content of the saved page."""
+    with open(os.path.join(CORPUS_DIR, name), "rb") as f:
+        return f.read()
+
+
+def load_corpus():
+    """Corpus entries (see corpus.json) with loaded page content."""
+    with open(os.path.join(CORPUS_DIR, "corpus.json"), encoding="utf-8") as f:
+        corpus = json.load(f)
+
+    for entry in corpus:
+        entry["content"] = load_page(entry["page"])
+
+    return corpus
+
+
+def _parse(entry):
+    if entry["parser"] == "roster":
+        # Not conditional: saved links of the page mustn't replace parsing.
+        _, html = WikiPage.fetch(entry["url"], conditional=False)
+        links = get_roster_links(
+            get_soup(html.content), entry["url"], entry.get("category")
+        )
+        return None if links is None else {"links": links}
+
+    model, fields = MODELS[entry["parser"]]
+    # Unsaved objects fetch their page unconditionally too.
+    obj = model(wiki=entry["url"], category=entry.get("category", ""))
+    if model is Team:
+        obj.league = League()  # don't create the league
+
+    if obj.get_data_from_wiki() is None:
+        return None
+
+    data = {field: getattr(obj, field) for field in (*fields, "additional_info")}
+    return json.loads(json.dumps(data, cls=DjangoJSONEncoder))
+
+
+def parse_page(entry):
+    """
+    Data which the entry parser gets from the page, None if it's skipped.
+
+    The page is served by the HTTP session, saved rows are rolled back.
+    """
+    with serve_page(entry["url"], entry["content"]), transaction.atomic():
+        try:
+            return _parse(entry)
+        finally:
+            transaction.set_rollback(True)
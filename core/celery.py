@@ -23,6 +23,11 @@ app.conf.beat_schedule = {
         "schedule": crontab(hour=3, minute=0, day_of_week=0),
         "args": (),
     },
+    "every-sunday-2": {
+        "task": "core.tasks.weekly_country_stats_rebuild",
+        "schedule": crontab(hour=5, minute=0, day_of_week=0),
+        "args": (),
+    },
     "every-monday-1": {
         "task": "core.tasks.weekly_athletes_youtube_update",
         "schedule": crontab(hour=3, minute=0, day_of_week=1),
@@ -78,4 +83,9 @@ app.conf.beat_schedule = {
         "schedule": 60.0,
         "args": (),
     },
+    "every-minute-2": {
+        "task": "core.tasks.every_minute_enrichment",
+        "schedule": 60.0,
+        "args": (),
+    },
 }
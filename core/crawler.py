@@ -0,0 +1,62 @@
+import logging
+import threading
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from django.db import connections
+
+from core import http_client
+
+log = logging.getLogger("athletes")
+
+MAX_WORKERS = 8  # pages processed in parallel
+MAX_PER_HOST = 4  # parallel requests to the same host
+
+
+class HostLimiter:
+    """Limit the number of parallel requests to the same host."""
+
+    def __init__(self, limit=MAX_PER_HOST):
+        self.limit = limit
+        self._lock = threading.Lock()
+        self._semaphores = {}
+
+    def __call__(self, url):
+        host = urllib.parse.urlparse(url).hostname
+
+        with self._lock:
+            if host not in self._semaphores:
+                self._semaphores[host] = threading.BoundedSemaphore(self.limit)
+
+            return self._semaphores[host]
+
+
+def crawl(urls, callback, max_workers=MAX_WORKERS, max_per_host=MAX_PER_HOST):
+    """
+    Fetch urls concurrently and process every response with the callback.
+
+    The callback gets (url, response) and runs in a worker thread, response is
+    None if the request failed. Returns {url: callback result} in urls order.
+    """
+    limiter = HostLimiter(max_per_host)
+
+    def worker(url):
+        try:
+            try:
+                with limiter(url):
+                    response = http_client.get(url)
+            except requests.exceptions.RequestException as e:
+                log.warning("%s: Failed fetching %s", repr(e), url)
+                response = None
+
+            return callback(url, response)
+        except Exception as e:  # pylint: disable=broad-except
+            log.exception("%s: Failed processing %s", repr(e), url)
+            return None
+        finally:
+            # Worker threads must not leak database connections.
+            connections.close_all()
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return dict(zip(urls, executor.map(worker, urls)))
@@ -34,10 +34,8 @@ class TeamForm(forms.ModelForm):
             "additional_info",
             "twitter_info",
             "youtube_info",
-            "wiki_views_info",
             "stock_info",
             "company_info",
-            "site_views_info",
         )
 
 
@@ -60,8 +58,6 @@ class LeagueForm(forms.ModelForm):
             "additional_info",
             "twitter_info",
             "youtube_info",
-            "wiki_views_info",
-            "site_views_info",
         )
 
 
@@ -0,0 +1,114 @@
+"""
+Shared HTTP client for all external integrations.
+
+All requests go through one session per process, so connections to the same
+host are kept alive and reused (urllib3 keeps a connection pool per host).
+Requests have default timeouts and are retried with backoff on 429 and 5xx.
+"""
+
+import logging
+import threading
+import time
+import urllib.parse
+from collections import defaultdict
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+log = logging.getLogger("athletes")
+
+TIMEOUT = (5, 30)  # connect and read timeouts in seconds
+POOL_CONNECTIONS = 20  # amount of hosts to keep pools for
+POOL_MAXSIZE = 10  # connections kept alive per host
+RETRY = Retry(
+    total=3,
+    backoff_factor=0.5,
+    status_forcelist=(429, 500, 502, 503, 504),
+    raise_on_status=False,
+)
+
+PROVIDERS = {
+    "en.wikipedia.org": "wikipedia",
+    "wikimedia.org": "wikimedia",
+    "maps.googleapis.com": "geocoding",
+    "www.googleapis.com": "youtube",
+    "awis.amazonaws.com": "awis",
+    "www.alphavantage.co": "alphavantage",
+    "duedil.io": "duedil",
+    "newsapi.org": "newsapi",
+    "api.twitter.com": "twitter",
+}
+
+_session = None
+_lock = threading.Lock()
+_metrics = defaultdict(
+    lambda: {"requests": 0, "errors": 0, "failures": 0, "seconds": 0.0}
+)
+
+
+def get_session():
+    """Get (create if needed) the shared session."""
+    global _session  # pylint: disable=global-statement
+
+    with _lock:
+        if _session is None:
+            adapter = HTTPAdapter(
+                pool_connections=POOL_CONNECTIONS,
+                pool_maxsize=POOL_MAXSIZE,
+                max_retries=RETRY,
+            )
+            _session = requests.Session()
+            _session.mount("https://", adapter)
+            _session.mount("http://", adapter)
+
+        return _session
+
+
+def get_provider(url):
+    """Get provider name by url host."""
+    host = urllib.parse.urlparse(url).hostname or ""
+    return PROVIDERS.get(host, host)
+
+
+def get_metrics(reset=False):
+    """Get requests statistic per provider (and start it over)."""
+    with _lock:
+        metrics = {provider: data.copy() for provider, data in _metrics.items()}
+        if reset:
+            _metrics.clear()
+
+        return metrics
+
+
+def request(method, url, provider=None, **kwargs):
+    """Send a request with the shared session."""
+    provider = provider or get_provider(url)
+    kwargs.setdefault("timeout", TIMEOUT)
+    start = time.monotonic()
+
+    try:
+        res = get_session().request(method, url, **kwargs)
+    except requests.exceptions.RequestException as e:
+        with _lock:
+            _metrics[provider]["requests"] += 1
+            _metrics[provider]["failures"] += 1
+            _metrics[provider]["seconds"] += time.monotonic() - start
+        # Don't log query string, it can contain api keys.
+        log.warning("%s: %s request failed (%s)", repr(e), provider, url.split("?")[0])
+        raise
+
+    with _lock:
+        _metrics[provider]["requests"] += 1
+        _metrics[provider]["errors"] += res.status_code >= 400
+        _metrics[provider]["seconds"] += time.monotonic() - start
+
+    return res
+
+
+def get(url, provider=None, **kwargs):
+    return request("GET", url, provider=provider, **kwargs)
+
+
+def post(url, data=None, provider=None, **kwargs):
+    return request("POST", url, provider=provider, data=data, **kwargs)
@@ -0,0 +1,166 @@
+import time
+import tracemalloc
+
+from bs4 import BeautifulSoup
+from django.core.management import BaseCommand, CommandError
+
+from core.benchmarks import load_corpus, load_page, parse_page
+from core.constans import COUNTRIES
+from core.models import Athlete, League, Team
+from core.parsers import INFOBOX, PARSER, get_soup
+from core.resolver import match_countries
+from core.views.api import _get_values, _serialize_rows
+
+PAGE_SIZES = (10, 100, 1000)
+SEARCHES = ("a", "un", "united", "kingdom of great", "xyz", "republic")
+WIKI_PAGES = {"athlete": Athlete, "team": Team, "league": League}
+
+
+def _best_time(func, repeat):
+    """The best time of func calls in seconds."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+
+    return best
+
+
+def _peak_memory(func):
+    """Peak memory allocated by the func call in bytes."""
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark hot code paths on the current database. The parser and wiki "
+        "suites run on hand-trimmed synthetic pages (6-16 KB), their speed and "
+        "memory numbers don't predict production behaviour."
+    )
+
+    suites = ("serializer", "resolver", "parser", "wiki")
+
+    def add_arguments(self, parser):
+        parser.add_argument("suites", nargs="*", help=", ".join(self.suites))
+        parser.add_argument("--repeat", type=int, default=5)
+
+    def handle(self, *args, **options):
+        unknown = set(options["suites"]) - set(self.suites)
+        if unknown:
+            raise CommandError(f"Unknown suites: {', '.join(sorted(unknown))}")
+
+        for suite in options["suites"] or self.suites:
+            self.stdout.write(self.style.MIGRATE_HEADING(f"{suite}:"))
+            getattr(self, f"benchmark_{suite}")(options["repeat"])
+
+    def benchmark_serializer(self, repeat):
+        """Datatables page of athletes and teams: fetch and serialize."""
+        querysets = (
+            Athlete.objects.defer(
+                "additional_info", "twitter_info", "youtube_info", "search_document"
+            ),
+            Team.objects.defer("additional_info", "youtube_info", "search_document"),
+        )
+
+        for qs in querysets:
+            model = qs.model
+            for size in PAGE_SIZES:
+                rows = list(_get_values(qs.order_by("pk"))[:size])
+                if not rows:
+                    self.stdout.write(f"  {model.__name__}: no rows")
+                    break
+
+                fetch = _best_time(
+                    lambda: list(_get_values(qs.order_by("pk"))[:size]), repeat
+                )
+                serialize = _best_time(lambda: _serialize_rows(model, rows), repeat)
+
+                self.stdout.write(
+                    f"  {model.__name__} {len(rows):>5} rows: "
+                    f"fetch {fetch * 1000:8.2f} ms, "
+                    f"serialize {serialize * 1000:8.2f} ms "
+                    f"({serialize / len(rows) * 1e6:.1f} us/row)"
+                )
+
+    def benchmark_resolver(self, repeat):
+        """Country names matching: linear scan against the resolver."""
+        number = 1000
+
+        def scan():
+            for _ in range(number):
+                for text in SEARCHES:
+                    [code for code, name in COUNTRIES.items() if text in name.lower()]
+
+        def resolve():
+            for _ in range(number):
+                for text in SEARCHES:
+                    match_countries(text)
+
+        calls = number * len(SEARCHES)
+        for name, func in (("linear scan", scan), ("resolver", resolve)):
+            self.stdout.write(
+                f"  {name:>11}: {_best_time(func, repeat) / calls * 1e6:.1f} us/call"
+            )
+
+    def benchmark_parser(self, repeat):
+        """Wiki pages: full html.parser tree against the infobox only."""
+        parsers = {
+            "html.parser full": lambda content: BeautifulSoup(content, "html.parser"),
+            f"{PARSER} infobox": lambda content: get_soup(content, INFOBOX),
+        }
+        if PARSER != "html.parser":
+            parsers[f"{PARSER} full"] = lambda content: BeautifulSoup(content, PARSER)
+
+        for name, model in WIKI_PAGES.items():
+            content = load_page(f"{name}.html")
+            self.stdout.write(f"  {name} ({len(content) // 1024} KB):")
+
+            info = {}
+            for parser, parse in parsers.items():
+                obj = model(wiki=f"https://en.wikipedia.org/wiki/{name}")
+                if model is Team:
+                    obj.league = League()  # don't create the league
+                info[parser] = obj.get_data_from_wiki(parse(content))
+                seconds = _best_time(lambda: parse(content), repeat)
+                memory = _peak_memory(lambda: parse(content))
+
+                self.stdout.write(
+                    f"    {parser:>18}: {seconds * 1000:8.2f} ms, "
+                    f"peak {memory / 2**20:6.2f} MB"
+                )
+
+            if len({repr(val) for val in info.values()}) > 1:
+                self.stdout.write(self.style.ERROR("    parsed data differs"))
+
+    def benchmark_wiki(self, repeat):
+        """Wiki parsers on the saved corpus: speed, memory and correctness."""
+        total_seconds, failed = 0, 0
+
+        # Pages are served by the HTTP session, see parse_page.
+        corpus = load_corpus()
+        for entry in corpus:
+            seconds = _best_time(lambda: parse_page(entry), repeat)
+            memory = _peak_memory(lambda: parse_page(entry))
+            correct = parse_page(entry) == entry["expected"]
+            total_seconds += seconds
+            failed += not correct
+
+            self.stdout.write(
+                f"  {entry['parser']:>7} {entry['page']:<31}: "
+                f"{1 / seconds:7.1f} pages/s, peak {memory / 2**20:6.2f} MB, "
+                + (
+                    self.style.SUCCESS("correct")
+                    if correct
+                    else self.style.ERROR("wrong data")
+                )
+            )
+
+        self.stdout.write(f"  {len(corpus) / total_seconds:.1f} pages/s")
+        if failed:
+            raise CommandError(f"{failed} of {len(corpus)} pages parsed wrong")
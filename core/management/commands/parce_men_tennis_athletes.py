@@ -1,19 +1,19 @@
 import datetime
 import logging
 
-import requests
-from bs4 import BeautifulSoup
 from django.core.management import BaseCommand
 
+from core import http_client
 from core.constans import COUNTRIES, COUNTRY_CODE3_TO_CODE2
 from core.models import Athlete
+from core.parsers import get_soup
 
 log = logging.getLogger("athletes")
 
 
 def _parse_tennis(url: str):
-    html = requests.get(url)
-    soup = BeautifulSoup(html.content, "html.parser")
+    html = http_client.get(url)
+    soup = get_soup(html.content)
     card = soup.select_one(".player-profile-hero-overflow")
     first_name = card.select_one(".first-name").string
     last_name = card.select_one(".last-name").string
@@ -22,7 +22,7 @@ def _parse_tennis(url: str):
     log.info("Parsing %s (%s)", name, url)
 
     wiki_url = f"https://en.wikipedia.org/w/api.php?action=opensearch&search={name}"
-    res = requests.get(wiki_url)
+    res = http_client.get(wiki_url)
     if res.status_code == 200:
         data = res.json()
 
@@ -50,48 +50,35 @@ def _parse_tennis(url: str):
         else:
             defaults = {}
 
-        try:
-            athlete, created = Athlete.objects.get_or_create(
-                wiki=wiki, defaults=defaults
-            )
-            if not created:
-                log.warning("Skip athlete %s with wiki %s (already exists)", name, wiki)
-                return None
-        except ValueError:
-            log.warning("Failed to parse wiki info for %s", name)
-            return None
-
-        athlete.name = name
-
-        athlete.category = "Tennis"
-        athlete.gender = "male"
-        athlete.additional_info["Data source"] = url
+        defaults["category"] = "Tennis"
+        defaults["gender"] = "male"
+        additional_info = {"Data source": url}
 
         location_market = market_row.select_one("td:nth-of-type(2) div:nth-of-type(3)")
         if location_market and location_market.string:
             location_market = location_market.string.strip()
-            geo_data = athlete.geocode(location_market)
+            geo_data = Athlete.geocode(location_market)
             if geo_data["results"]:
                 for component in geo_data["results"][0]["address_components"]:
                     if (
                         "country" in component["types"]
                         and component["short_name"] in COUNTRIES
                     ):
-                        athlete.location_market = component["short_name"]
+                        defaults["location_market"] = component["short_name"]
 
         country_code = card.select_one(".player-flag-code").string
-        athlete.domestic_market = COUNTRY_CODE3_TO_CODE2[country_code]
-
-        if birthday:
-            athlete.birthday = birthday
+        defaults["domestic_market"] = COUNTRY_CODE3_TO_CODE2[country_code]
 
-        athlete.additional_info["ranking"] = card.select_one(
+        additional_info["ranking"] = card.select_one(
             ".player-ranking-position .data-number"
         ).string.strip()
 
-        athlete.save()
-    else:
-        log.warning("Failed getting wiki info for %s", name)
+        defaults["additional_info"] = additional_info
+
+        # Name and the rest of data are taken from Wiki.
+        return wiki, defaults
+
+    log.warning("Failed getting wiki info for %s", name)
 
     return None
 
@@ -118,16 +105,19 @@ class Command(BaseCommand):
 
             url = f"{site}/en/rankings/{rankings_type}/?rankRange={start}-{end}"
 
-            html = requests.get(url)
-            soup = BeautifulSoup(html.content, "html.parser")
+            html = http_client.get(url)
+            soup = get_soup(html.content)
             links = soup.select(".player-cell > a")
 
             if links:
+                records = []
                 for link in links:
                     if not Athlete.objects.filter(name__icontains=link.string).exists():
-                        _parse_tennis(site + link["href"])
+                        records.append(_parse_tennis(site + link["href"]))
                     else:
                         log.info("Skip %s", link.string)
+
+                Athlete.bulk_upsert(filter(None, records))
             else:
                 break
 
@@ -0,0 +1,195 @@
+# Generated by Django 5.1.6 on 2026-10-17 18:44
+
+from django.db import migrations, models
+
+BATCH_SIZE = 500
+# JSON fields (with history) of each model.
+FIELDS = {
+    "league": ("twitter_info", "youtube_info", "wiki_views_info", "site_views_info"),
+    "team": (
+        "twitter_info",
+        "youtube_info",
+        "wiki_views_info",
+        "site_views_info",
+        "stock_info",
+        "company_info",
+    ),
+    "athlete": ("twitter_info", "youtube_info", "wiki_views_info", "site_views_info"),
+}
+YOUTUBE_KEYS = ("commentCount", "subscriberCount", "videoCount", "viewCount")
+
+
+def _to_float(val):
+    try:
+        return float(val)
+    except (TypeError, ValueError):
+        return None
+
+
+def _get_metrics(obj):
+    """Collect {(metric, date): value} from JSON fields of the object."""
+    metrics = {}
+
+    def add(metric, date, value):
+        value = _to_float(value)
+        if value is not None and date:
+            metrics[(metric, str(date)[:10])] = value
+
+    # Twitter and Youtube: history and the current values.
+    for field, prefix, keys in (
+        ("twitter_info", "twitter.", ("followers_count",)),
+        ("youtube_info", "youtube.", YOUTUBE_KEYS),
+    ):
+        info = getattr(obj, field) or {}
+        history = dict(sorted((info.get("history") or {}).items()))
+        if info.get("updated"):
+            history[info["updated"]] = info
+
+        for date, values in history.items():
+            for key in keys:
+                add(prefix + key, date, values.get(key))
+
+    for date, views in (obj.wiki_views_info or {}).items():
+        add("wiki.views", date, views)
+
+    for date, views in (obj.site_views_info or {}).items():
+        for code, value in (views or {}).items():
+            add(f"site_views.{code}", date, value)
+
+    for date, close in (getattr(obj, "stock_info", None) or {}).items():
+        if date != "symbol":
+            add("stock.close", date, close)
+
+    for date, summary in (getattr(obj, "company_info", None) or {}).items():
+        if isinstance(summary, dict):
+            for key, value in summary.items():
+                add(f"company.{key}", date, value)
+
+    return metrics
+
+
+def _strip_history(obj):
+    """Remove history from JSON fields of the object."""
+    obj.twitter_info.pop("history", None)
+    obj.youtube_info.pop("history", None)
+    if hasattr(obj, "stock_info"):
+        obj.stock_info = {k: v for k, v in obj.stock_info.items() if k == "symbol"}
+    if hasattr(obj, "company_info"):
+        obj.company_info = {
+            k: v for k, v in obj.company_info.items() if k in ("companyId", "currency")
+        }
+
+
+def backfill_metrics(apps, schema_editor):
+    """Move statistic history from JSON fields to Metric table."""
+    metric_model = apps.get_model("core", "Metric")
+
+    for model_name, fields in FIELDS.items():
+        model = apps.get_model("core", model_name)
+        qs = model.objects.only("id", *fields).order_by("id")
+        metrics = []
+        objs = []
+
+        for obj in qs.iterator(chunk_size=BATCH_SIZE):
+            for (metric, date), value in _get_metrics(obj).items():
+                metrics.append(
+                    metric_model(
+                        entity_type=model_name,
+                        entity_id=obj.id,
+                        metric=metric,
+                        date=date,
+                        value=value,
+                    )
+                )
+
+            _strip_history(obj)
+            objs.append(obj)
+
+            if len(objs) >= BATCH_SIZE:
+                metric_model.objects.bulk_create(metrics, batch_size=BATCH_SIZE)
+                model.objects.bulk_update(objs, fields, batch_size=BATCH_SIZE)
+                metrics, objs = [], []
+
+        metric_model.objects.bulk_create(metrics, batch_size=BATCH_SIZE)
+        model.objects.bulk_update(objs, fields, batch_size=BATCH_SIZE)
+
+
+def restore_history(apps, schema_editor):
+    """Move statistic history from Metric table back to JSON fields."""
+    metric_model = apps.get_model("core", "Metric")
+
+    for model_name, fields in FIELDS.items():
+        model = apps.get_model("core", model_name)
+        objs = {obj.id: obj for obj in model.objects.only("id", *fields)}
+
+        for obj in objs.values():
+            obj.twitter_info.setdefault("history", {})
+            obj.youtube_info.setdefault("history", {})
+
+        rows = metric_model.objects.filter(entity_type=model_name).values_list(
+            "entity_id", "metric", "date", "value"
+        )
+        for entity_id, metric, date, value in rows.iterator(chunk_size=BATCH_SIZE):
+            obj = objs.get(entity_id)
+            if not obj:
+                continue
+
+            date = str(date)
+            source, key = metric.split(".", 1)
+            if source == "twitter":
+                obj.twitter_info["history"].setdefault(date, {})[key] = int(value)
+            elif source == "youtube":
+                obj.youtube_info["history"].setdefault(date, {})[key] = str(int(value))
+            elif source == "wiki":
+                obj.wiki_views_info[date] = int(value)
+            elif source == "site_views":
+                obj.site_views_info.setdefault(date, {})[key] = value
+            elif source == "stock":
+                obj.stock_info[date] = str(value)
+            elif source == "company":
+                obj.company_info.setdefault(date, {})[key] = value
+
+        model.objects.bulk_update(objs.values(), fields, batch_size=BATCH_SIZE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0054_auto_20201027_0820"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Metric",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "entity_type",
+                    models.CharField(
+                        choices=[
+                            ("league", "League"),
+                            ("team", "Team"),
+                            ("athlete", "Athlete"),
+                        ],
+                        max_length=8,
+                    ),
+                ),
+                ("entity_id", models.PositiveIntegerField()),
+                ("metric", models.CharField(max_length=64)),
+                ("date", models.DateField()),
+                ("value", models.FloatField()),
+            ],
+            options={
+                "unique_together": {("entity_type", "entity_id", "metric", "date")},
+            },
+        ),
+        migrations.RunPython(backfill_metrics, restore_history),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.1.6 on 2026-10-17 18:44
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0055_metric"),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name="athlete",
+            name="site_views_info",
+        ),
+        migrations.RemoveField(
+            model_name="athlete",
+            name="wiki_views_info",
+        ),
+        migrations.RemoveField(
+            model_name="league",
+            name="site_views_info",
+        ),
+        migrations.RemoveField(
+            model_name="league",
+            name="wiki_views_info",
+        ),
+        migrations.RemoveField(
+            model_name="team",
+            name="site_views_info",
+        ),
+        migrations.RemoveField(
+            model_name="team",
+            name="wiki_views_info",
+        ),
+    ]
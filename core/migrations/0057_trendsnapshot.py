@@ -0,0 +1,98 @@
+# Generated by Django 5.1.6 on 2026-10-17 18:55
+
+from django.db import migrations, models
+
+BATCH_SIZE = 500
+
+
+def backfill_snapshots(apps, schema_editor):
+    """Create snapshots from the two latest values of every metric."""
+    Metric = apps.get_model("core", "Metric")
+    TrendSnapshot = apps.get_model("core", "TrendSnapshot")
+
+    rows = (
+        Metric.objects.order_by("entity_type", "entity_id", "metric", "-date")
+        .values_list("entity_type", "entity_id", "metric", "date", "value")
+        .iterator(chunk_size=BATCH_SIZE)
+    )
+
+    snapshots = []
+    snapshot = None
+    for entity_type, entity_id, metric, date, value in rows:
+        key = (entity_type, entity_id, metric)
+        if snapshot and key == (
+            snapshot.entity_type,
+            snapshot.entity_id,
+            snapshot.metric,
+        ):
+            if snapshot.previous is None:
+                snapshot.previous = value
+                snapshot.delta = snapshot.latest - value
+            continue
+
+        snapshot = TrendSnapshot(
+            entity_type=entity_type,
+            entity_id=entity_id,
+            metric=metric,
+            date=date,
+            latest=value,
+        )
+        snapshots.append(snapshot)
+
+        if len(snapshots) > BATCH_SIZE:
+            # Keep the last snapshot, it can get the previous value.
+            TrendSnapshot.objects.bulk_create(snapshots[:-1])
+            snapshots = snapshots[-1:]
+
+    TrendSnapshot.objects.bulk_create(snapshots)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0056_remove_views_info"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TrendSnapshot",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "entity_type",
+                    models.CharField(
+                        choices=[
+                            ("league", "League"),
+                            ("team", "Team"),
+                            ("athlete", "Athlete"),
+                        ],
+                        max_length=8,
+                    ),
+                ),
+                ("entity_id", models.PositiveIntegerField()),
+                ("metric", models.CharField(max_length=64)),
+                ("date", models.DateField()),
+                ("latest", models.FloatField()),
+                ("previous", models.FloatField(blank=True, null=True)),
+                ("delta", models.FloatField(blank=True, null=True)),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["entity_type", "metric", "-delta"],
+                        name="core_trends_entity__c1d058_idx",
+                    )
+                ],
+                "unique_together": {("entity_type", "entity_id", "metric")},
+            },
+        ),
+        migrations.RunPython(backfill_snapshots, migrations.RunPython.noop),
+    ]
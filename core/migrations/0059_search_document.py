@@ -0,0 +1,106 @@
+# Generated by Django 5.1.6 on 2026-10-17 19:15
+
+import unicodedata
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations, models
+
+BATCH_SIZE = 500
+
+
+# Frozen copy of core.search.get_document.
+def get_document(*values):
+    """Lowercase text of the values without accents, empty values are skipped."""
+    words = []
+    for value in dict.fromkeys(values):
+        if value:
+            text = unicodedata.normalize("NFKD", str(value))
+            words.append(
+                "".join(c for c in text if not unicodedata.combining(c)).lower()
+            )
+
+    return " ".join(words)
+
+
+def fill_search_document(apps, schema_editor):
+    Athlete = apps.get_model("core", "Athlete")
+    Team = apps.get_model("core", "Team")
+    # Country names of the migration state.
+    COUNTRIES = dict(Athlete._meta.get_field("domestic_market").choices)
+
+    leagues = dict(
+        Team.objects.filter(league__isnull=False).values_list("id", "league__name")
+    )
+
+    athletes = []
+    fields = (
+        "name",
+        "team",
+        "team_model",
+        "category",
+        "gender",
+        "domestic_market",
+        "location_market",
+    )
+    for athlete in Athlete.objects.only(*fields).iterator(chunk_size=BATCH_SIZE):
+        athlete.search_document = get_document(
+            athlete.name,
+            athlete.team,
+            leagues.get(athlete.team_model_id),
+            athlete.category,
+            athlete.gender,
+            COUNTRIES.get(athlete.domestic_market),
+            COUNTRIES.get(athlete.location_market),
+        )
+        athletes.append(athlete)
+    Athlete.objects.bulk_update(athletes, ["search_document"], batch_size=BATCH_SIZE)
+
+    teams = list(Team.objects.select_related("league"))
+    for team in teams:
+        team.search_document = get_document(
+            team.name,
+            team.league.name if team.league else "",
+            team.category,
+            team.gender,
+            COUNTRIES.get(team.location_market),
+        )
+    Team.objects.bulk_update(teams, ["search_document"], batch_size=BATCH_SIZE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0058_country_stats"),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name="athlete",
+            name="search_document",
+            field=models.TextField(blank=True, default="", editable=False),
+        ),
+        migrations.AddField(
+            model_name="team",
+            name="search_document",
+            field=models.TextField(blank=True, default="", editable=False),
+        ),
+        migrations.RunPython(fill_search_document, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="athlete",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["search_document"],
+                name="athlete_search_document_idx",
+                opclasses=["gin_trgm_ops"],
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="team",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["search_document"],
+                name="team_search_document_idx",
+                opclasses=["gin_trgm_ops"],
+            ),
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.1.6 on 2026-10-17 19:22
+
+import django.contrib.postgres.indexes
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0059_search_document"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="athlete",
+            index=django.contrib.postgres.indexes.GistIndex(
+                fields=["name"],
+                name="athlete_name_trgm_idx",
+                opclasses=["gist_trgm_ops"],
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="athlete",
+            index=django.contrib.postgres.indexes.GistIndex(
+                fields=["team"],
+                name="athlete_team_trgm_idx",
+                opclasses=["gist_trgm_ops"],
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="league",
+            index=django.contrib.postgres.indexes.GistIndex(
+                fields=["name"],
+                name="league_name_trgm_idx",
+                opclasses=["gist_trgm_ops"],
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="team",
+            index=django.contrib.postgres.indexes.GistIndex(
+                fields=["name"], name="team_name_trgm_idx", opclasses=["gist_trgm_ops"]
+            ),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.1.6 on 2026-10-17 19:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0060_autocomplete_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="GeocodeResult",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("address", models.CharField(max_length=255, unique=True)),
+                ("results", models.JSONField(blank=True, default=list)),
+                ("added", models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+    ]
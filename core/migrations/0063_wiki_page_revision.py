@@ -0,0 +1,18 @@
+# Generated by Django 5.1.6 on 2026-10-17 19:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0062_wiki_page"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="wikipage",
+            name="revision",
+            field=models.PositiveBigIntegerField(blank=True, null=True),
+        ),
+    ]
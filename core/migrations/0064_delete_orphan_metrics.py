@@ -0,0 +1,26 @@
+# Generated by Django 5.1.6 on 2026-10-17 21:10
+
+from django.db import migrations
+
+ENTITY_MODELS = ("league", "team", "athlete")
+
+
+def delete_orphans(apps, schema_editor):
+    """Delete statistic and trends of already deleted objects."""
+    for model_name in ENTITY_MODELS:
+        ids = apps.get_model("core", model_name).objects.values("id")
+        for name in ("Metric", "TrendSnapshot"):
+            apps.get_model("core", name).objects.filter(entity_type=model_name).exclude(
+                entity_id__in=ids
+            ).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0063_wiki_page_revision"),
+    ]
+
+    operations = [
+        migrations.RunPython(delete_orphans, migrations.RunPython.noop),
+    ]
@@ -4,21 +4,28 @@ import hmac
 import json
 import logging
 import operator
+import re
+import threading
 import urllib.parse
+from collections import OrderedDict, defaultdict
 
-import requests
 import xmltodict
-from bs4 import BeautifulSoup
 from bs4.element import Tag
 from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.core.cache import cache
+from django.contrib.postgres.indexes import GinIndex, GistIndex
 from django.core.exceptions import ValidationError
 from django.core.validators import MaxValueValidator, URLValidator
-from django.db import models
+from django.db import IntegrityError, connection, models, transaction
+from django.db.models.functions import RowNumber
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
 from django.utils.html import format_html
 from django.utils.translation import gettext_lazy as _
 
+from core import http_client, wikipedia
+from core.autocomplete import invalidate_autocomplete
 from core.constans import (
     CATEGORIES,
     COUNTRIES,
@@ -26,11 +33,19 @@ from core.constans import (
     WIKI_COUNTRIES,
     WIKI_NATIONALITIES,
 )
+from core.page_cache import invalidate_page
+from core.parsers import INFOBOX, get_soup
+from core.queues import ENRICHMENT_QUEUE, TWITTER_QUEUE, WorkQueue
+from core.search import get_document, normalize
+from core.trends import Series
 
 User = get_user_model()
 
 log = logging.getLogger("athletes")
 
+# Revision id in the page config of rendered wiki pages.
+WIKI_REVISION_RE = re.compile(rb'"wgRevisionId":(\d+)')
+
 
 class ModelMixin:
     """Mixin class that has common methods."""
@@ -44,8 +59,14 @@ class ModelMixin:
     additional_info = {}
     twitter_info = {}
     youtube_info = {}
-    wiki_views_info = {}
-    site_views_info = {}
+    location_fields = ()  # filled by geocoding
+
+    # {facet: method}, facets are got in the order
+    ENRICHMENT_METHODS = {
+        "wiki": "get_data_from_wiki",
+        "geocode": "get_location",
+        "youtube": "get_youtube_info",
+    }
 
     @property
     def slug(self):
@@ -75,9 +96,63 @@ class ModelMixin:
             self.photo,
         )
 
+    def get_metrics(self, *metrics, prefix=""):
+        """
+        Get statistic history {date: {metric: value}}, newest first.
+
+        Without metrics - get all metrics which names start with the prefix.
+        """
+        history = {}
+        if not self.pk:
+            return history
+
+        names = {prefix + metric for metric in metrics}
+        rows = self.__dict__.get("_prefetched_metrics")
+        if rows is not None:
+            # Metrics are loaded with Metric.prefetch.
+            rows = [
+                row
+                for row in rows
+                if (row[1] in names if names else row[1].startswith(prefix))
+            ]
+        else:
+            qs = Metric.objects.filter(
+                entity_type=self._meta.model_name, entity_id=self.pk
+            )
+            if names:
+                qs = qs.filter(metric__in=names)
+            else:
+                qs = qs.filter(metric__startswith=prefix)
+
+            rows = qs.order_by("-date").values_list("date", "metric", "value")
+
+        for date, metric, value in rows:
+            history.setdefault(str(date), {})[metric[len(prefix) :]] = value
+
+        return history
+
+    def save_metrics(self, history=None, prefix="", commit=True):
+        """
+        Save statistic history {date: {metric: value}}.
+
+        Metrics of not saved object (or with commit=False) are kept until
+        the object is saved or Metric.save_pending is called.
+        """
+        pending = self.__dict__.setdefault("_pending_metrics", {})
+        for date, values in (history or {}).items():
+            for metric, value in values.items():
+                pending[(str(date)[:10], prefix + metric)] = float(value)
+
+        if commit:
+            Metric.save_pending([self])
+
     @staticmethod
     def geocode(address):
-        """Geocode the address."""
+        """Geocode the address, results (also empty ones) are cached."""
+        results = GeocodeResult.get_results(address)
+        if results is not None:
+            return {"results": results}
+
         log.info("Geocoding %s", address)
 
         geo_data = {"results": []}
@@ -87,52 +162,38 @@ class ModelMixin:
             f"?address={address}"
             f"&key={settings.GEOCODING_API_KEY}"
         )
-        res = requests.get(url)
+        res = http_client.get(url)
         if res.status_code == 200:
             geo_data = res.json()
+            # Errors (e.g. OVER_QUERY_LIMIT) aren't cached.
+            if geo_data.get("status") in ("OK", "ZERO_RESULTS"):
+                GeocodeResult.set_results(address, geo_data["results"])
 
         return geo_data
 
-    def get_wiki_views_info(self):
-        """Get visits from Wiki."""
-        model = self.__class__.__name__
-
-        log.info("Get visits from Wiki for %s %s", model, self.name)
-
-        now = datetime.datetime.now()
-        week_ago = now - datetime.timedelta(weeks=1)
-
-        url = (
-            "https://wikimedia.org/api/rest_v1/metrics/pageviews/per-article"
-            "/en.wikipedia/all-access/all-agents"
-            f"/{self.slug}"
-            "/daily"
-            f"/{str(week_ago)[:10].replace('-', '')}00"
-            f"/{str(now)[:10].replace('-', '')}00"
-        )
-        res = requests.get(url)
-        if res.status_code == 200:
-            wiki_views_info = res.json()
-            if wiki_views_info and wiki_views_info["items"]:
-                for item in wiki_views_info["items"]:
-                    key = "-".join(
-                        [
-                            item["timestamp"][:4],
-                            item["timestamp"][4:6],
-                            item["timestamp"][6:8],
-                        ]
-                    )
-                    self.wiki_views_info[key] = item["views"]
-
-        return self.wiki_views_info
+    def fetch_wiki(self):
+        """(page, response) of the wiki page, see WikiPage.fetch."""
+        # Only data of saved objects is up to date with the last parsed page.
+        return WikiPage.fetch(self.wiki, conditional=bool(self.pk and self.name))
 
     def get_twitter_info(self):
         """Get info from Twitter."""
-        cache.set(
-            f"twitter_update_{self.__class__.__name__}_{self.pk}",
-            "",
-            timeout=24 * 60 * 60,
-        )  # the key will expire in 1 day
+        # every_minute_twitter_update drains the queue with respect to limits
+        WorkQueue(TWITTER_QUEUE).add(f"{self.__class__.__name__}_{self.pk}")
+
+    def get_missing_facets(self):
+        """Enrichment facets which data wasn't got yet."""
+        missing = {
+            "wiki": not self.name,
+            "geocode": not all(getattr(self, f) for f in self.location_fields),
+            "youtube": not self.youtube_info.get("updated"),
+        }
+        return [facet for facet in self.ENRICHMENT_METHODS if missing[facet]]
+
+    def enrich(self, facets):
+        """Get data of the facets from Wiki, Geocoding and Youtube (not saved)."""
+        for facet in facets:
+            getattr(self, self.ENRICHMENT_METHODS[facet])()
 
     def get_youtube_info(self):
         """Get info from Youtube."""
@@ -142,15 +203,7 @@ class ModelMixin:
         historical_keys = ("commentCount", "subscriberCount", "videoCount", "viewCount")
 
         channel_id = self.youtube_info.get("channelId")
-        history = self.youtube_info.get("history", {})
         now = datetime.datetime.now()
-        if self.youtube_info:
-            week_ago = str(now - datetime.timedelta(weeks=1))
-            last_update = self.youtube_info.get("updated", week_ago)
-
-            history[last_update] = {}
-            for key in historical_keys:
-                history[last_update][key] = self.youtube_info.get(key, 0)
 
         if not channel_id:
             urlencoded_name = urllib.parse.quote_plus(self.name)
@@ -164,7 +217,7 @@ class ModelMixin:
                 f"&key={settings.GEOCODING_API_KEY}"
                 f"&q={urlencoded_name}"
             )
-            res = requests.get(url)
+            res = http_client.get(url)
             if res.status_code == 200:
                 youtube_info = res.json()
                 if (
@@ -190,7 +243,7 @@ class ModelMixin:
                 f"&key={settings.GEOCODING_API_KEY}"
                 f"&id={channel_id}"
             )
-            res = requests.get(url)
+            res = http_client.get(url)
             if res.status_code == 200:
                 youtube_info = res.json()
                 if youtube_info and youtube_info["items"]:
@@ -198,7 +251,16 @@ class ModelMixin:
                     self.youtube_info.update(youtube_info["items"][0]["statistics"])
                     self.youtube_info.update(youtube_info["items"][0]["snippet"])
                     self.youtube_info["updated"] = str(now)
-                    self.youtube_info["history"] = history
+                    self.save_metrics(
+                        {
+                            now.date(): {
+                                key: self.youtube_info[key]
+                                for key in historical_keys
+                                if self.youtube_info.get(key) is not None
+                            }
+                        },
+                        prefix="youtube.",
+                    )
                 else:
                     log.info(
                         "Updating youtube info: no data for %s %s", model, self.name
@@ -296,7 +358,7 @@ class ModelMixin:
             "Accept": "application/xml",
         }
 
-        res = requests.get(url, headers=headers)
+        res = http_client.get(url, headers=headers)
 
         if res.status_code == 200:
             views_info = xmltodict.parse(res.content)
@@ -308,7 +370,7 @@ class ModelMixin:
                     ]["aws:Alexa"]["aws:TrafficData"]
                 except KeyError as e:
                     log.info("%s %s: %s", model, self.name, repr(e))
-                    return self.site_views_info
+                    return {}
 
                 items = root.get("aws:UsageStatistics") or {}
                 items = items.get("aws:UsageStatistic") or []
@@ -339,8 +401,8 @@ class ModelMixin:
                         )
 
                 if data["total"]:
-                    key = str(day_ago)[:10]
-                    self.site_views_info[key] = data
+                    self.save_metrics({day_ago.date(): data}, prefix="site_views.")
+                    return data
             else:
                 log.info("No site visits for %s %s", model, self.name)
         else:
@@ -351,198 +413,145 @@ class ModelMixin:
                 res.status_code,
             )
 
-        return self.site_views_info
+        return {}
+
+    def get_series(self, *metrics, prefix="", cast=int):
+        """Statistic history of the metrics as Series."""
+        return Series.from_history(
+            self.get_metrics(*metrics, prefix=prefix), *metrics, cast=cast
+        )
 
     @property
-    def get_youtube_stats(self):
-        """Youtube statistic (subscriberCount, viewCount)."""
-        stats = []
-        if self.youtube_info.get("updated"):
-            history = self.youtube_info.get("history", {})
-            last_update = self.youtube_info["updated"]
-            history[last_update] = {
-                "subscriberCount": self.youtube_info.get("subscriberCount", "0"),
-                "viewCount": self.youtube_info.get("viewCount", "0"),
-            }
+    def youtube_series(self):
+        return self.get_series("subscriberCount", "viewCount", prefix="youtube.")
 
-            dates = sorted(history.keys(), reverse=True)
-            for d in dates:
-                stats.append(
-                    [
-                        d[:10],
-                        [
-                            int(history[d]["subscriberCount"]),
-                            int(history[d]["viewCount"]),
-                        ],
-                    ]
-                )
+    @property
+    def twitter_series(self):
+        return self.get_series("followers_count", prefix="twitter.")
 
-        return stats
+    @property
+    def wiki_series(self):
+        return self.get_series("views", prefix="wiki.")
+
+    @property
+    def get_youtube_stats(self):
+        """Youtube statistic (subscriberCount, viewCount)."""
+        return self.youtube_series.stats()
 
     @property
     def get_youtube_trends(self):
         """Youtube weekly statistic (subscriberCount, viewCount)."""
-        stats = []
-        if self.youtube_info.get("history"):
-            history = self.youtube_info["history"]
-            last_update = self.youtube_info["updated"]
-            history[last_update] = {
-                "subscriberCount": self.youtube_info.get("subscriberCount", "0"),
-                "viewCount": self.youtube_info.get("viewCount", "0"),
-            }
-
-            dates = sorted(history.keys(), reverse=True)
-            for i, d in enumerate(dates[:-1]):
-                stats.append(
-                    [
-                        d[:10],
-                        [
-                            int(history[d]["subscriberCount"])
-                            - int(history[dates[i + 1]]["subscriberCount"]),
-                            int(history[d]["viewCount"])
-                            - int(history[dates[i + 1]]["viewCount"]),
-                        ],
-                    ]
-                )
-
-        return stats
+        return self.youtube_series.deltas()
 
     @property
     def get_twitter_stats(self):
         """Twitter statistic (followers_count)."""
-        stats = []
-        if self.twitter_info.get("updated"):
-            history = self.twitter_info.get("history", {})
-            last_update = self.twitter_info["updated"]
-            history[last_update] = {
-                "followers_count": self.twitter_info.get("followers_count", "0"),
-            }
-
-            dates = sorted(history.keys(), reverse=True)
-            for d in dates:
-                stats.append(
-                    [
-                        d[:10],
-                        [
-                            int(history[d]["followers_count"]),
-                        ],
-                    ]
-                )
-
-        return stats
+        return self.twitter_series.stats()
 
     @property
     def get_twitter_trends(self):
         """Twitter weekly statistic (followers_count)."""
-        stats = []
-        if self.twitter_info.get("history"):
-            history = self.twitter_info["history"]
-            last_update = self.twitter_info["updated"]
-            history[last_update] = {
-                "followers_count": self.twitter_info.get("followers_count", "0"),
-            }
-
-            dates = sorted(history.keys(), reverse=True)
-            for i, d in enumerate(dates[:-1]):
-                stats.append(
-                    [
-                        d[:10],
-                        [
-                            int(history[d]["followers_count"])
-                            - int(history[dates[i + 1]]["followers_count"]),
-                        ],
-                    ]
-                )
-
-        return stats
+        return self.twitter_series.deltas()
 
     @property
     def get_trend_info(self):
         """Get Youtube and Twitter trend info."""
-        info = {
-            "twitter_stats": self.get_twitter_stats,
-            "twitter_trend": 0,
-            "twitter_trend_date": False,
-            "youtube_stats": self.get_youtube_stats,
-            "youtube_trend": 0,
-            "youtube_trend_date": False,
-        }
+        return self._get_trend_info(self.twitter_series, self.youtube_series)
 
-        if len(info["twitter_stats"]) > 1 and info["twitter_stats"][1][1][0] != 0:
-            info["twitter_trend_date"] = info["twitter_stats"][1][0]
-            info["twitter_trend"] = round(
-                (info["twitter_stats"][0][1][0] - info["twitter_stats"][1][1][0])
-                / info["twitter_stats"][1][1][0]
-                * 100,
-                1,
-            )
-
-        if len(info["youtube_stats"]) > 1 and info["youtube_stats"][1][1][0] != 0:
-            info["youtube_trend_date"] = info["youtube_stats"][1][0]
-            info["youtube_trend"] = round(
-                (info["youtube_stats"][0][1][0] - info["youtube_stats"][1][1][0])
-                / info["youtube_stats"][1][1][0]
-                * 100,
-                1,
-            )
+    @staticmethod
+    def _get_trend_info(twitter, youtube):
+        info = {"twitter_stats": twitter.stats(), "youtube_stats": youtube.stats()}
+        info["twitter_trend_date"], info["twitter_trend"] = twitter.change()
+        info["youtube_trend_date"], info["youtube_trend"] = youtube.change()
 
         return info
 
     @property
     def get_wiki_stats(self):
         """Wiki statistic (visits)."""
-        stats = []
-        if self.wiki_views_info:
-            dates = sorted(self.wiki_views_info.keys(), reverse=True)
-            for d in dates:
-                stats.append([d[:10], [int(self.wiki_views_info[d])]])
-
-        return stats
+        return self.wiki_series.stats()
 
     @property
     def get_wiki_trends(self):
         """Wiki weekly statistic (visits)."""
-        trends = []
-        if self.wiki_views_info:
-            dates = sorted(self.wiki_views_info.keys(), reverse=True)
-            for i, d in enumerate(dates[:-1]):
-                trends.append(
-                    [
-                        d[:10],
-                        [
-                            int(self.wiki_views_info[d])
-                            - int(self.wiki_views_info[dates[i + 1]]),
-                        ],
-                    ]
-                )
-
-        return trends
+        return self.wiki_series.deltas()
 
     @property
     def get_awis_stats(self):
         """Awis site visits."""
         _koef = 232_000
 
-        stats = []
-        if self.site_views_info:
-            dates = sorted(self.site_views_info.keys(), reverse=True)
-            top_5 = sorted(
-                self.site_views_info[dates[-1]].items(),
-                key=operator.itemgetter(1),
-                reverse=True,
-            )[:6]
-            top_5 = [t for t in top_5 if t[0] != "total"]  # remove total
-            countries = [country[0] for country in top_5]
-            countries = {country: COUNTRIES[country] for country in countries}
-
-            for d in dates:
-                _stats = {"total": _koef * self.site_views_info[d]["total"]}
-                for code, name in countries.items():
-                    _stats[name] = _koef * self.site_views_info[d].get(code, 0)
-
-                stats.append([d[:10], _stats])
+        history = self.get_metrics(prefix="site_views.")
+        if not history:
+            return []
+
+        # Top countries of the oldest day (6 entries with the total).
+        top = sorted(
+            history[min(history)].items(),
+            key=operator.itemgetter(1),
+            reverse=True,
+        )[:6]
+        codes = [code for code, _ in top if code != "total"]
+
+        # Countries which aren't in the ranking of the day have no views.
+        series = Series.from_history(history, "total", *codes, cast=float, default=0)
+        names = ["total", *(COUNTRIES[code] for code in codes)]
+
+        return [
+            [d, {name: _koef * value for name, value in zip(names, values)}]
+            for d, values in series.stats()
+        ]
+
+    def get_page_info(self):
+        """Statistic and trends for the page of the object."""
+        twitter, youtube, wiki = (
+            self.twitter_series,
+            self.youtube_series,
+            self.wiki_series,
+        )
 
-        return stats
+        info = self._get_trend_info(twitter, youtube)
+        info["twitter_trends"] = twitter.deltas()
+        info["youtube_trends"] = youtube.deltas()
+        info["wiki_stats"] = wiki.stats()
+        info["wiki_trends"] = wiki.deltas()
+        info["awis_stats"] = self.get_awis_stats
+
+        return info
+
+
+def defer_enrichment(objs):
+    """Queue missing facets of saved objects for every_minute_enrichment."""
+    members = defaultdict(list)
+    for obj in objs:
+        for facet in obj.get_missing_facets():
+            members[facet].append(f"{obj.__class__.__name__}_{obj.pk}")
+
+    for facet, facet_members in members.items():
+        WorkQueue(ENRICHMENT_QUEUE.format(facet)).add(*facet_members)
+
+
+def update_from_wiki(objs):
+    """
+    Update the objects with data from Wiki, pages which revision wasn't
+    changed since they were parsed are skipped (revisions are got in batches).
+    """
+    revisions = wikipedia.get_revisions([obj.wiki for obj in objs])
+    pages = WikiPage.objects.in_bulk(revisions, field_name="url")
+
+    for obj in objs:
+        page = pages.get(obj.wiki)
+        if obj.name and page and page.revision == revisions[obj.wiki]:
+            continue
+
+        # The page revision is stored by WikiPage.fetch when it's parsed.
+        fields = [field.attname for field in obj._meta.concrete_fields]
+        data = [getattr(obj, name) for name in fields]
+        if obj.get_data_from_wiki() is None:
+            continue
+
+        if [getattr(obj, name) for name in fields] != data:
+            obj.save()
 
 
 class League(models.Model, ModelMixin):
@@ -563,23 +572,35 @@ class League(models.Model, ModelMixin):
     additional_info = models.JSONField(default=dict, blank=True)
     twitter_info = models.JSONField(default=dict, blank=True)
     youtube_info = models.JSONField(default=dict, blank=True)
-    wiki_views_info = models.JSONField(default=dict, blank=True)
-    site_views_info = models.JSONField(default=dict, blank=True)
     added = models.DateTimeField(auto_now_add=True)
     updated = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            GistIndex(
+                fields=["name"],
+                name="league_name_trgm_idx",
+                opclasses=["gist_trgm_ops"],
+            )
+        ]
+
     def get_data_from_wiki(self, soup=None):
         """Get information about league from Wiki."""
         log.info("Parsing League %s", self.wiki)
 
+        page = None
         if not soup:
-            html = requests.get(self.wiki)
+            page, html = self.fetch_wiki()
+            if html is None:
+                log.info("League %s wasn't changed", self.wiki)
+                return self.additional_info
+
             if html.status_code != 200:
                 # League page doesn't exist.
                 log.warning("Skipping League %s (%s)", self.wiki, html.status_code)
                 return None
 
-            soup = BeautifulSoup(html.content, "html.parser")
+            soup = get_soup(html.content, INFOBOX)
 
         card = soup.find("table", {"class": "infobox"})
         info = {}
@@ -621,19 +642,21 @@ class League(models.Model, ModelMixin):
                 info[key] = val
 
         self.additional_info = info
+        if page:
+            page.save()
 
         return self.additional_info
 
     def save(
-        self, force_insert=False, force_update=False, using=None, update_fields=None
+        self,
+        force_insert=False,
+        force_update=False,
+        using=None,
+        update_fields=None,
+        enrich=True,
     ):
-        if not self.name:
-            # If name isn't set - send request to Wiki to get additional info.
-            self.get_data_from_wiki()
-
-        if not self.youtube_info.get("updated"):
-            # Try to get youtube info.
-            self.get_youtube_info()
+        if enrich and settings.ENRICHMENT_SYNC:
+            self.enrich(self.get_missing_facets())
 
         super().save(
             force_insert=force_insert,
@@ -641,6 +664,11 @@ class League(models.Model, ModelMixin):
             using=using,
             update_fields=update_fields,
         )
+        self.save_metrics()
+        invalidate_autocomplete(self._meta.model_name)
+
+        if enrich and not settings.ENRICHMENT_SYNC:
+            defer_enrichment([self])
 
         if not self.twitter_info.get("updated"):
             # Try to get twitter info.
@@ -674,25 +702,43 @@ class Team(models.Model, ModelMixin):
     additional_info = models.JSONField(default=dict, blank=True)
     twitter_info = models.JSONField(default=dict, blank=True)
     youtube_info = models.JSONField(default=dict, blank=True)
-    wiki_views_info = models.JSONField(default=dict, blank=True)
-    site_views_info = models.JSONField(default=dict, blank=True)
     stock_info = models.JSONField(default=dict, blank=True)
     company_info = models.JSONField(default=dict, blank=True)
+    search_document = models.TextField(blank=True, default="", editable=False)
     added = models.DateTimeField(auto_now_add=True)
     updated = models.DateTimeField(auto_now=True)
 
+    location_fields = ("latitude", "longitude")
+
+    class Meta:
+        indexes = [
+            GinIndex(
+                fields=["search_document"],
+                name="team_search_document_idx",
+                opclasses=["gin_trgm_ops"],
+            ),
+            GistIndex(
+                fields=["name"], name="team_name_trgm_idx", opclasses=["gist_trgm_ops"]
+            ),
+        ]
+
     def get_data_from_wiki(self, soup=None):
         """Get information about team from Wiki."""
         log.info("Parsing Team %s", self.wiki)
 
+        page = None
         if not soup:
-            html = requests.get(self.wiki)
+            page, html = self.fetch_wiki()
+            if html is None:
+                log.info("Team %s wasn't changed", self.wiki)
+                return self.additional_info
+
             if html.status_code != 200:
                 # Team page doesn't exist.
                 log.warning("Skipping Team %s (%s)", self.wiki, html.status_code)
                 return None
 
-            soup = BeautifulSoup(html.content, "html.parser")
+            soup = get_soup(html.content, INFOBOX)
 
         card = soup.find("table", {"class": "vcard"}) or soup.find(
             "table", {"class": "infobox"}
@@ -742,9 +788,21 @@ class Team(models.Model, ModelMixin):
                     self.league = league
 
         self.additional_info = info
+        if page:
+            page.save()
 
         return self.additional_info
 
+    def get_search_document(self):
+        """Text for the smart search."""
+        return get_document(
+            self.name,
+            self.league.name if self.league else "",
+            self.category,
+            self.gender,
+            COUNTRIES.get(self.location_market),
+        )
+
     def get_location(self):
         """Get team location (latitude and longitude)."""
         log.info("Geocoding Team %s", self.name)
@@ -780,46 +838,33 @@ class Team(models.Model, ModelMixin):
                 f"&apikey={settings.ALPHAVANTAGE_API_KEY}"
                 f"&symbol={symbol}"
             )
-            res = requests.get(url)
+            res = http_client.get(url)
             if res.status_code == 200:
                 stock_info = res.json()
                 if stock_info and stock_info.get("Time Series (Daily)"):
-                    for key, val in stock_info["Time Series (Daily)"].items():
-                        self.stock_info[key] = val["4. close"]
+                    history = {
+                        key: {"close": val["4. close"]}
+                        for key, val in stock_info["Time Series (Daily)"].items()
+                    }
+                    self.save_metrics(history, prefix="stock.")
+
+                    return history
 
-        return self.stock_info
+        return {}
+
+    @property
+    def stock_series(self):
+        return self.get_series("close", prefix="stock.", cast=float)
 
     @property
     def get_stock_stats(self):
         """Stock price."""
-        stats = []
-        self.stock_info.pop("symbol", None)
-        dates = sorted(self.stock_info.keys(), reverse=True)
-
-        for d in dates:
-            stats.append([d, [float(self.stock_info[d])]])
-
-        return stats
+        return self.stock_series.stats()
 
     @property
     def get_stock_trends(self):
         """Stock price trends."""
-        stats = []
-        self.stock_info.pop("symbol", None)
-
-        dates = sorted(self.stock_info.keys(), reverse=True)
-        for i, d in enumerate(dates[:-1]):
-            stats.append(
-                [
-                    d,
-                    [
-                        float(self.stock_info[d])
-                        - float(self.stock_info[dates[i + 1]]),
-                    ],
-                ]
-            )
-
-        return stats
+        return self.stock_series.deltas()
 
     def get_company_info(self):
         """Get company statistic from duedil."""
@@ -840,7 +885,7 @@ class Team(models.Model, ModelMixin):
                 }
             }
 
-            res = requests.post(url, json.dumps(data), headers=headers)
+            res = http_client.post(url, json.dumps(data), headers=headers)
             if res.status_code == 200:
                 company_info = res.json()
                 if company_info and company_info.get("companies"):
@@ -860,14 +905,22 @@ class Team(models.Model, ModelMixin):
         if self.company_info.get("companyId"):
             company_id = self.company_info["companyId"]
             url = f"https://duedil.io/v4/company/{self.location_market.lower()}/{company_id}.json"
-            res = requests.get(url, headers=headers)
+            res = http_client.get(url, headers=headers)
             if res.status_code == 200:
                 company_info = res.json()
                 if company_info and company_info.get("financialSummary"):
                     self.company_info["currency"] = company_info["accounts"]["currency"]
                     d = company_info["accounts"]["latestAccountsDate"]
-                    self.company_info[d] = company_info["financialSummary"]
-                    self.company_info[d].pop("ebitda", None)
+                    self.save_metrics(
+                        {
+                            d: {
+                                key: val
+                                for key, val in company_info["financialSummary"].items()
+                                if key != "ebitda" and val is not None
+                            }
+                        },
+                        prefix="company.",
+                    )
                 else:
                     log.info("No financialSummary for %s %s", model, self.name)
             else:
@@ -880,31 +933,35 @@ class Team(models.Model, ModelMixin):
 
         return self.company_info
 
+    def get_page_info(self):
+        """Statistic and trends for the team page."""
+        info = super().get_page_info()
+        stock = self.stock_series
+        info["stock_stats"] = stock.stats()
+        info["stock_trends"] = stock.deltas()
+        info["company_stats"] = self.get_company_stats
+
+        return info
+
     @property
     def get_company_stats(self):
         """Company finance info."""
         stats = []
-        company_info = self.company_info.copy()
-        company_info.pop("companyId", None)
-        currency = company_info.pop("currency", "")
+        currency = self.company_info.get("currency", "")
 
         if currency:
             stats.append(currency)
-            dates = sorted(company_info.keys(), reverse=True)
+            history = self.get_metrics(prefix="company.")
 
-            for d in dates:
+            for d, summary in history.items():
                 stats.append(
                     [
                         d,
                         {
-                            "Turnover": float(company_info[d].get("turnover") or 0),
-                            "Post Tax Profit": float(
-                                company_info[d].get("postTaxProfit") or 0
-                            ),
-                            "Total Assets": float(
-                                company_info[d].get("totalAssets") or 0
-                            ),
-                            "Net Assets": float(company_info[d].get("netAssets") or 0),
+                            "Turnover": summary.get("turnover", 0),
+                            "Post Tax Profit": summary.get("postTaxProfit", 0),
+                            "Total Assets": summary.get("totalAssets", 0),
+                            "Net Assets": summary.get("netAssets", 0),
                         },
                     ]
                 )
@@ -912,19 +969,19 @@ class Team(models.Model, ModelMixin):
         return stats
 
     def save(
-        self, force_insert=False, force_update=False, using=None, update_fields=None
+        self,
+        force_insert=False,
+        force_update=False,
+        using=None,
+        update_fields=None,
+        enrich=True,
     ):
-        if not self.name:
-            # If name isn't set - send request to Wiki to get additional info.
-            self.get_data_from_wiki()
+        if enrich and settings.ENRICHMENT_SYNC:
+            self.enrich(self.get_missing_facets())
 
-        # Get team location (latitude and longitude).
-        if not self.latitude or not self.longitude:
-            self.get_location()
-
-        if not self.youtube_info.get("updated"):
-            # Try to get youtube info.
-            self.get_youtube_info()
+        # The document is set by update_search_document receiver.
+        if update_fields is not None:
+            update_fields = {*update_fields, "search_document"}
 
         super().save(
             force_insert=force_insert,
@@ -932,6 +989,11 @@ class Team(models.Model, ModelMixin):
             using=using,
             update_fields=update_fields,
         )
+        self.save_metrics()
+        invalidate_autocomplete(self._meta.model_name)
+
+        if enrich and not settings.ENRICHMENT_SYNC:
+            defer_enrichment([self])
 
         if not self.twitter_info.get("updated"):
             # Try to get twitter info.
@@ -995,11 +1057,58 @@ class Athlete(models.Model, ModelMixin):
     additional_info = models.JSONField(default=dict, blank=True)
     twitter_info = models.JSONField(default=dict, blank=True)
     youtube_info = models.JSONField(default=dict, blank=True)
-    wiki_views_info = models.JSONField(default=dict, blank=True)
-    site_views_info = models.JSONField(default=dict, blank=True)
+    search_document = models.TextField(blank=True, default="", editable=False)
     added = models.DateTimeField(auto_now_add=True)
     updated = models.DateTimeField(auto_now=True)
 
+    location_fields = ("domestic_market",)
+
+    # Fields of a new athlete which bulk_upsert fills if the athlete was
+    # added meanwhile.
+    UPSERT_FIELDS = (
+        "name",
+        "photo",
+        "domestic_market",
+        "birthday",
+        "gender",
+        "location_market",
+        "team",
+        "team_model_id",
+        "category",
+        "international",
+        "additional_info",
+        "youtube_info",
+    )
+
+    class Meta:
+        indexes = [
+            GinIndex(
+                fields=["search_document"],
+                name="athlete_search_document_idx",
+                opclasses=["gin_trgm_ops"],
+            ),
+            GistIndex(
+                fields=["name"],
+                name="athlete_name_trgm_idx",
+                opclasses=["gist_trgm_ops"],
+            ),
+            GistIndex(
+                fields=["team"],
+                name="athlete_team_trgm_idx",
+                opclasses=["gist_trgm_ops"],
+            ),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if not instance.get_deferred_fields() & set(CountryStats.ATHLETE_FIELDS):
+            # Remember what the athlete adds to CountryStats to update it on save.
+            instance._country_stats = CountryStats.get_athlete_row(instance)
+        instance._team_model_id = instance.__dict__.get("team_model_id")
+
+        return instance
+
     @property
     def age(self):
         today = datetime.date.today()
@@ -1013,16 +1122,24 @@ class Athlete(models.Model, ModelMixin):
     def market_export(self):
         return self.domestic_market != self.location_market
 
-    def get_data_from_wiki(self):
+    def get_data_from_wiki(self, soup=None):
         """Get information about athlete from Wiki."""
         log.info("Parsing Athlete %s", self.wiki)
-        html = requests.get(self.wiki)
-        if html.status_code != 200:
-            # Athlete page doesn't exist.
-            log.warning("Skipping Athlete %s (%s)", self.wiki, html.status_code)
-            return None
 
-        soup = BeautifulSoup(html.content, "html.parser")
+        page = None
+        if not soup:
+            page, html = self.fetch_wiki()
+            if html is None:
+                log.info("Athlete %s wasn't changed", self.wiki)
+                return self.additional_info
+
+            if html.status_code != 200:
+                # Athlete page doesn't exist.
+                log.warning("Skipping Athlete %s (%s)", self.wiki, html.status_code)
+                return None
+
+            soup = get_soup(html.content, INFOBOX)
+
         card = soup.find("table", {"class": "vcard"})
         info = {}
 
@@ -1105,9 +1222,24 @@ class Athlete(models.Model, ModelMixin):
                         self.domestic_market = WIKI_COUNTRIES[country]
 
         self.additional_info = info
+        if page:
+            page.save()
 
         return self.additional_info
 
+    def get_search_document(self):
+        """Text for the smart search."""
+        team = self.team_model
+        return get_document(
+            self.name,
+            self.team,
+            team.league.name if team and team.league else "",
+            self.category,
+            self.gender,
+            COUNTRIES.get(self.domestic_market),
+            COUNTRIES.get(self.location_market),
+        )
+
     def get_location(self):
         """Get athlete domestic_market with geocoding."""
         log.info("Geocoding Athlete %s", self.name)
@@ -1138,27 +1270,183 @@ class Athlete(models.Model, ModelMixin):
 
         return None
 
-    def save(
-        self, force_insert=False, force_update=False, using=None, update_fields=None
-    ):
-        if not self.name:
-            # If name isn't set - send request to Wiki to get additional info.
-            self.get_data_from_wiki()
+    def prepare(self, soup=None):
+        """
+        Get data from Wiki (if there is no name or soup is given) and, with
+        ENRICHMENT_SYNC, other facets of a new athlete. False if it can't be saved.
+        """
+        if not self.name or soup:
+            info = self.additional_info
+            if self.get_data_from_wiki(soup) is None or not self.name:
+                return False
 
-        if not self.domestic_market:
-            # Try to geolocate domestic_market.
-            self.get_location()
+            self.additional_info = {**self.additional_info, **info}
 
-        if not self.youtube_info.get("updated"):
-            # Try to get youtube info.
-            self.get_youtube_info()
+        if not self.birthday:
+            return False
 
-        super().save(
-            force_insert=force_insert,
-            force_update=force_update,
-            using=using,
-            update_fields=update_fields,
-        )
+        if settings.ENRICHMENT_SYNC:
+            self.enrich(self.get_missing_facets())
+
+        return True
+
+    @classmethod
+    def bulk_upsert(cls, records, prepare=None):
+        """
+        Save athletes from [(wiki, defaults)] with a few queries.
+
+        Empty fields of existing athletes are filled from defaults. New
+        athletes are prepared with prepare(athletes), which returns athletes
+        to create (by default Athlete.prepare one by one), and inserted at once,
+        empty fields of the ones added meanwhile are filled from them.
+        Returns {wiki: athlete}, athlete is None if it was skipped.
+        """
+        records = {
+            wiki: {key: val for key, val in defaults.items() if val}
+            for wiki, defaults in records
+        }
+        # Search documents contain the team league name.
+        athletes = cls.objects.select_related("team_model__league")
+        existing = athletes.in_bulk(records, field_name="wiki")
+
+        # Create new athletes.
+        new = [
+            cls(wiki=wiki, **defaults)
+            for wiki, defaults in records.items()
+            if wiki not in existing
+        ]
+        if new:
+            new = prepare(new) if prepare else [a for a in new if a.prepare()]
+
+        # Athletes rows and their CountryStats are written in one transaction,
+        # see CountryStats.rebuild.
+        with transaction.atomic():
+            if new:
+                # Athletes added while the new ones were prepared are filled like
+                # existing ones.
+                added = athletes.in_bulk([a.wiki for a in new], field_name="wiki")
+                for athlete in new:
+                    if athlete.wiki in added:
+                        athlete.pk = added[athlete.wiki].pk
+                        existing[athlete.wiki] = added[athlete.wiki]
+                        records[athlete.wiki] = {
+                            name: getattr(athlete, name)
+                            for name in cls.UPSERT_FIELDS
+                            if getattr(athlete, name)
+                        }
+
+                created = [a for a in new if a.wiki not in added]
+                for athlete in created:
+                    athlete.search_document = athlete.get_search_document()
+
+                cls.objects.bulk_create(created, batch_size=500, ignore_conflicts=True)
+
+                # Wikis which didn't exist before the insert are created by it,
+                # skip the ones deleted meanwhile.
+                stored = cls.objects.in_bulk(
+                    [a.wiki for a in created], field_name="wiki"
+                )
+                for athlete in created:
+                    row = stored.get(athlete.wiki)
+                    athlete.pk = row and row.pk
+
+                Metric.save_pending(new)
+                new = [a for a in created if a.pk]
+
+            # Update existing athletes.
+            changed, fields = [], set()
+            for wiki, athlete in existing.items():
+                empty = {
+                    name
+                    for name in records[wiki]
+                    if not getattr(athlete, cls._meta.get_field(name).attname)
+                }
+                for name in empty:
+                    setattr(athlete, name, records[wiki][name])
+
+                if empty:
+                    changed.append(athlete)
+                    fields |= empty
+
+            if changed:
+                now = timezone.now()
+                for athlete in changed:
+                    athlete.search_document = athlete.get_search_document()
+                    athlete.updated = now
+
+                cls.objects.bulk_update(
+                    changed, [*fields, "search_document", "updated"], batch_size=500
+                )
+
+            # Update what Athlete.save and the signals do.
+            saved = changed + new
+            old_rows, new_rows, teams = [], [], set()
+            for athlete in saved:
+                row = CountryStats.get_athlete_row(athlete)
+                if row != athlete.__dict__.get("_country_stats"):
+                    old_rows.append(athlete.__dict__.get("_country_stats"))
+                    new_rows.append(row)
+                    athlete._country_stats = row
+
+                teams |= {athlete.team_model_id, athlete.__dict__.get("_team_model_id")}
+                athlete._team_model_id = athlete.team_model_id
+
+            CountryStats.apply(old_rows, sign=-1)
+            CountryStats.apply(new_rows)
+
+        if saved:
+            invalidate_autocomplete(cls._meta.model_name)
+        invalidate_page("team", *teams)
+        if new and not settings.ENRICHMENT_SYNC:
+            defer_enrichment(new)
+
+        for athlete in new:
+            if not athlete.twitter_info.get("updated"):
+                # Try to get amount od followers from twitter.
+                athlete.get_twitter_info()
+
+        result = dict.fromkeys(records)
+        result.update(existing)
+        result.update((athlete.wiki, athlete) for athlete in new)
+
+        return result
+
+    def save(
+        self,
+        force_insert=False,
+        force_update=False,
+        using=None,
+        update_fields=None,
+        enrich=True,
+    ):
+        if enrich:
+            facets = self.get_missing_facets()
+            if not settings.ENRICHMENT_SYNC:
+                # Birthday is required and only Wiki has it.
+                facets = [f for f in facets if f == "wiki" and not self.birthday]
+            self.enrich(facets)
+
+        # The document is set by update_search_document receiver.
+        if update_fields is not None:
+            update_fields = {*update_fields, "search_document"}
+
+        # The post_save signal updates CountryStats in the same transaction,
+        # see CountryStats.rebuild.
+        with transaction.atomic(using=using):
+            super().save(
+                force_insert=force_insert,
+                force_update=force_update,
+                using=using,
+                update_fields=update_fields,
+            )
+        self.save_metrics()
+        invalidate_autocomplete(self._meta.model_name)
+        # Squad statistic of the team (and of the previous team) is changed.
+        invalidate_page("team", self.team_model_id, self.__dict__.get("_team_model_id"))
+        self._team_model_id = self.team_model_id
+
+        if enrich and not settings.ENRICHMENT_SYNC:
+            defer_enrichment([self])
 
         if not self.twitter_info.get("updated"):
             # Try to get amount od followers from twitter.
@@ -1168,6 +1456,157 @@ class Athlete(models.Model, ModelMixin):
         return self.name
 
 
+ENTITY_TYPES = (
+    ("league", _("League")),
+    ("team", _("Team")),
+    ("athlete", _("Athlete")),
+)
+
+
+class Metric(models.Model):
+    """Statistic value of League, Team or Athlete for the date."""
+
+    entity_type = models.CharField(max_length=8, choices=ENTITY_TYPES)
+    entity_id = models.PositiveIntegerField()
+    metric = models.CharField(max_length=64)
+    date = models.DateField()
+    value = models.FloatField()
+
+    class Meta:
+        unique_together = ("entity_type", "entity_id", "metric", "date")
+
+    def __str__(self):
+        return f"{self.entity_type} {self.entity_id} {self.metric} {self.date}"
+
+    @classmethod
+    def prefetch(cls, objs):
+        """Load all metrics of the objects (of one model) with one query."""
+        rows = {obj.pk: [] for obj in objs}
+        if rows:
+            qs = cls.objects.filter(
+                entity_type=objs[0]._meta.model_name, entity_id__in=rows
+            )
+            for entity_id, *row in qs.order_by("-date").values_list(
+                "entity_id", "date", "metric", "value"
+            ):
+                rows[entity_id].append(row)
+
+        for obj in objs:
+            obj._prefetched_metrics = rows[obj.pk]
+
+        return objs
+
+    @classmethod
+    def save_pending(cls, objs):
+        """Save not saved metrics of the objects with one query."""
+        metrics = []
+        for obj in objs:
+            pending = obj.__dict__.get("_pending_metrics")
+            if not obj.pk or not pending:
+                continue
+
+            obj.__dict__.pop("_prefetched_metrics", None)
+
+            metrics += [
+                cls(
+                    entity_type=obj._meta.model_name,
+                    entity_id=obj.pk,
+                    metric=metric,
+                    date=date,
+                    value=value,
+                )
+                for (date, metric), value in pending.items()
+            ]
+            pending.clear()
+
+        if metrics:
+            cls.objects.bulk_create(
+                metrics,
+                update_conflicts=True,
+                unique_fields=("entity_type", "entity_id", "metric", "date"),
+                update_fields=("value",),
+            )
+            TrendSnapshot.refresh(
+                {(m.entity_type, m.entity_id, m.metric) for m in metrics}
+            )
+            for entity_type in {m.entity_type for m in metrics}:
+                invalidate_page(
+                    entity_type,
+                    *{m.entity_id for m in metrics if m.entity_type == entity_type},
+                )
+
+
+class TrendSnapshot(models.Model):
+    """The latest value of the metric and its change since the previous date."""
+
+    entity_type = models.CharField(max_length=8, choices=ENTITY_TYPES)
+    entity_id = models.PositiveIntegerField()
+    metric = models.CharField(max_length=64)
+    date = models.DateField()
+    latest = models.FloatField()
+    previous = models.FloatField(blank=True, null=True)
+    delta = models.FloatField(blank=True, null=True)
+
+    class Meta:
+        unique_together = ("entity_type", "entity_id", "metric")
+        indexes = [models.Index(fields=["entity_type", "metric", "-delta"])]
+
+    def __str__(self):
+        return f"{self.entity_type} {self.entity_id} {self.metric} {self.delta}"
+
+    @classmethod
+    def refresh(cls, keys):
+        """Recalculate snapshots for {(entity_type, entity_id, metric)}."""
+        entities = {}
+        for entity_type, entity_id, _metric in keys:
+            entities.setdefault(entity_type, set()).add(entity_id)
+
+        query = models.Q()
+        for entity_type, ids in entities.items():
+            query |= models.Q(entity_type=entity_type, entity_id__in=ids)
+
+        # Two latest values of every metric.
+        rows = (
+            Metric.objects.filter(query, metric__in={key[2] for key in keys})
+            .annotate(
+                row=models.Window(
+                    RowNumber(),
+                    partition_by=["entity_type", "entity_id", "metric"],
+                    order_by="-date",
+                )
+            )
+            .filter(row__lte=2)
+            .order_by("entity_type", "entity_id", "metric", "-date")
+            .values_list("entity_type", "entity_id", "metric", "date", "value")
+        )
+
+        snapshots = {}
+        for entity_type, entity_id, metric, date, value in rows:
+            key = (entity_type, entity_id, metric)
+            if key not in keys:
+                continue
+
+            if key in snapshots:
+                snapshots[key].previous = value
+                snapshots[key].delta = snapshots[key].latest - value
+            else:
+                snapshots[key] = cls(
+                    entity_type=entity_type,
+                    entity_id=entity_id,
+                    metric=metric,
+                    date=date,
+                    latest=value,
+                )
+
+        if snapshots:
+            cls.objects.bulk_create(
+                snapshots.values(),
+                update_conflicts=True,
+                unique_fields=("entity_type", "entity_id", "metric"),
+                update_fields=("date", "latest", "previous", "delta"),
+            )
+
+
 class AthletesList(models.Model):
     name = models.CharField(max_length=255)
     description = models.TextField(blank=True, null=True)
@@ -1307,7 +1746,7 @@ class TeamArticle(models.Model):
             f"https://newsapi.org/v2/top-headlines?category=sports"
             f"&q={team_name}&apiKey={settings.NEWSAPI_API_KEY}"
         )
-        res = requests.get(url)
+        res = http_client.get(url)
         if res.status_code == 200:
             data = res.json()
             for article in data.get("articles", []):
@@ -1329,3 +1768,286 @@ class TeamArticle(models.Model):
             log.warning(
                 "Failed getting news for %s team (%s)", team.name, res.status_code
             )
+
+
+class CountryStats(models.Model):
+    """Athletes statistic for the country, category and gender."""
+
+    country = models.CharField(max_length=2, blank=True, choices=COUNTRIES.items())
+    category = models.CharField(max_length=255, blank=True)
+    gender = models.CharField(max_length=15, blank=True)
+    athletes = models.IntegerField(default=0)
+    twitter = models.BigIntegerField(default=0)
+    birthdays = models.BigIntegerField(default=0)  # sum of birthday ordinals
+
+    ATHLETE_FIELDS = ("location_market", "category", "gender", "twitter", "birthday")
+
+    class Meta:
+        unique_together = ("country", "category", "gender")
+
+    def __str__(self):
+        return f"{self.country} {self.category} {self.gender}"
+
+    @staticmethod
+    def get_athlete_row(athlete):
+        """(country, category, gender, twitter, birthday ordinal) of the athlete."""
+        birthday = athlete._meta.get_field("birthday").to_python(athlete.birthday)
+        if not birthday:
+            return None
+
+        return (
+            athlete.location_market or "",
+            athlete.category or "",
+            athlete.gender or "",
+            athlete.twitter or 0,
+            birthday.toordinal(),
+        )
+
+    @classmethod
+    def apply(cls, rows, sign=1):
+        """Add (or subtract with sign=-1) athletes rows to the statistic."""
+        totals = {}
+        for country, category, gender, twitter, birthday in filter(None, rows):
+            total = totals.setdefault((country, category, gender), [0, 0, 0])
+            total[0] += sign
+            total[1] += sign * twitter
+            total[2] += sign * birthday
+
+        for (country, category, gender), (
+            athletes,
+            twitter,
+            birthdays,
+        ) in totals.items():
+            lookup = {"country": country, "category": category, "gender": gender}
+            changes = {
+                "athletes": models.F("athletes") + athletes,
+                "twitter": models.F("twitter") + twitter,
+                "birthdays": models.F("birthdays") + birthdays,
+            }
+
+            if cls.objects.filter(**lookup).update(**changes):
+                continue
+
+            try:
+                with transaction.atomic():
+                    cls.objects.create(
+                        athletes=athletes,
+                        twitter=twitter,
+                        birthdays=birthdays,
+                        **lookup,
+                    )
+            except IntegrityError:
+                # The row was created meanwhile.
+                cls.objects.filter(**lookup).update(**changes)
+
+    @classmethod
+    def rebuild(cls):
+        """
+        Recalculate the statistic from scratch. Athletes writes (which update
+        the statistic in the same transaction) wait until it's done.
+        """
+        with transaction.atomic():
+            if connection.vendor == "postgresql":
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        f"LOCK TABLE {Athlete._meta.db_table} IN SHARE MODE; "
+                        f"LOCK TABLE {cls._meta.db_table} IN EXCLUSIVE MODE"
+                    )
+
+            athletes = Athlete.objects.only(*cls.ATHLETE_FIELDS).iterator(
+                chunk_size=2000
+            )
+            cls.objects.all().delete()
+            cls.apply(cls.get_athlete_row(athlete) for athlete in athletes)
+
+    @classmethod
+    def get_stats(cls, **filters):
+        """Totals of the filtered rows grouped by the category."""
+        stats = (
+            cls.objects.filter(athletes__gt=0, **filters)
+            .values("category")
+            .annotate(
+                athletes=models.Sum("athletes"),
+                twitter=models.Sum("twitter"),
+                birthdays=models.Sum("birthdays"),
+            )
+            .order_by("category")
+        )
+
+        stats = list(stats)
+        for row in stats:
+            row["birthday"] = datetime.date.fromordinal(
+                round(row.pop("birthdays") / row["athletes"])
+            )
+
+        return stats
+
+
+class GeocodeResult(models.Model):
+    """Geocoding results of a normalized address, empty if nothing was found."""
+
+    address = models.CharField(max_length=255, unique=True)
+    results = models.JSONField(default=list, blank=True)
+    added = models.DateTimeField(auto_now_add=True)
+
+    LRU_SIZE = 4096
+    _lru = OrderedDict()  # {address: results} of recently used addresses
+    _lock = threading.Lock()
+
+    def __str__(self):
+        return self.address
+
+    @staticmethod
+    def normalize_address(address):
+        """Lowercase address without accents, extra spaces and commas."""
+        return re.sub(r"[\s,]+", " ", normalize(address)).strip()[:255]
+
+    @classmethod
+    def _remember(cls, address, results):
+        with cls._lock:
+            cls._lru[address] = results
+            cls._lru.move_to_end(address)
+            if len(cls._lru) > cls.LRU_SIZE:
+                cls._lru.popitem(last=False)
+
+    @classmethod
+    def get_results(cls, address):
+        """Cached results of the address, None if it wasn't geocoded yet."""
+        address = cls.normalize_address(address)
+        with cls._lock:
+            if address in cls._lru:
+                cls._lru.move_to_end(address)
+                return cls._lru[address]
+
+        results = (
+            cls.objects.filter(address=address)
+            .values_list("results", flat=True)
+            .first()
+        )
+        if results is not None:
+            cls._remember(address, results)
+
+        return results
+
+    @classmethod
+    def set_results(cls, address, results):
+        address = cls.normalize_address(address)
+        cls.objects.update_or_create(address=address, defaults={"results": results})
+        cls._remember(address, results)
+
+
+class WikiPage(models.Model):
+    """Validators and revision (or content hash) of the last parsed wiki page."""
+
+    url = models.URLField(unique=True, max_length=600)
+    etag = models.CharField(max_length=255, blank=True)
+    last_modified = models.CharField(max_length=64, blank=True)
+    content_hash = models.CharField(max_length=64, blank=True)
+    revision = models.PositiveBigIntegerField(null=True, blank=True)
+    data = models.JSONField(default=dict, blank=True)  # parsed data, e.g. links
+    updated = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return self.url
+
+    @classmethod
+    def fetch(cls, url, conditional=True):
+        """
+        (page, response) of the url, response is None if the page wasn't changed
+        since it was parsed (page.save() is called after successful parsing).
+        """
+        page = cls.objects.filter(url=url).first() or cls(url=url)
+        conditional = conditional and bool(page.revision or page.content_hash)
+
+        headers = {}
+        if conditional and page.etag:
+            headers["If-None-Match"] = page.etag
+        if conditional and page.last_modified:
+            headers["If-Modified-Since"] = page.last_modified
+
+        res = http_client.get(url, headers=headers)
+        if res.status_code == 304 and conditional:
+            return page, None
+
+        if res.status_code == 200:
+            page.etag = res.headers.get("ETag", "")
+            page.last_modified = res.headers.get("Last-Modified", "")
+            # Rendered pages differ in every response (request ids, timestamps),
+            # the revision of the page config is compared if there is one.
+            match = WIKI_REVISION_RE.search(res.content)
+            revision = int(match[1]) if match else None
+            content_hash = "" if match else hashlib.sha256(res.content).hexdigest()
+
+            if conditional and (revision, content_hash) == (
+                page.revision,
+                page.content_hash,
+            ):
+                page.save(update_fields=["etag", "last_modified", "updated"])
+                return page, None
+
+            page.revision = revision
+            page.content_hash = content_hash
+            page.data = {}
+
+        return page, res
+
+
+@receiver(pre_save, sender=Team)
+@receiver(pre_save, sender=Athlete)
+def update_search_document(sender, instance, update_fields=None, **kwargs):
+    """Set the search document on every save (also the base model one)."""
+    if update_fields is None or "search_document" in update_fields:
+        instance.search_document = instance.get_search_document()
+
+
+@receiver(post_save, sender=League)
+def update_teams_search_documents(sender, instance, update_fields=None, **kwargs):
+    """Search documents of teams and their athletes contain the league name."""
+    if update_fields is not None and "name" not in update_fields:
+        return
+
+    teams = list(instance.teams.all())
+    for team in teams:
+        team.league = instance
+        team.search_document = team.get_search_document()
+    Team.objects.bulk_update(teams, ["search_document"])
+
+    athletes = list(
+        Athlete.objects.filter(team_model__league=instance).select_related(
+            "team_model__league"
+        )
+    )
+    for athlete in athletes:
+        athlete.search_document = athlete.get_search_document()
+    Athlete.objects.bulk_update(athletes, ["search_document"], batch_size=500)
+
+
+@receiver(post_save, sender=Athlete)
+def update_country_stats(sender, instance, created, **kwargs):
+    if not created and "_country_stats" not in instance.__dict__:
+        return  # partially loaded athlete, CountryStats.rebuild fixes it
+
+    old = instance.__dict__.get("_country_stats")
+    new = CountryStats.get_athlete_row(instance)
+
+    if old != new:
+        CountryStats.apply([old], sign=-1)
+        CountryStats.apply([new])
+        instance._country_stats = new
+
+
+@receiver(post_delete, sender=Athlete)
+def delete_country_stats(sender, instance, **kwargs):
+    CountryStats.apply([instance.__dict__.get("_country_stats")], sign=-1)
+    instance._country_stats = None
+
+
+@receiver(post_delete, sender=League)
+@receiver(post_delete, sender=Team)
+@receiver(post_delete, sender=Athlete)
+def delete_metrics(sender, instance, **kwargs):
+    """Delete statistic and trends of the deleted object."""
+    for model in (Metric, TrendSnapshot):
+        model.objects.filter(
+            entity_type=sender._meta.model_name, entity_id=instance.pk
+        ).delete()
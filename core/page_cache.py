@@ -0,0 +1,48 @@
+"""Cache of the computed data of athlete, team and league pages."""
+
+import datetime
+import time
+
+from django.core.cache import cache
+
+CACHE_TIMEOUT = 24 * 60 * 60
+VERSION_KEY = "page_version_{}_{}"
+
+
+def invalidate_page(model_name, *pks):
+    """Drop cached page data of the objects (cache keys contain the version)."""
+    version = time.time_ns()
+    cache.set_many(
+        {VERSION_KEY.format(model_name, pk): version for pk in pks if pk}, None
+    )
+
+
+def get_pages_data(objs, build):
+    """
+    Page data of the objects, build(objs) is called only for not cached ones.
+
+    Data is rebuilt when the object is saved (updated is changed), its metrics
+    are saved (the version is changed) and every day (ages are changed).
+    """
+    version_keys = [VERSION_KEY.format(obj._meta.model_name, obj.pk) for obj in objs]
+    versions = cache.get_many(version_keys)
+    today = datetime.date.today()
+    keys = [
+        f"page_{obj._meta.model_name}_{obj.pk}_{obj.updated.timestamp()}_"
+        f"{versions.get(version_key, 0)}_{today}"
+        for obj, version_key in zip(objs, version_keys)
+    ]
+
+    data = cache.get_many(keys)
+    missing = {key: obj for key, obj in zip(keys, objs) if key not in data}
+    if missing:
+        built = dict(zip(missing, build(list(missing.values()))))
+        cache.set_many(built, CACHE_TIMEOUT)
+        data.update(built)
+
+    return [data[key] for key in keys]
+
+
+def get_page_data(obj, build):
+    """Page data of the object, build(obj) is called only when it isn't cached."""
+    return get_pages_data([obj], lambda objs: [build(objs[0])])[0]
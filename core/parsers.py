@@ -0,0 +1,42 @@
+"""Partial parsing of pages, with lxml if it's installed."""
+
+import importlib.util
+import re
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+PARSER = "lxml" if importlib.util.find_spec("lxml") else "html.parser"
+# Whole documents (rosters, tennis rankings) are built with html.parser: lxml
+# fixes broken markup differently, its roster links are only checked on the
+# test corpus (see ParsersTest).
+FULL_PARSER = "html.parser"
+
+
+class AnyStrainer(SoupStrainer):
+    """Keep tags which match any of the strainers (and their contents)."""
+
+    def __init__(self, *strainers):
+        super().__init__()
+        self.strainers = strainers
+
+    def allow_tag_creation(self, nsprefix, name, attrs):
+        return any(s.allow_tag_creation(nsprefix, name, attrs) for s in self.strainers)
+
+    def allow_string_creation(self, string):
+        return False  # strings outside of kept tags
+
+
+# What get_data_from_wiki reads: the title, captions and infoboxes. Navigation
+# blocks are kept, so infoboxes inside them still have them as the parent.
+INFOBOX = AnyStrainer(
+    SoupStrainer("title"),
+    SoupStrainer("caption"),
+    SoupStrainer("table", class_=re.compile(r"(^|\s)(infobox|vcard)(\s|$)")),
+    SoupStrainer(attrs={"role": "navigation"}),
+)
+
+
+def get_soup(content, parse_only=None):
+    """Parse the html, only parse_only parts are built (by PARSER) if it's given."""
+    parser = PARSER if parse_only else FULL_PARSER
+    return BeautifulSoup(content, parser, parse_only=parse_only)
@@ -0,0 +1,68 @@
+"""Redis sorted set based work queues (members are ordered by due time)."""
+
+import time
+
+from django_redis import get_redis_connection
+
+KEY_PREFIX = "athletes:queue:"
+TWITTER_QUEUE = "twitter"  # 'cls_id' members of objects to update
+ENRICHMENT_QUEUE = "enrich_{}"  # 'cls_id' members of objects without facet data
+
+# Atomically take up to ARGV[2] members which are due at ARGV[1].
+POP_SCRIPT = """
+local members = redis.call("ZRANGEBYSCORE", KEYS[1], "-inf", ARGV[1], "LIMIT", 0, ARGV[2])
+if #members > 0 then
+    redis.call("ZREM", KEYS[1], unpack(members))
+end
+
+return members
+"""
+
+
+class WorkQueue:
+    """Set of unique pending jobs, each job is due at some time."""
+
+    def __init__(self, name):
+        self.key = f"{KEY_PREFIX}{name}"
+        self.attempts_key = f"{self.key}:attempts"
+        self._redis = get_redis_connection("default")
+        self._pop = self._redis.register_script(POP_SCRIPT)
+
+    def __len__(self):
+        return self._redis.zcard(self.key)
+
+    def add(self, *members, due=None):
+        """Add members, already queued members keep their due time."""
+        if members:
+            due = due or time.time()
+            self._redis.zadd(self.key, {member: due for member in members}, nx=True)
+
+    def count_due(self):
+        """Amount of members which are due now."""
+        return self._redis.zcount(self.key, "-inf", time.time())
+
+    def pop(self, count):
+        """Take up to count due members."""
+        if count <= 0:
+            return []
+
+        members = self._pop(keys=[self.key], args=[time.time(), count])
+        return [member.decode() for member in members]
+
+    def retry(self, member, delays):
+        """
+        Add the member again after the delay of its attempt (delays are in
+        seconds), returns False if there are no attempts left.
+        """
+        attempt = self._redis.hincrby(self.attempts_key, member, 1)
+        if attempt > len(delays):
+            self.done(member)
+            return False
+
+        self.add(member, due=time.time() + delays[attempt - 1])
+        return True
+
+    def done(self, *members):
+        """Forget failed attempts of the members."""
+        if members:
+            self._redis.hdel(self.attempts_key, *members)
@@ -0,0 +1,72 @@
+"""
+Redis based token bucket rate limiter shared between workers.
+
+Limits are configured per provider in settings.RATE_LIMITS as
+{provider: (capacity, period in seconds)}.
+"""
+
+import time
+
+from django.conf import settings
+from django_redis import get_redis_connection
+
+KEY_PREFIX = "athletes:ratelimit:"
+
+# Refill the bucket and take up to requested tokens, returns granted tokens.
+ACQUIRE_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local requested = tonumber(ARGV[4])
+
+local bucket = redis.call("HMGET", KEYS[1], "tokens", "ts")
+local tokens = tonumber(bucket[1]) or capacity
+local ts = tonumber(bucket[2]) or now
+
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local granted = math.min(requested, math.floor(tokens))
+
+redis.call("HSET", KEYS[1], "tokens", tostring(tokens - granted), "ts", ARGV[3])
+redis.call("EXPIRE", KEYS[1], math.ceil(capacity / rate) + 1)
+
+return granted
+"""
+
+
+class TokenBucket:
+    """Token bucket: up to capacity requests per period for the provider."""
+
+    def __init__(self, provider, capacity=None, period=None):
+        if capacity is None or period is None:
+            capacity, period = settings.RATE_LIMITS[provider]
+
+        self.key = f"{KEY_PREFIX}{provider}"
+        self.capacity = capacity
+        self.period = period
+        self._redis = get_redis_connection("default")
+        self._script = self._redis.register_script(ACQUIRE_SCRIPT)
+
+    def acquire(self, tokens=1):
+        """Take up to `tokens` tokens without waiting, returns granted amount."""
+        return int(
+            self._script(
+                keys=[self.key],
+                args=[self.capacity, self.capacity / self.period, time.time(), tokens],
+            )
+        )
+
+    def wait(self, timeout=None):
+        """Wait for a token, returns False if it wasn't granted in timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        while not self.acquire():
+            delay = self.period / self.capacity  # time to refill one token
+            if deadline is not None:
+                if time.monotonic() >= deadline:
+                    return False
+
+                delay = min(delay, deadline - time.monotonic())
+
+            time.sleep(max(delay, 0))
+
+        return True
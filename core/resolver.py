@@ -0,0 +1,84 @@
+"""Match user input to country codes and categories."""
+
+from collections import defaultdict
+
+from core.constans import (
+    CATEGORIES,
+    COUNTRIES,
+    WIKI_CATEGORIES,
+    WIKI_COUNTRIES,
+    WIKI_NATIONALITIES,
+)
+from core.search import normalize
+
+NGRAM = 3  # the longest indexed substring
+
+
+class Resolver:
+    """Find values which names contain the text, with n-gram index of names."""
+
+    def __init__(self, names, order):
+        """Names is {name: value}, matched values are sorted as in order."""
+        self._order = {value: i for i, value in enumerate(order)}
+        self._names = {
+            normalize(name): value
+            for name, value in names.items()
+            if value in self._order
+        }
+
+        # All substrings up to NGRAM chars long of every name.
+        self._index = defaultdict(set)
+        for name in self._names:
+            for size in range(1, NGRAM + 1):
+                for i in range(len(name) - size + 1):
+                    self._index[name[i : i + size]].add(name)
+
+        # Short texts are n-grams, so their matches can be prepared.
+        self._matches = {
+            ngram: self._get_values(names) for ngram, names in self._index.items()
+        }
+        self._matches[""] = self._get_values(self._names)
+
+    def _get_values(self, names):
+        return sorted({self._names[name] for name in names}, key=self._order.get)
+
+    def match(self, text):
+        text = normalize(text)
+
+        if len(text) <= NGRAM:
+            return list(self._matches.get(text, ()))
+
+        # Check only names with the rarest n-gram of the text.
+        candidates = min(
+            (
+                self._index.get(text[i : i + NGRAM], ())
+                for i in range(len(text) - NGRAM + 1)
+            ),
+            key=len,
+        )
+
+        return self._get_values(name for name in candidates if text in name)
+
+
+_countries = Resolver(
+    {
+        **{name: code for code, name in COUNTRIES.items()},
+        **WIKI_COUNTRIES,
+        **WIKI_NATIONALITIES,
+    },
+    COUNTRIES,
+)
+_categories = Resolver(
+    {**{name: key for key, name in CATEGORIES.items()}, **WIKI_CATEGORIES},
+    CATEGORIES,
+)
+
+
+def match_countries(text):
+    """Codes of countries which names or aliases contain the text."""
+    return _countries.match(text)
+
+
+def match_categories(text):
+    """Categories which names or aliases contain the text."""
+    return _categories.match(text)
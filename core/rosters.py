@@ -0,0 +1,124 @@
+"""Rules of finding athletes links on wiki team pages, per category."""
+
+import soupsieve
+
+from core.constans import COUNTRIES
+
+# Ids of squad section headings, the first found one with a roster is used.
+SECTION_IDS = (
+    "Current_squad",
+    "Current_roster",
+    "Roster",
+    "First-team_squad",
+    "First_team_squad",
+    "Team_squad",
+    "Squad",
+    "Players",
+    "Current_Squad",
+    "Current_roster_and_coaching_staff",
+    "First_Team_Squad",
+    "Current_squad[11]",
+    "Current_players",
+    "Current_first_team_squad",
+    "Current_roster_and_Baseball_Hall_of_Fame",
+    "Team_roster",
+    "Team_roster_2018",
+    "2018_squad",
+    "Current_playing_squad",
+    "Playing_squad",
+    "Current_playing_list_and_coaches",
+    "Current_playing_lists",
+    "Team_Roster",
+)
+
+# Link texts in roster tables which aren't athletes.
+NOT_ATHLETES = frozenset(
+    ("United States", "South Korea", "North Korea", "Ivory Coast", *COUNTRIES.values())
+)
+
+
+class RosterRule:
+    """
+    Where the roster table is and how to get athletes links from it.
+
+    The roster is the first `container` after the section heading (a table,
+    or a table inside of it). Links are got with the first selector which finds
+    any, or else from the `columns` cells of table rows.
+    """
+
+    __slots__ = ("container", "selectors", "columns", "exclude")
+
+    def __init__(self, selectors=(), container="table", columns=(), exclude=()):
+        self.container = container
+        self.selectors = tuple(soupsieve.compile(s) for s in selectors)
+        self.columns = columns
+        self.exclude = exclude
+
+    def find_table(self, soup):
+        """The roster table of the first squad section which has it."""
+        # One pass over the document for all the ids.
+        anchors = {}
+        for tag in soup.find_all(id=SECTION_IDS):
+            anchors.setdefault(tag["id"], tag)
+
+        for section_id in SECTION_IDS:
+            if section_id not in anchors:
+                continue
+
+            table = anchors[section_id].parent.find_next_sibling(self.container)
+            if table and table.name != "table":
+                table = table.find("table")
+
+            if table:
+                return table
+
+        return None
+
+    def _get_cell_link(self, cell):
+        # Other links (e.g. captain) can be next to the wrapped player link.
+        link = cell.select_one("span.fn > a") or cell.find("a", recursive=False)
+        if not link:
+            # Sometimes a is wrapped with span.
+            link = cell.find("span", recursive=False)
+            if link:
+                link = link.find("a", recursive=False)
+
+        return link or cell.select_one("span.vcard a")
+
+    def get_links(self, table):
+        """Athletes links (a tags) of the roster table."""
+        for selector in self.selectors:
+            links = selector.select(table)
+            if links:
+                return links
+
+        links = []
+        for row in table.find_all("tr") if self.columns else ():
+            td = row.find_all(recursive=False)
+            if len(td) > max(self.columns):
+                for i in self.columns:
+                    link = self._get_cell_link(td[i])
+                    if link and link.string not in self.exclude:
+                        links.append(link)
+
+        return links
+
+
+# Players are in the 3rd or the 4th column.
+DEFAULT_RULE = RosterRule(columns=(2, 3), exclude=NOT_ATHLETES)
+LIST_RULE = RosterRule(["td > ul > li > a"])
+ROSTER_RULES = {
+    "American Football": LIST_RULE,
+    "Baseball": LIST_RULE,
+    "Ice Hockey": RosterRule(["tr > td span.vcard a"]),
+    "Cycling": RosterRule(["tr > td span a"]),
+    "Rugby": RosterRule(["tr > td span.fn > a", "tr > td ul > li a"]),
+    "Australian Football": RosterRule(["td > ul > li a"]),
+    "Cricket": RosterRule(["tr > td:nth-of-type(2) > a"]),
+    # Wiki pages for Handball category have table wrapped in div.
+    "Handball": RosterRule(["td > ul > li > a"], container="div"),
+}
+
+
+def get_roster_rule(category):
+    return ROSTER_RULES.get(category, DEFAULT_RULE)
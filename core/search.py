@@ -0,0 +1,26 @@
+"""Search documents of athletes and teams for the datatables smart search."""
+
+import unicodedata
+
+from django.db.models import Q
+
+
+def normalize(text):
+    """Lowercase text without accents."""
+    text = unicodedata.normalize("NFKD", str(text))
+
+    return "".join(char for char in text if not unicodedata.combining(char)).lower()
+
+
+def get_document(*values):
+    """Search document of the values, empty values are skipped."""
+    return " ".join(normalize(value) for value in dict.fromkeys(values) if value)
+
+
+def search_filter(search, field="search_document"):
+    """Match documents which contain every word of the search."""
+    query = Q()
+    for word in normalize(search).split():
+        query &= Q(**{f"{field}__contains": word})
+
+    return query
@@ -1,26 +1,48 @@
 import datetime
 import logging
 import urllib.parse
+from collections import defaultdict
 
-import requests
-from bs4 import BeautifulSoup
+from celery.signals import task_postrun
 from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.core.cache import cache
 from django.core.mail import EmailMultiAlternatives
 from django.db.models import Q
-from django.db.utils import IntegrityError, DataError
+from django.db.utils import DataError
 from django.template.loader import render_to_string
 from django.utils import timezone
+from requests.exceptions import RequestException
 from requests_oauthlib import OAuth1
 
+from core import http_client, wikipedia
 from core.celery import app
-from core.constans import COUNTRIES
-from core.models import Athlete, League, Team, Profile, TeamArticle
+from core.crawler import crawl
+from core.models import (
+    Athlete,
+    CountryStats,
+    League,
+    Metric,
+    ModelMixin,
+    Team,
+    Profile,
+    TeamArticle,
+    TrendSnapshot,
+    WikiPage,
+)
+from core.parsers import INFOBOX, get_soup
+from core.queues import ENRICHMENT_QUEUE, TWITTER_QUEUE, WorkQueue
+from core.ratelimit import TokenBucket
+from core.rosters import get_roster_rule
 
 User = get_user_model()
 log = logging.getLogger("athletes")
 
+WIKI_VIEWS_CHUNK_SIZE = 500
+ENRICHMENT_BATCH_SIZE = 50
+# Delays of getting missing data again (an hour, 6 hours, a day and a week).
+ENRICHMENT_RETRY_DELAYS = (60 * 60, 6 * 60 * 60, 24 * 60 * 60, 7 * 24 * 60 * 60)
+TRENDS_DAYS = 8  # weekly updates plus a day of delay
+
 auth = OAuth1(
     settings.TWITTER_APP_KEY,
     settings.TWITTER_APP_SECRET,
@@ -29,102 +51,130 @@ auth = OAuth1(
 )
 
 
-def validate_link_and_create_athlete(link, site, data):
-    """Validate the link and create an athlete."""
+@task_postrun.connect
+def log_http_metrics(task=None, **kwargs):
+    """Log external requests statistic of the finished task."""
+    for provider, data in sorted(http_client.get_metrics(reset=True).items()):
+        log.info(
+            "%s: %s requests to %s (%s errors, %s failures) in %.1fs",
+            task.name,
+            data["requests"],
+            provider,
+            data["errors"],
+            data["failures"],
+            data["seconds"],
+        )
+
+
+def get_athlete_link(link, site):
+    """Get full athlete wiki link or None if it's not an athlete link."""
     # If link has a space - it's player name.
     if link and link.string and len(link.string.split()) > 1:
         if link["href"][:4] != "http":
-            full_link = site + link["href"]
-        else:
-            full_link = link["href"]
-        # Asynchronously add an athlete.
-        if create_athlete_task(full_link, data):
-            return full_link, True
+            return site + link["href"]
+
+        return link["href"]
 
-        return full_link, False
+    return None
+
+
+def get_roster_links(soup, wiki_url, category):
+    """Athletes links (see get_athlete_link) of the team page, None without roster."""
+    site = urllib.parse.urlparse(wiki_url)
+    site = f"{site.scheme}://{site.hostname}"
+
+    rule = get_roster_rule(category)
+    table = rule.find_table(soup)
+    if not table:
+        return None
 
-    return None, False
+    return [get_athlete_link(link, site) for link in rule.get_links(table)]
 
 
-def create_athlete_task(wiki, data):
-    """Task to crawl athletes from wiki team page."""
-    athlete = Athlete.objects.filter(wiki=wiki).first()
+def _parse_athlete_page(wiki, response, data):
+    """Build an unsaved athlete from the fetched wiki page."""
+    if response is None or response.status_code != 200:
+        log.warning(
+            "Skipping Athlete %s (%s)", wiki, getattr(response, "status_code", None)
+        )
+        return None
+
+    athlete = Athlete(wiki=wiki, **data)
+    soup = get_soup(response.content, INFOBOX)
+    # Do the network calls of Athlete.save here, in the worker thread.
+    if not athlete.prepare(soup):
+        return None
+
+    return athlete
+
+
+def crawl_athletes(links, data, concurrent=True):
+    """Save athletes of wiki links, new athletes can be fetched concurrently."""
+    # Remove not valid links and duplicates, keep the order.
+    links = list(dict.fromkeys(link for link in links if link))
     data = {key: val for key, val in data.items() if val}  # remove empty vals
 
-    try:
-        if not athlete:
-            # Create an athlete.
-            Athlete.objects.create(wiki=wiki, **data)
-        else:
-            # Update an athlete.
-            for field in data:
-                if not getattr(athlete, field):
-                    setattr(athlete, field, data[field])
-            athlete.save()
-        return True
-    except IntegrityError as e:
-        log.warning("%s: Skip athlete for %s", repr(e), wiki)
-        return False
+    def prepare(athletes):
+        parsed = crawl(
+            [athlete.wiki for athlete in athletes],
+            lambda url, response: _parse_athlete_page(url, response, data),
+        )
+        return [athlete for athlete in parsed.values() if athlete]
+
+    athletes = Athlete.bulk_upsert(
+        [(link, data) for link in links], prepare if concurrent else None
+    )
+
+    result = {"skipped": [], "parsed": []}
+    for link, athlete in athletes.items():
+        result[["skipped", "parsed"][bool(athlete)]].append(link)
+
+    return result
 
 
 @app.task
-def parse_team(cleaned_data, skip_errors=False):
+def parse_team(cleaned_data, skip_errors=False, concurrent=False):
+    """
+    Crawl athletes from wiki team page.
+
+    With concurrent=True new athletes pages are fetched in parallel.
+    """
     wiki_url = cleaned_data.get("wiki", "")
     log.info("parsing team %s", wiki_url)
-    site = urllib.parse.urlparse(wiki_url)
-    site = f"{site.scheme}://{site.hostname}"
-    html = requests.get(wiki_url)
-    soup = BeautifulSoup(html.content, "html.parser")
+    page, html = WikiPage.fetch(wiki_url)
+    if html is None and "links" in page.data:
+        # The page wasn't changed, crawl athletes of the last parsing.
+        log.info("team %s wasn't changed", wiki_url)
+        cleaned_data["name"] = page.data["name"]
+        return _crawl_team_athletes(cleaned_data, page.data["links"], concurrent)
+
+    if html is None:
+        # The page was parsed only by Team.get_data_from_wiki.
+        page, html = WikiPage.fetch(wiki_url, conditional=False)
+
+    soup = get_soup(html.content)
     cleaned_data["name"] = soup.title.string.split(" - Wikipedia")[0]
+    name = cleaned_data["name"]
 
-    html_ids = (
-        "#Current_squad",
-        "#Current_roster",
-        "#Roster",
-        "#First-team_squad",
-        "#First_team_squad",
-        "#Team_squad",
-        "#Squad",
-        "#Players",
-        "#Current_Squad",
-        "#Current_roster_and_coaching_staff",
-        "#First_Team_Squad",
-        "#Current_squad[11]",
-        "#Current_players",
-        "#Current_first_team_squad",
-        "#Current_roster_and_Baseball_Hall_of_Fame",
-        "#Team_roster",
-        "#Team_roster_2018",
-        "#2018_squad",
-        "#Current_playing_squad",
-        "#Playing_squad",
-        "#Current_playing_list_and_coaches",
-        "#Current_playing_lists",
-        "#Team_Roster",
-    )
-    table = None
+    links = get_roster_links(soup, wiki_url, cleaned_data.get("category"))
+    if links is None:
+        if skip_errors:
+            return None
 
-    for html_id in html_ids:
-        title = soup.select(html_id)
-        if not title:
-            continue
+        raise ValueError(f"No roster on {wiki_url}")
 
-        if cleaned_data.get("category") == "Handball":
-            # Wiki pages for Handball category have table wrapped in div.
-            table = title[0].parent.find_next_sibling("div")
-            if table:
-                table = table.select_one("table")
-        else:
-            table = title[0].parent.find_next_sibling("table")
+    result = _crawl_team_athletes(cleaned_data, links, concurrent, soup)
+    page.data = {"name": name, "links": links}
+    page.save()
 
-        if table:
-            break
+    return result
 
-    if skip_errors and not table:
-        return None
 
+def _crawl_team_athletes(cleaned_data, links, concurrent, soup=None):
+    """Save the team (with data from its wiki page soup) and its athletes."""
     team, _ = Team.objects.get_or_create(**cleaned_data)
-    team.get_data_from_wiki(soup)
+    if soup:
+        team.get_data_from_wiki(soup)
     if cleaned_data.get("league__pk"):
         team.league = League.objects.filter(pk=cleaned_data.pop("league__pk")).first()
     team.save()
@@ -132,124 +182,75 @@ def parse_team(cleaned_data, skip_errors=False):
     cleaned_data["team"] = cleaned_data.pop("name", "")
     cleaned_data["team_model"] = team
     cleaned_data.pop("wiki", "")
-    result = {"skipped": [], "parsed": []}
 
-    if cleaned_data.get("category") in ("American Football", "Baseball"):
-        links = table.select("td > ul > li > a")
+    return crawl_athletes(links, cleaned_data, concurrent)
 
-        for link in links:
-            full_link, status = validate_link_and_create_athlete(
-                link, site, cleaned_data
-            )
-            result[["skipped", "parsed"][status]].append(full_link)
-    elif cleaned_data.get("category") == "Ice Hockey":
-        links = table.select("tr > td span.vcard a")
 
-        for link in links:
-            full_link, status = validate_link_and_create_athlete(
-                link, site, cleaned_data
-            )
-            result[["skipped", "parsed"][status]].append(full_link)
-    elif cleaned_data.get("category") == "Cycling":
-        links = table.select("tr > td span a")
+def _rate_limited(task, provider, members):
+    """
+    Objects of 'cls_id' members while the provider limit allows requests.
 
-        for link in links:
-            full_link, status = validate_link_and_create_athlete(
-                link, site, cleaned_data
-            )
-            result[["skipped", "parsed"][status]].append(full_link)
-    elif cleaned_data.get("category") == "Rugby":
-        links = table.select("tr > td span.fn > a") or table.select("tr > td ul > li a")
+    Without a token the rest of members is passed to the task again, it's run
+    when the bucket is refilled instead of blocking the worker.
+    """
+    models = {"Athlete": Athlete, "League": League, "Team": Team}
+    limiter = TokenBucket(provider)
 
-        for link in links:
-            full_link, status = validate_link_and_create_athlete(
-                link, site, cleaned_data
-            )
-            result[["skipped", "parsed"][status]].append(full_link)
-    elif cleaned_data.get("category") == "Australian Football":
-        links = table.select("td > ul > li  a")
+    for i, member in enumerate(members):
+        cls_name, pk = member.split("_")
+        obj = models[cls_name].objects.filter(id=pk).first()
+        if obj is None:
+            continue
 
-        for link in links:
-            full_link, status = validate_link_and_create_athlete(
-                link, site, cleaned_data
-            )
-            result[["skipped", "parsed"][status]].append(full_link)
-    elif cleaned_data.get("category") == "Cricket":
-        links = table.select("tr > td:nth-of-type(2) > a")
+        if not limiter.acquire():
+            task.apply_async((members[i:],), countdown=limiter.period)
+            return
 
-        for link in links:
-            full_link, status = validate_link_and_create_athlete(
-                link, site, cleaned_data
-            )
-            result[["skipped", "parsed"][status]].append(full_link)
-    elif cleaned_data.get("category") == "Handball":
-        links = table.select("td > ul > li  > a")
+        yield obj
 
-        for link in links:
-            full_link, status = validate_link_and_create_athlete(
-                link, site, cleaned_data
-            )
-            result[["skipped", "parsed"][status]].append(full_link)
-    else:
-        # Default parsing.
-        # Go through all table rows.
-        for row in table.find_all("tr"):
-            td = row.find_all(recursive=False)
-            if len(td) > 3:
-                for i in (2, 3):  # try to find players in 2th or 3th
-                    link = td[i].find("a", recursive=False)
-                    if not link:
-                        # Sometimes a is wrapped with span.
-                        link = td[i].find("span", recursive=False)
-                        if link:
-                            link = link.find("a", recursive=False)
-
-                    if not link:
-                        link = td[i].select_one("span.vcard a")
-
-                    if link and link.string in [
-                        "United States",
-                        "South Korea",
-                        "North Korea",
-                        "Ivory Coast",
-                    ] + list(COUNTRIES.values()):
-                        continue  # it's not a athlete
-
-                    full_link, status = validate_link_and_create_athlete(
-                        link, site, cleaned_data
-                    )
-                    result[["skipped", "parsed"][status]].append(full_link)
-
-    result["skipped"] = [link for link in result["skipped"] if link]
 
-    return result
+def _get_members(*querysets):
+    """'cls_id' members of the objects, sorted by id per model."""
+    return [
+        f"{qs.model.__name__}_{pk}"
+        for qs in querysets
+        for pk in sorted(qs.values_list("id", flat=True))
+    ]
 
 
 @app.task
-def weekly_athletes_youtube_update():
+def weekly_athletes_youtube_update(members=None):
     """Update youtube info for Athlete weekly."""
-    aids = sorted(
-        Athlete.objects.filter(~Q(youtube_info={})).values_list("id", flat=True)
-    )
+    if members is None:
+        members = _get_members(Athlete.objects.filter(~Q(youtube_info={})))
+
+    for athlete in _rate_limited(weekly_athletes_youtube_update, "youtube", members):
+        try:
+            athlete.get_youtube_info()
+        except RequestException as e:
+            log.warning("%s: Skip youtube update for %s", repr(e), athlete.name)
+            continue
 
-    for aid in aids:
-        athlete = Athlete.objects.get(id=aid)
-        athlete.get_youtube_info()
         super(Athlete, athlete).save()
 
 
 @app.task
-def weekly_youtube_update():
+def weekly_youtube_update(members=None):
     """Update youtube info for League and Team weekly."""
-    for cls in (League, Team):
-        ids = sorted(
-            cls.objects.filter(~Q(youtube_info={})).values_list("id", flat=True)
+    if members is None:
+        members = _get_members(
+            League.objects.filter(~Q(youtube_info={})),
+            Team.objects.filter(~Q(youtube_info={})),
         )
 
-        for _id in ids:
-            obj = cls.objects.get(id=_id)
+    for obj in _rate_limited(weekly_youtube_update, "youtube", members):
+        try:
             obj.get_youtube_info()
-            super(cls, obj).save()
+        except RequestException as e:
+            log.warning("%s: Skip youtube update for %s", repr(e), obj.name)
+            continue
+
+        super(type(obj), obj).save()
 
 
 @app.task
@@ -269,72 +270,39 @@ def weekly_trends_notifications(teams=False):
 
     if teams:
         subject = "Weekly trends teams"
+        model = Team
     else:
         subject = "Weekly trends athletes"
+        model = Athlete
+
+    # Only trends which were updated this week.
+    since = timezone.localdate() - timezone.timedelta(days=TRENDS_DAYS)
+
+    def get_top(metric, attr):
+        """Objects with the biggest change of the metric, attr is the change."""
+        snapshots = list(
+            TrendSnapshot.objects.filter(
+                entity_type=model._meta.model_name,
+                entity_id__in=model.objects.values("id"),
+                metric=metric,
+                date__gte=since,
+                delta__isnull=False,
+            ).order_by("-delta", "entity_id")[:lim]
+        )
+        objs = model.objects.in_bulk([snapshot.entity_id for snapshot in snapshots])
 
-    if teams:
-        ids = sorted(Team.objects.values_list("id", flat=True))
-    else:
-        ids = sorted(Athlete.objects.values_list("id", flat=True))
+        top = []
+        for snapshot in snapshots:
+            obj = objs.get(snapshot.entity_id)
+            if obj:
+                setattr(obj, attr, int(snapshot.delta))
+                top.append(obj)
 
-    twitter_trends = {}
-    youtube_subscribers_trends = {}
-    youtube_views_trends = {}
+        return top
 
-    for _id in ids:
-        if teams:
-            obj = Team.objects.get(id=_id)
-        else:
-            obj = Athlete.objects.get(id=_id)
-
-        if obj.twitter_info and obj.twitter_info.get("history"):
-            diff = obj.get_twitter_trends[0][1][0]
-            if len(twitter_trends) < lim or diff > min(twitter_trends.keys()):
-                if len(twitter_trends) >= lim:
-                    twitter_trends.pop(min(twitter_trends.keys()))
-
-                obj.new_followers = diff  # added new followers
-                twitter_trends[diff] = obj
-
-        if obj.youtube_info and obj.youtube_info.get("history"):
-            diff = obj.get_youtube_trends[0][1][0]
-            if len(youtube_subscribers_trends) < lim or diff > min(
-                youtube_subscribers_trends.keys()
-            ):
-                if len(youtube_subscribers_trends) >= lim:
-                    youtube_subscribers_trends.pop(
-                        min(youtube_subscribers_trends.keys())
-                    )
-
-                obj.new_subscribers = diff  # added new subscribers
-                youtube_subscribers_trends[diff] = obj
-
-            diff = obj.get_youtube_trends[0][1][1]
-            if len(youtube_views_trends) < lim or diff > min(
-                youtube_views_trends.keys()
-            ):
-                if len(youtube_views_trends) >= lim:
-                    youtube_views_trends.pop(min(youtube_views_trends.keys()))
-
-                obj.new_views = diff  # added new views
-                youtube_views_trends[diff] = obj
-
-    # Sort items by new followers.
-    twitter_trends = {
-        k: twitter_trends[k] for k in sorted(twitter_trends.keys(), reverse=True)
-    }
-
-    # Sort items by new subscribers.
-    youtube_subscribers_trends = {
-        k: youtube_subscribers_trends[k]
-        for k in sorted(youtube_subscribers_trends.keys(), reverse=True)
-    }
-
-    # Sort items by new views.
-    youtube_views_trends = {
-        k: youtube_views_trends[k]
-        for k in sorted(youtube_views_trends.keys(), reverse=True)
-    }
+    twitter_trends = get_top("twitter.followers_count", "new_followers")
+    youtube_subscribers_trends = get_top("youtube.subscriberCount", "new_subscribers")
+    youtube_views_trends = get_top("youtube.viewCount", "new_views")
 
     # Send notification to staff users.
     profiles = Profile.objects.filter(user__is_staff=True)
@@ -349,9 +317,9 @@ def weekly_trends_notifications(teams=False):
             template,
             {
                 "subject": subject,
-                "twitter_trends": twitter_trends.values(),
-                "youtube_subscribers_trends": youtube_subscribers_trends.values(),
-                "youtube_views_trends": youtube_views_trends.values(),
+                "twitter_trends": twitter_trends,
+                "youtube_subscribers_trends": youtube_subscribers_trends,
+                "youtube_views_trends": youtube_views_trends,
             },
         )
 
@@ -376,26 +344,54 @@ def weekly_twitter_update():
             obj.get_twitter_info()
 
 
+def _update_wiki_views(cls, objs):
+    """Get wiki visits of the objects in batches and save them in bulk."""
+    views = wikipedia.get_pageviews([obj.wiki for obj in objs])
+
+    for obj in objs:
+        history = {
+            date: {"views": val} for date, val in views.get(obj.wiki, {}).items()
+        }
+        obj.save_metrics(history, prefix="wiki.", commit=False)
+
+    Metric.save_pending(objs)
+    cls.objects.filter(id__in=[obj.id for obj in objs if obj.wiki in views]).update(
+        updated=timezone.now()
+    )
+
+
 @app.task
-def weekly_wiki_views_update():
+def weekly_wiki_views_update(chunk_size=WIKI_VIEWS_CHUNK_SIZE):
     """Update wiki visits info for League, Team and Athlete weekly."""
     for cls in (League, Team, Athlete):
-        ids = sorted(cls.objects.values_list("id", flat=True))
+        last_id = 0
 
-        for _id in ids:
-            obj = cls.objects.get(id=_id)
-            obj.get_wiki_views_info()
-            super(cls, obj).save()
+        while True:
+            objs = list(
+                cls.objects.filter(id__gt=last_id)
+                .order_by("id")
+                .only("id", "wiki", "name")[:chunk_size]
+            )
+            if not objs:
+                break
+
+            last_id = objs[-1].id
+            _update_wiki_views(cls, objs)
 
 
 @app.task
-def weekly_stock_update():
+def weekly_stock_update(members=None):
     """Update stock info for Teams weekly."""
-    ids = sorted(Team.objects.filter(~Q(stock_info={})).values_list("id", flat=True))
+    if members is None:
+        members = _get_members(Team.objects.filter(~Q(stock_info={})))
+
+    for obj in _rate_limited(weekly_stock_update, "alphavantage", members):
+        try:
+            obj.get_stock_info()
+        except RequestException as e:
+            log.warning("%s: Skip stock update for %s", repr(e), obj.name)
+            continue
 
-    for _id in ids:
-        obj = Team.objects.get(id=_id)
-        obj.get_stock_info()
         super(Team, obj).save()
 
 
@@ -406,12 +402,14 @@ def weekly_awis_update():
 
     for _id in ids:
         league = League.objects.prefetch_related("teams").get(id=_id)
-        league.get_awis_info()
-        super(League, league).save()
+        for obj in [league, *league.teams.all()]:
+            try:
+                obj.get_awis_info()
+            except RequestException as e:
+                log.warning("%s: Skip awis update for %s", repr(e), obj.name)
+                continue
 
-        for team in league.teams.all():
-            team.get_awis_info()
-            super(Team, team).save()
+            super(type(obj), obj).save()
 
 
 @app.task
@@ -421,55 +419,60 @@ def yearly_duedil_update():
 
     for _id in ids:
         team = Team.objects.get(id=_id)
-        team.get_company_info()
+        try:
+            team.get_company_info()
+        except RequestException as e:
+            log.warning("%s: Skip company info update for %s", repr(e), team.name)
+            continue
+
         super(Team, team).save()
 
 
 @app.task
-def daily_teams_news_update():
+def daily_teams_news_update(members=None):
     """Get articles related to specific teams."""
-    # Get famous teams (with website and twitter, we have 876 teams on prod).
-    ids = sorted(
-        Team.objects.exclude(additional_info__Website__isnull=True)
-        .filter(~Q(twitter_info={}))
-        .filter(~Q(company_info={}))
-        .order_by("?")
-        .values_list("id", flat=True)[:50]
-    )
+    if members is None:
+        # Get famous teams (with website and twitter, we have 876 teams on prod).
+        ids = (
+            Team.objects.exclude(additional_info__Website__isnull=True)
+            .filter(~Q(twitter_info={}))
+            .filter(~Q(company_info={}))
+            .order_by("?")
+            .values_list("id", flat=True)[:50]
+        )
+        members = [f"Team_{pk}" for pk in sorted(ids)]
 
-    for _id in ids:
-        team = Team.objects.get(id=_id)
+    for team in _rate_limited(daily_teams_news_update, "newsapi", members):
         try:
             TeamArticle.get_articles(team)
         except DataError as e:
             log.exception(e)  # handle value too long for type character varying(200)
+        except RequestException as e:
+            log.warning("%s: Skip news update for %s", repr(e), team.name)
 
 
 @app.task
-def every_minute_twitter_update():
-    """Update twitter info with respect to api limitation."""
-    # pattern is 'twitter_update_cls_id'
-    # due to twitter limits we can send only 60 requests per minute
-    keys = cache.keys("twitter_update_*")[:60]
+def weekly_country_stats_rebuild():
+    """Recalculate CountryStats to fix possible drift of incremental updates."""
+    CountryStats.rebuild()
 
-    for key in keys:
-        cache.delete(key)  # first delete the key
 
-        historical_keys = ("followers_count",)
+@app.task
+def every_minute_twitter_update():
+    """Update twitter info with respect to api limitation."""
+    # members are 'cls_id', take only as many as the rate limit allows
+    queue = WorkQueue(TWITTER_QUEUE)
+    limit = TokenBucket("twitter").acquire(queue.count_due())
 
-        cls_name, pk = key[len("twitter_update_") :].split("_")
+    for member in queue.pop(limit):
+        cls_name, pk = member.split("_")
         cls = {"Athlete": Athlete, "League": League, "Team": Team}.get(cls_name)
 
-        obj = cls.objects.get(id=pk)
-        history = obj.twitter_info.get("history", {})
-        now = datetime.datetime.now()
-        if obj.twitter_info:
-            week_ago = str(now - datetime.timedelta(weeks=1))
-            last_update = obj.twitter_info.get("updated", week_ago)
+        obj = cls.objects.filter(id=pk).first()
+        if obj is None:
+            continue
 
-            history[last_update] = {}
-            for field in historical_keys:
-                history[last_update][field] = obj.twitter_info.get(field, 0)
+        now = datetime.datetime.now()
 
         if obj.twitter_info.get("screen_name"):
             log.info("Update info from Twitter for %s %s", cls_name, obj.name)
@@ -489,7 +492,12 @@ def every_minute_twitter_update():
                 f"&q={urlencoded_name} {obj.category}"
             )
 
-        res = requests.get(url, auth=auth)
+        try:
+            res = http_client.get(url, auth=auth)
+        except RequestException as e:
+            log.warning("%s: Skip twitter update for %s", repr(e), obj.name)
+            continue
+
         if res.status_code == 200:
             twitter_info = res.json()
             if twitter_info:
@@ -499,7 +507,10 @@ def every_minute_twitter_update():
                 obj.twitter = twitter_info["followers_count"]
                 obj.twitter_info = twitter_info
                 obj.twitter_info["updated"] = str(now)
-                obj.twitter_info["history"] = history
+                obj.save_metrics(
+                    {now.date(): {"followers_count": twitter_info["followers_count"]}},
+                    prefix="twitter.",
+                )
             else:
                 log.info("No twitter info for %s %s", cls_name, obj.name)
         else:
@@ -513,6 +524,50 @@ def every_minute_twitter_update():
         super(cls, obj).save()
 
 
+@app.task
+def every_minute_enrichment(batch_size=ENRICHMENT_BATCH_SIZE):
+    """Get missing data of saved objects in batches, see defer_enrichment."""
+    models = {"Athlete": Athlete, "League": League, "Team": Team}
+
+    for facet in ModelMixin.ENRICHMENT_METHODS:
+        queue = WorkQueue(ENRICHMENT_QUEUE.format(facet))
+
+        pks = defaultdict(list)
+        members = queue.pop(batch_size)
+        for member in members:
+            cls_name, pk = member.split("_")
+            pks[cls_name].append(int(pk))
+
+        # Objects which were deleted or got the data meanwhile are skipped.
+        objs = {}
+        for cls_name, ids in pks.items():
+            for obj in models[cls_name].objects.in_bulk(ids).values():
+                if facet in obj.get_missing_facets():
+                    objs[f"{cls_name}_{obj.pk}"] = obj
+        queue.done(*(member for member in members if member not in objs))
+
+        if facet in settings.RATE_LIMITS:
+            limit = TokenBucket(facet).acquire(len(objs))
+            # The rest waits for the next run.
+            queue.add(*list(objs)[limit:])
+            objs = dict(list(objs.items())[:limit])
+
+        for member, obj in objs.items():
+            try:
+                obj.enrich([facet])
+            except RequestException as e:
+                log.warning("%s: Skip %s enrichment for %s", repr(e), facet, obj.wiki)
+                queue.retry(member, ENRICHMENT_RETRY_DELAYS)
+                continue
+
+            obj.save(enrich=False)
+            if facet in obj.get_missing_facets():
+                log.info("No %s data for %s yet", facet, obj.wiki)
+                queue.retry(member, ENRICHMENT_RETRY_DELAYS)
+            else:
+                queue.done(member)
+
+
 @app.task
 def daily_update_notifications():
     """Send email to users about recent updates."""
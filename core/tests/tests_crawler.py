@@ -0,0 +1,40 @@
+import threading
+import time
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from core.crawler import crawl
+
+
+class CrawlerTest(SimpleTestCase):
+    def test_crawl_keeps_order_and_limits_hosts(self):
+        lock = threading.Lock()
+        active = {"count": 0, "max": 0}
+
+        def get(url, **kwargs):
+            with lock:
+                active["count"] += 1
+                active["max"] = max(active["max"], active["count"])
+            time.sleep(0.01)
+            with lock:
+                active["count"] -= 1
+
+            return mock.Mock(status_code=200, content=url)
+
+        urls = [f"https://en.wikipedia.org/wiki/Player_{i}" for i in range(12)]
+        with mock.patch("core.crawler.http_client.get", side_effect=get):
+            result = crawl(urls, lambda url, res: res.content, max_per_host=2)
+
+        self.assertEqual(list(result.keys()), urls)
+        self.assertEqual(list(result.values()), urls)
+        self.assertLessEqual(active["max"], 2)
+
+    def test_crawl_failed_callback(self):
+        def callback(url, res):
+            raise ValueError(url)
+
+        with mock.patch("core.crawler.http_client.get"):
+            result = crawl(["https://en.wikipedia.org/wiki/Player"], callback)
+
+        self.assertEqual(result, {"https://en.wikipedia.org/wiki/Player": None})
@@ -0,0 +1,63 @@
+import io
+from unittest import mock
+
+import requests
+from django.test import SimpleTestCase
+from urllib3 import HTTPResponse
+
+from core import http_client
+
+
+class HttpClientTest(SimpleTestCase):
+    def setUp(self):
+        # Fresh session and statistic for every test.
+        patcher = mock.patch.object(http_client, "_session", None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        http_client.get_metrics(reset=True)
+
+    def test_retry(self):
+        responses = [
+            HTTPResponse(body=io.BytesIO(b""), status=status, preload_content=False)
+            for status in (503, 429, 200)
+        ]
+        with mock.patch(
+            "urllib3.connectionpool.HTTPConnectionPool._make_request",
+            side_effect=responses,
+        ) as make_request, mock.patch("urllib3.util.retry.Retry.sleep"):
+            res = http_client.get("https://en.wikipedia.org/wiki/Player")
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(make_request.call_count, 3)
+        self.assertEqual(
+            http_client.get_metrics()["wikipedia"],
+            {"requests": 1, "errors": 0, "failures": 0, "seconds": mock.ANY},
+        )
+
+    def test_timeout(self):
+        with mock.patch(
+            "requests.adapters.HTTPAdapter.send",
+            side_effect=requests.exceptions.ReadTimeout,
+        ) as send:
+            with self.assertRaises(requests.exceptions.ReadTimeout):
+                http_client.get("https://newsapi.org/v2/everything?apiKey=secret")
+
+        self.assertEqual(send.call_args[1]["timeout"], http_client.TIMEOUT)
+        self.assertEqual(http_client.get_metrics()["newsapi"]["failures"], 1)
+
+    def test_metrics(self):
+        responses = []
+        for status in (200, 404):
+            res = requests.Response()
+            res.status_code = status
+            responses.append(res)
+
+        with mock.patch("requests.adapters.HTTPAdapter.send", side_effect=responses):
+            http_client.get("https://maps.googleapis.com/maps/api/geocode/json")
+            http_client.get("https://example.com/page", timeout=1)
+
+        metrics = http_client.get_metrics(reset=True)
+        self.assertEqual(metrics["geocoding"]["requests"], 1)
+        self.assertEqual(metrics["geocoding"]["errors"], 0)
+        self.assertEqual(metrics["example.com"]["errors"], 1)
+        self.assertEqual(http_client.get_metrics(), {})
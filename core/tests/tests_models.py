@@ -0,0 +1,610 @@
+import datetime
+import time
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from requests.exceptions import RequestException
+
+from core.constans import COUNTRIES
+from core.models import (
+    Athlete,
+    CountryStats,
+    GeocodeResult,
+    League,
+    Metric,
+    Profile,
+    Team,
+    TrendSnapshot,
+    WikiPage,
+    update_from_wiki,
+)
+from core.page_cache import get_page_data
+from core.queues import ENRICHMENT_QUEUE, WorkQueue
+from core.ratelimit import TokenBucket
+from core.tasks import (
+    ENRICHMENT_RETRY_DELAYS,
+    every_minute_enrichment,
+    parse_team,
+    weekly_trends_notifications,
+    weekly_youtube_update,
+)
+
+User = get_user_model()
+
+
+class MetricsTest(TestCase):
+    def setUp(self):
+        self.league = League(
+            wiki="https://en.wikipedia.org/wiki/Premier_League",
+            name="Premier League",
+            twitter_info={"updated": "2024-01-08 10:00:00"},
+            youtube_info={"updated": "2024-01-08 10:00:00"},
+        )
+
+    def test_metrics_of_new_object_saved_with_object(self):
+        self.league.save_metrics(
+            {
+                "2024-01-01": {"followers_count": 100},
+                "2024-01-08": {"followers_count": 150},
+            },
+            prefix="twitter.",
+        )
+        self.assertFalse(Metric.objects.exists())
+
+        self.league.save()
+
+        self.assertEqual(Metric.objects.count(), 2)
+        self.assertEqual(
+            self.league.get_twitter_stats,
+            [["2024-01-08", [150]], ["2024-01-01", [100]]],
+        )
+        self.assertEqual(self.league.get_twitter_trends, [["2024-01-08", [50]]])
+
+    def test_metrics_update(self):
+        self.league.save()
+        self.league.save_metrics({"2024-01-01": {"views": 5}}, prefix="wiki.")
+        self.league.save_metrics({"2024-01-01": {"views": 7}}, prefix="wiki.")
+
+        self.assertEqual(self.league.get_wiki_stats, [["2024-01-01", [7]]])
+        self.assertEqual(self.league.get_wiki_trends, [])
+
+    def test_awis_stats(self):
+        self.league.save()
+        views = {"total": 1.0, "US": 0.5, "GB": 0.2, "FR": 0.15, "DE": 0.1, "ES": 0.08}
+        self.league.save_metrics(
+            {
+                "2024-01-01": {**views, "IT": 0.05},
+                "2024-01-08": {"total": 2.0, "IT": 1.0, "US": 0.5},
+            },
+            prefix="site_views.",
+        )
+
+        # Countries are the top of the oldest day, they can have no views later.
+        stats = self.league.get_awis_stats
+        self.assertEqual([d for d, _ in stats], ["2024-01-08", "2024-01-01"])
+        self.assertEqual(
+            list(stats[0][1]),
+            ["total", *(COUNTRIES[code] for code in ("US", "GB", "FR", "DE", "ES"))],
+        )
+        self.assertEqual(stats[0][1][COUNTRIES["GB"]], 0)
+        self.assertEqual(stats[1][1]["total"], 232_000)
+
+    def test_page_data_cache(self):
+        self.league.save()
+        build = mock.Mock(side_effect=League.get_page_info)
+
+        get_page_data(self.league, build)
+        get_page_data(self.league, build)
+        self.assertEqual(build.call_count, 1)
+
+        self.league.save_metrics({"2024-01-01": {"views": 5}}, prefix="wiki.")
+        data = get_page_data(self.league, build)
+        self.assertEqual(build.call_count, 2)
+        self.assertEqual(data["wiki_stats"], [["2024-01-01", [5]]])
+
+    @override_settings(ENRICHMENT_SYNC=False)
+    def test_deferred_enrichment(self):
+        queue = WorkQueue(ENRICHMENT_QUEUE.format("youtube"))
+        self.addCleanup(queue._redis.delete, queue.key, queue.attempts_key)
+        self.league.youtube_info = {}
+
+        def get_youtube_info(league):
+            league.youtube_info = {"updated": "2024-01-08 10:00:00"}
+
+        with mock.patch.object(
+            League, "get_youtube_info", autospec=True, side_effect=get_youtube_info
+        ) as get_info:
+            self.league.save()
+            self.assertEqual(queue.pop(10), [f"League_{self.league.pk}"])
+            get_info.assert_not_called()
+
+            queue.add(f"League_{self.league.pk}")
+            every_minute_enrichment()
+            get_info.assert_called_once()
+
+        self.league.refresh_from_db()
+        self.assertTrue(self.league.youtube_info["updated"])
+        self.assertEqual(len(queue), 0)
+
+    @override_settings(ENRICHMENT_SYNC=False)
+    def test_failed_enrichment_is_retried(self):
+        queue = WorkQueue(ENRICHMENT_QUEUE.format("youtube"))
+        bucket = TokenBucket("youtube")
+        bucket._redis.delete(bucket.key)
+        self.addCleanup(queue._redis.delete, queue.key, queue.attempts_key, bucket.key)
+        self.league.youtube_info = {}
+        self.league.save()
+        done = League.objects.create(
+            wiki="https://en.wikipedia.org/wiki/La_Liga",
+            name="La Liga",
+            twitter_info={"updated": "2024-01-08 10:00:00"},
+            youtube_info={"updated": "2024-01-08 10:00:00"},
+        )
+        failed = f"League_{self.league.pk}"
+        queue.add(failed, f"League_{done.pk}")
+
+        start = time.time()
+        with mock.patch.object(
+            League, "get_youtube_info", side_effect=RequestException
+        ) as get_info:
+            every_minute_enrichment()
+
+        # Failed league is due in an hour, a token is spent only for it.
+        get_info.assert_called_once()
+        self.assertEqual(queue.pop(10), [])
+        self.assertEqual(len(queue), 1)
+        self.assertGreaterEqual(
+            queue._redis.zscore(queue.key, failed), start + ENRICHMENT_RETRY_DELAYS[0]
+        )
+        self.assertEqual(bucket.acquire(1000), bucket.capacity - 1)
+
+    def test_rate_limited_update_is_continued_later(self):
+        self.league.save()
+        team = Team.objects.create(
+            wiki="https://en.wikipedia.org/wiki/Team",
+            name="Team",
+            latitude=51.5,
+            longitude=-0.1,
+            twitter_info={"updated": "2024-01-08 10:00:00"},
+            youtube_info={"updated": "2024-01-08 10:00:00"},
+        )
+
+        with mock.patch.object(
+            TokenBucket, "acquire", side_effect=[1, 0]
+        ), mock.patch.object(League, "get_youtube_info") as get_info, mock.patch(
+            "core.tasks.weekly_youtube_update.apply_async"
+        ) as apply_async, mock.patch(
+            "time.sleep"
+        ) as sleep:
+            weekly_youtube_update()
+
+        # The worker isn't blocked, the team is updated by the next run.
+        get_info.assert_called_once()
+        apply_async.assert_called_once_with(([f"Team_{team.pk}"],), countdown=60)
+        sleep.assert_not_called()
+
+    def test_trend_snapshot(self):
+        self.league.save()
+        self.league.save_metrics(
+            {
+                "2024-01-01": {"followers_count": 100},
+                "2024-01-08": {"followers_count": 150},
+            },
+            prefix="twitter.",
+        )
+        self.league.save_metrics(
+            {"2024-01-15": {"followers_count": 140}}, prefix="twitter."
+        )
+
+        snapshot = TrendSnapshot.objects.get(
+            entity_type="league",
+            entity_id=self.league.pk,
+            metric="twitter.followers_count",
+        )
+        self.assertEqual(str(snapshot.date), "2024-01-15")
+        self.assertEqual((snapshot.latest, snapshot.previous), (140, 150))
+        self.assertEqual(snapshot.delta, -10)
+
+    def test_metrics_are_deleted_with_object(self):
+        self.league.save()
+        other = League.objects.create(
+            wiki="https://en.wikipedia.org/wiki/La_Liga",
+            name="La Liga",
+            twitter_info={"updated": "2024-01-08 10:00:00"},
+            youtube_info={"updated": "2024-01-08 10:00:00"},
+        )
+        for league in (self.league, other):
+            league.save_metrics({"2024-01-01": {"views": 5}}, prefix="wiki.")
+
+        self.league.delete()
+
+        for model in (Metric, TrendSnapshot):
+            self.assertEqual(
+                list(model.objects.values_list("entity_id", flat=True)), [other.pk]
+            )
+
+
+class TrendsNotificationsTest(TestCase):
+    def test_weekly_top(self):
+        today = timezone.localdate()
+        athletes = [
+            Athlete.objects.create(
+                wiki=f"https://en.wikipedia.org/wiki/Player_{i}",
+                name=f"Player {i}",
+                birthday=datetime.date(1990, 1, 1),
+                domestic_market="GB",
+                twitter_info={"updated": "2024-01-08 10:00:00"},
+                youtube_info={"updated": "2024-01-08 10:00:00"},
+            )
+            for i in range(2)
+        ]
+        # Not updated for a month and deleted athletes aren't in the top.
+        for entity_id, date, delta in (
+            (athletes[0].pk, today, 10),
+            (athletes[1].pk, today - datetime.timedelta(days=30), 100),
+            (0, today, 50),
+        ):
+            TrendSnapshot.objects.create(
+                entity_type="athlete",
+                entity_id=entity_id,
+                metric="twitter.followers_count",
+                date=date,
+                latest=1000,
+                previous=1000 - delta,
+                delta=delta,
+            )
+        user = User.objects.create_user("staff", "staff@test.com", is_staff=True)
+        Profile.objects.create(user=user)
+
+        with mock.patch("core.tasks.render_to_string", return_value="") as render:
+            weekly_trends_notifications()
+
+        top = render.call_args[0][1]["twitter_trends"]
+        self.assertEqual(top, [athletes[0]])
+        self.assertEqual(top[0].new_followers, 10)
+
+
+class SearchDocumentTest(TestCase):
+    def test_document_follows_base_model_save(self):
+        info = {
+            "twitter_info": {"updated": "2024-01-08 10:00:00"},
+            "youtube_info": {"updated": "2024-01-08 10:00:00"},
+        }
+        league = League.objects.create(
+            wiki="https://en.wikipedia.org/wiki/Ligue_1", name="Ligue 1", **info
+        )
+        team = Team.objects.create(
+            wiki="https://en.wikipedia.org/wiki/Team",
+            name="Team",
+            league=league,
+            latitude=48.8,
+            longitude=2.3,
+            **info,
+        )
+        self.assertEqual(team.search_document, "team ligue 1")
+        athlete = Athlete.objects.create(
+            wiki="https://en.wikipedia.org/wiki/Player",
+            name="Player",
+            birthday=datetime.date(2000, 1, 1),
+            team="Team",
+            team_model=team,
+            domestic_market="FR",
+            **info,
+        )
+        self.assertEqual(athlete.search_document, "player team ligue 1 france")
+
+        # Like admin update_location and Celery tasks do.
+        team.location_market = "FR"
+        super(Team, team).save()
+        league.name = "Ligue Un"
+        super(League, league).save()
+
+        team.refresh_from_db()
+        self.assertEqual(team.search_document, "team ligue un france")
+        athlete.refresh_from_db()
+        self.assertEqual(athlete.search_document, "player team ligue un france")
+
+
+class GeocodeResultTest(TestCase):
+    def setUp(self):
+        GeocodeResult._lru.clear()
+        self.addCleanup(GeocodeResult._lru.clear)
+
+    @mock.patch("core.models.http_client.get")
+    def test_geocode_cache(self, get):
+        get.return_value.status_code = 200
+        get.return_value.json.return_value = {"status": "ZERO_RESULTS", "results": []}
+
+        self.assertEqual(Athlete.geocode("São Paulo, Brazil")["results"], [])
+        self.assertEqual(Athlete.geocode(" sao paulo  brazil"), {"results": []})
+        self.assertEqual(get.call_count, 1)
+
+        # Other processes use the table.
+        GeocodeResult._lru.clear()
+        self.assertEqual(League.geocode("Sao Paulo, Brazil"), {"results": []})
+        self.assertEqual(get.call_count, 1)
+
+        get.return_value.json.return_value = {"status": "OVER_QUERY_LIMIT"}
+        Athlete.geocode("London")
+        Athlete.geocode("London")
+        self.assertEqual(get.call_count, 3)
+
+
+class WikiPageTest(TestCase):
+    def setUp(self):
+        self.url = "https://en.wikipedia.org/wiki/Premier_League"
+        patcher = mock.patch("core.models.http_client.get")
+        self.get = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.get.return_value.status_code = 200
+        self.get.return_value.headers = {"ETag": 'W/"1"'}
+        self.get.return_value.content = self.get_content(1, "a")
+
+    @staticmethod
+    def get_content(revision, request_id):
+        return (
+            f'<html><script>RLCONF={{"wgRequestId":"{request_id}",'
+            f'"wgRevisionId":{revision}}};</script></html>'
+        ).encode()
+
+    def test_conditional_fetch(self):
+        page, res = WikiPage.fetch(self.url)
+        self.assertIs(res, self.get.return_value)
+        self.assertEqual(page.revision, 1)
+        self.get.assert_called_with(self.url, headers={})
+        page.data = {"links": []}
+        page.save()
+
+        # The same revision, rendered by another request.
+        self.get.return_value.content = self.get_content(1, "b")
+        page, res = WikiPage.fetch(self.url)
+        self.assertIsNone(res)
+        self.get.assert_called_with(self.url, headers={"If-None-Match": 'W/"1"'})
+
+        self.get.return_value.status_code = 304
+        self.assertIsNone(WikiPage.fetch(self.url)[1])
+
+        self.get.return_value.status_code = 200
+        self.get.return_value.content = self.get_content(2, "c")
+        page, res = WikiPage.fetch(self.url)
+        self.assertIsNotNone(res)
+        self.assertEqual((page.revision, page.data), (2, {}))
+
+    def test_fetch_without_revision(self):
+        self.get.return_value.content = b"<html></html>"
+        page, res = WikiPage.fetch(self.url)
+        self.assertIsNone(page.revision)
+        page.save()
+
+        self.assertIsNone(WikiPage.fetch(self.url)[1])
+        self.get.return_value.content = b"<html>changed</html>"
+        self.assertIsNotNone(WikiPage.fetch(self.url)[1])
+
+    def test_parse_team_crawls_links_of_not_changed_page(self):
+        url = "https://en.wikipedia.org/wiki/Team"
+        links = ["https://en.wikipedia.org/wiki/Player"]
+        WikiPage.objects.create(
+            url=url, revision=1, data={"name": "Team", "links": links}
+        )
+
+        with mock.patch("core.tasks.get_soup") as soup, mock.patch(
+            "core.tasks.crawl_athletes", return_value={}
+        ) as crawl, mock.patch.object(Team, "enrich"):
+            parse_team({"wiki": url, "category": "Soccer"})
+
+        soup.assert_not_called()
+        crawl.assert_called_once_with(links, mock.ANY, False)
+        self.assertEqual(crawl.call_args[0][1]["team_model"].name, "Team")
+
+    def test_not_changed_page_is_not_parsed(self):
+        league = League(
+            wiki=self.url,
+            name="Premier League",
+            additional_info={"Founded": "1992"},
+            twitter_info={"updated": "2024-01-08 10:00:00"},
+            youtube_info={"updated": "2024-01-08 10:00:00"},
+        )
+        league.save()
+        WikiPage.fetch(self.url)[0].save()
+
+        self.get.return_value.status_code = 304
+        with mock.patch("core.models.get_soup") as soup:
+            self.assertEqual(league.get_data_from_wiki(), {"Founded": "1992"})
+            soup.assert_not_called()
+
+    def test_update_from_wiki(self):
+        league = League.objects.create(
+            wiki=self.url,
+            name="Premier League",
+            twitter_info={"updated": "2024-01-08 10:00:00"},
+            youtube_info={"updated": "2024-01-08 10:00:00"},
+        )
+        WikiPage.fetch(self.url)[0].save()
+
+        with mock.patch(
+            "core.models.wikipedia.get_revisions", return_value={self.url: 2}
+        ), mock.patch.object(League, "save") as save:
+            # The rendered page is still of the parsed revision.
+            update_from_wiki([league])
+
+            # The new revision isn't parsed, there is no infobox.
+            self.get.return_value.content = self.get_content(2, "b")
+            update_from_wiki([league])
+
+        save.assert_not_called()
+        self.assertEqual(WikiPage.objects.get(url=self.url).revision, 1)
+
+
+class CountryStatsTest(TestCase):
+    def setUp(self):
+        self.athlete = Athlete.objects.create(
+            wiki="https://en.wikipedia.org/wiki/Player",
+            name="Player",
+            birthday=datetime.date(1990, 1, 1),
+            gender="male",
+            category="Soccer",
+            domestic_market="GB",
+            location_market="GB",
+            twitter=100,
+            twitter_info={"updated": "2024-01-08 10:00:00"},
+            youtube_info={"updated": "2024-01-08 10:00:00"},
+        )
+
+    def get_stats(self):
+        return list(
+            CountryStats.objects.filter(athletes__gt=0)
+            .order_by("country")
+            .values_list("country", "category", "gender", "athletes", "twitter")
+        )
+
+    def test_country_stats_follow_athlete(self):
+        self.assertEqual(self.get_stats(), [("GB", "Soccer", "male", 1, 100)])
+
+        athlete = Athlete.objects.get(id=self.athlete.id)
+        athlete.location_market = "FR"
+        athlete.twitter = 150
+        super(Athlete, athlete).save()
+
+        self.assertEqual(self.get_stats(), [("FR", "Soccer", "male", 1, 150)])
+        self.assertEqual(
+            CountryStats.get_stats(country="FR"),
+            [
+                {
+                    "category": "Soccer",
+                    "athletes": 1,
+                    "twitter": 150,
+                    "birthday": datetime.date(1990, 1, 1),
+                }
+            ],
+        )
+
+        stats = self.get_stats()
+        CountryStats.rebuild()
+        self.assertEqual(self.get_stats(), stats)
+
+        Athlete.objects.all().delete()
+        self.assertEqual(self.get_stats(), [])
+
+    def test_athlete_is_saved_with_country_stats(self):
+        self.athlete.location_market = "FR"
+        with mock.patch.object(CountryStats, "apply", side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                self.athlete.save(enrich=False)
+
+        # Rebuild can't see the athlete change without its statistic.
+        self.assertEqual(Athlete.objects.get().location_market, "GB")
+        self.assertEqual(self.get_stats(), [("GB", "Soccer", "male", 1, 100)])
+
+    def test_bulk_upsert(self):
+        info = {
+            "twitter_info": {"updated": "2024-01-08 10:00:00"},
+            "youtube_info": {"updated": "2024-01-08 10:00:00"},
+        }
+        new = {
+            "name": "New Player",
+            "birthday": datetime.date(2000, 1, 1),
+            "gender": "male",
+            "category": "Soccer",
+            "domestic_market": "FR",
+            "location_market": "GB",
+            **info,
+        }
+        records = [
+            (self.athlete.wiki, {"name": "Other", "team": "Team", "gender": ""}),
+            ("https://en.wikipedia.org/wiki/New_Player", new),
+            ("https://en.wikipedia.org/wiki/No_Birthday", {"name": "Player", **info}),
+        ]
+
+        # 6 queries and the savepoint of the transaction.
+        with self.assertNumQueries(8):
+            athletes = Athlete.bulk_upsert(records)
+
+        self.assertEqual(list(athletes), [wiki for wiki, _ in records])
+        self.assertIsNone(athletes["https://en.wikipedia.org/wiki/No_Birthday"])
+
+        athlete = Athlete.objects.get(id=self.athlete.id)
+        self.assertEqual((athlete.name, athlete.team), ("Player", "Team"))
+        self.assertIn("team", athlete.search_document)
+        self.assertGreater(athlete.updated, self.athlete.updated)
+
+        athlete = Athlete.objects.get(wiki="https://en.wikipedia.org/wiki/New_Player")
+        self.assertEqual(athlete.name, "New Player")
+        self.assertEqual(self.get_stats(), [("GB", "Soccer", "male", 2, 100)])
+
+    def test_bulk_upsert_athlete_added_meanwhile(self):
+        info = {
+            "twitter_info": {"updated": "2024-01-08 10:00:00"},
+            "youtube_info": {"updated": "2024-01-08 10:00:00"},
+        }
+        team = Team.objects.create(
+            wiki="https://en.wikipedia.org/wiki/Team",
+            name="Team",
+            latitude=51.5,
+            longitude=-0.1,
+            **info,
+        )
+        new = {
+            "name": "New Player",
+            "birthday": datetime.date(2000, 1, 1),
+            "gender": "male",
+            "category": "Soccer",
+            "location_market": "FR",
+            "team": "Other Team",
+            **info,
+        }
+
+        def prepare(athletes):
+            # Another worker adds the athlete before the insert.
+            Athlete.objects.create(
+                wiki=athletes[0].wiki,
+                name="Player Two",
+                birthday=datetime.date(2000, 1, 1),
+                domestic_market="GB",
+                gender="male",
+                category="Soccer",
+                location_market="GB",
+                team_model=team,
+                **info,
+            )
+            return athletes
+
+        wiki = "https://en.wikipedia.org/wiki/Player_Two"
+        with mock.patch("core.models.invalidate_page") as invalidate:
+            athletes = Athlete.bulk_upsert([(wiki, new)], prepare=prepare)
+
+        # Only empty fields of the stored athlete are filled.
+        athlete = Athlete.objects.get(wiki=wiki)
+        self.assertEqual(athletes[wiki].pk, athlete.pk)
+        self.assertEqual(
+            (athlete.name, athlete.location_market, athlete.team),
+            ("Player Two", "GB", "Other Team"),
+        )
+        self.assertEqual(athlete.team_model, team)
+        self.assertEqual(self.get_stats(), [("GB", "Soccer", "male", 2, 100)])
+        self.assertIn(team.pk, invalidate.call_args[0])
+
+    def test_bulk_upsert_athlete_deleted_meanwhile(self):
+        bulk_create = Athlete.objects.bulk_create
+
+        def create_and_delete(objs, **kwargs):
+            # Another worker deletes the athlete right after the insert.
+            bulk_create(objs, **kwargs)
+            Athlete.objects.filter(wiki=objs[0].wiki).delete()
+
+        new = {
+            "name": "New Player",
+            "birthday": datetime.date(2000, 1, 1),
+            "domestic_market": "FR",
+            "twitter_info": {"updated": "2024-01-08 10:00:00"},
+            "youtube_info": {"updated": "2024-01-08 10:00:00"},
+        }
+        wiki = "https://en.wikipedia.org/wiki/New_Player"
+        with mock.patch.object(
+            Athlete.objects, "bulk_create", side_effect=create_and_delete
+        ):
+            athletes = Athlete.bulk_upsert([(wiki, new)])
+
+        self.assertEqual(athletes, {wiki: None})
+        self.assertFalse(Athlete.objects.filter(wiki=wiki).exists())
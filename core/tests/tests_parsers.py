@@ -0,0 +1,77 @@
+from unittest import skipUnless
+
+from bs4 import BeautifulSoup
+from django.test import TestCase
+
+from core.benchmarks import load_corpus, load_page, parse_page
+from core.models import WIKI_REVISION_RE, Athlete, League, Team, WikiPage
+from core.parsers import INFOBOX, PARSER, get_soup
+from core.rosters import get_roster_rule
+
+
+class ParsersTest(TestCase):
+    def parse(self, model, name, soup):
+        obj = model(wiki=f"https://en.wikipedia.org/wiki/{name}")
+        if model is Team:
+            obj.league = League()
+        info = obj.get_data_from_wiki(soup)
+
+        return obj.name, obj.photo, info
+
+    def test_infobox_parsing(self):
+        for name, model in (("athlete", Athlete), ("team", Team), ("league", League)):
+            with self.subTest(name):
+                content = load_page(f"{name}.html")
+                data = self.parse(model, name, get_soup(content, INFOBOX))
+                self.assertEqual(
+                    data, self.parse(model, name, BeautifulSoup(content, "html.parser"))
+                )
+                self.assertTrue(data[2])
+
+    def test_corpus(self):
+        for entry in load_corpus():
+            with self.subTest(entry["page"], parser=entry["parser"]):
+                self.assertEqual(parse_page(entry), entry["expected"])
+
+    def test_corpus_pages_are_parsed_again(self):
+        # Saved data of the same page revision doesn't replace the parsing.
+        for entry in load_corpus():
+            WikiPage.objects.update_or_create(
+                url=entry["url"],
+                defaults={
+                    "revision": int(WIKI_REVISION_RE.search(entry["content"])[1]),
+                    "data": {"name": "Team", "links": []},
+                },
+            )
+
+        for entry in load_corpus():
+            with self.subTest(entry["page"], parser=entry["parser"]):
+                self.assertEqual(parse_page(entry), entry["expected"])
+
+    @skipUnless(PARSER == "lxml", "lxml isn't installed")
+    def test_roster_links_with_lxml(self):
+        for entry in load_corpus():
+            if entry["parser"] != "roster":
+                continue
+
+            with self.subTest(entry["page"]):
+                rule = get_roster_rule(entry["category"])
+                links = {}
+                for parser in ("lxml", "html.parser"):
+                    soup = BeautifulSoup(entry["content"], parser)
+                    links[parser] = [
+                        (link["href"], link.string)
+                        for link in rule.get_links(rule.find_table(soup))
+                    ]
+
+                self.assertTrue(links["html.parser"])
+                self.assertEqual(links["lxml"], links["html.parser"])
+
+    def test_navigation_infobox_is_skipped(self):
+        soup = get_soup(
+            '<div role="navigation"><table class="infobox vcard"></table></div>'
+            '<p><table class="wikitable vcard"></table></p>',
+            INFOBOX,
+        )
+        self.assertEqual(len(soup.find_all("table")), 2)
+        self.assertIsNone(self.parse(Athlete, "athlete", soup)[2])
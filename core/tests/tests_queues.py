@@ -0,0 +1,59 @@
+import time
+
+from django.test import SimpleTestCase
+
+from core.queues import WorkQueue
+from core.ratelimit import TokenBucket
+
+
+class WorkQueueTest(SimpleTestCase):
+    def setUp(self):
+        self.queue = WorkQueue("test")
+        self.addCleanup(
+            self.queue._redis.delete, self.queue.key, self.queue.attempts_key
+        )
+
+    def test_pop_due_members_once(self):
+        self.queue.add("League_1", "Team_2")
+        self.queue.add("League_1")
+        self.queue.add("Athlete_3", due=1e12)  # far in the future
+
+        self.assertEqual(len(self.queue), 3)
+        self.assertEqual(self.queue.count_due(), 2)
+        self.assertEqual(sorted(self.queue.pop(10)), ["League_1", "Team_2"])
+        self.assertEqual(self.queue.pop(10), [])
+        self.assertEqual(len(self.queue), 1)
+
+    def test_retry_with_backoff(self):
+        delays = (60, 3600)
+        self.assertTrue(self.queue.retry("League_1", delays))
+        self.assertEqual(self.queue.count_due(), 0)
+        self.assertEqual(self.queue.pop(10), [])
+
+        self.queue._redis.zadd(self.queue.key, {"League_1": 0})  # due now
+        self.assertEqual(self.queue.pop(10), ["League_1"])
+        self.assertTrue(self.queue.retry("League_1", delays))
+        self.assertGreater(
+            self.queue._redis.zscore(self.queue.key, "League_1"), time.time() + 60
+        )
+
+        # No attempts left.
+        self.queue._redis.zrem(self.queue.key, "League_1")
+        self.assertFalse(self.queue.retry("League_1", delays))
+        self.assertEqual(len(self.queue), 0)
+
+        # Attempts start over after the job is done.
+        self.queue.done("League_1")
+        self.assertTrue(self.queue.retry("League_1", delays))
+
+
+class TokenBucketTest(SimpleTestCase):
+    def setUp(self):
+        self.bucket = TokenBucket("test", capacity=3, period=3600)
+        self.addCleanup(self.bucket._redis.delete, self.bucket.key)
+
+    def test_acquire_up_to_capacity(self):
+        self.assertEqual(self.bucket.acquire(2), 2)
+        self.assertEqual(self.bucket.acquire(2), 1)
+        self.assertEqual(self.bucket.acquire(), 0)
+        self.assertFalse(self.bucket.wait(timeout=0.01))
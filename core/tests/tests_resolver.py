@@ -0,0 +1,20 @@
+from django.test import SimpleTestCase
+
+from core.constans import COUNTRIES
+from core.resolver import match_categories, match_countries
+
+
+class ResolverTest(SimpleTestCase):
+    def test_match_countries(self):
+        for text in ("", "a", "Un", "united", "Kingdom of", "xyz"):
+            expected = [
+                code for code, name in COUNTRIES.items() if text.lower() in name.lower()
+            ]
+            self.assertEqual(match_countries(text), expected)
+
+        self.assertEqual(match_countries("aland"), ["AX", "NZ"])  # accents
+        self.assertEqual(match_countries("swiss"), ["CH"])  # aliases
+
+    def test_match_categories(self):
+        self.assertEqual(match_categories("nba"), ["Basketball"])
+        self.assertEqual(match_categories("hock"), ["Ice Hockey"])
@@ -0,0 +1,44 @@
+from django.test import SimpleTestCase
+
+from core.benchmarks import load_page
+from core.parsers import get_soup
+from core.rosters import get_roster_rule
+
+
+class RostersTest(SimpleTestCase):
+    def test_default_rule(self):
+        soup = get_soup(load_page("team.html"))
+
+        rule = get_roster_rule("Soccer")
+        links = rule.get_links(rule.find_table(soup))
+
+        # Players of the first-team squad (not on loan) and England nations.
+        self.assertEqual(len(links), 11)
+        self.assertEqual(links[0]["href"], "/wiki/David_Raya")
+
+    def test_category_rule(self):
+        soup = get_soup(
+            '<h2><span id="Players">Players</span></h2><table></table>'
+            '<h2><span id="Current_roster">Roster</span></h2>'
+            "<div><table><tr><td><ul><li><a href='/wiki/A_B'>A B</a></li>"
+            "<li><a href='/wiki/C_D'>C D</a></li></ul></td></tr></table></div>"
+        )
+
+        rule = get_roster_rule("Handball")
+        links = rule.get_links(rule.find_table(soup))
+
+        self.assertEqual([link.string for link in links], ["A B", "C D"])
+        self.assertIsNone(get_roster_rule("Soccer").find_table(get_soup("<p></p>")))
+
+    def test_player_link_next_to_other_links(self):
+        soup = get_soup(
+            '<div><h2 id="Players">Players</h2></div><table><tr><td>8</td><td>MF</td>'
+            "<td><a href='/wiki/Norway'>Norway</a></td><td>"
+            "<span class='fn'><a href='/wiki/Martin_Odegaard'>Martin Odegaard</a>"
+            "</span> (<a href='/wiki/Captain'>captain</a>)</td></tr></table>"
+        )
+
+        rule = get_roster_rule("Soccer")
+        links = rule.get_links(rule.find_table(soup))
+
+        self.assertEqual([link.string for link in links], ["Martin Odegaard"])
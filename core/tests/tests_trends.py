@@ -0,0 +1,47 @@
+from django.test import SimpleTestCase
+
+from core.trends import Series
+
+
+class SeriesTest(SimpleTestCase):
+    def test_series(self):
+        history = {
+            "2024-01-15": {"followers": 120.0, "views": 7.0},
+            "2024-01-08": {"followers": 100.0},
+            "2024-01-01": {"followers": 80.0, "views": 5.0},
+        }
+        series = Series.from_history(history, "followers", "views")
+
+        # Missing views are the previous ones, not zero.
+        self.assertEqual(
+            series.stats(),
+            [
+                ["2024-01-15", [120, 7]],
+                ["2024-01-08", [100, 5]],
+                ["2024-01-01", [80, 5]],
+            ],
+        )
+        self.assertEqual(
+            series.deltas(), [["2024-01-15", [20, 2]], ["2024-01-08", [20, 0]]]
+        )
+        self.assertEqual(series.change(), ("2024-01-08", 20.0))
+        self.assertEqual(series.change(1), ("2024-01-08", 40.0))
+        self.assertEqual(
+            series.rolling(2), [["2024-01-15", 110.0], ["2024-01-08", 90.0]]
+        )
+        self.assertEqual(len(history["2024-01-08"]), 1)  # history isn't changed
+
+        # Dates before the first views are skipped, unless there is a default.
+        history["2024-01-01"].pop("views")
+        self.assertEqual(
+            Series.from_history(history, "followers", "views").stats(),
+            [["2024-01-15", [120, 7]]],
+        )
+        self.assertEqual(
+            Series.from_history(history, "followers", "views", default=0).deltas(),
+            [["2024-01-15", [20, 7]], ["2024-01-08", [20, 0]]],
+        )
+
+        empty = Series.from_history({}, "followers")
+        self.assertEqual((empty.stats(), empty.deltas()), ([], []))
+        self.assertEqual((empty.change(), empty.rolling(2)), ((False, 0), []))
@@ -0,0 +1,120 @@
+import datetime
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import RequestFactory, TestCase
+from django.urls import reverse
+
+from core.models import Athlete
+from core.views.api import _athletes_api, _encode_cursor
+
+User = get_user_model()
+
+
+class AthletesApiTest(TestCase):
+    def setUp(self):
+        cache.delete("count_athletes")
+
+        for i in range(7):
+            Athlete.objects.create(
+                wiki=f"https://en.wikipedia.org/wiki/Player_{i}",
+                name=f"Player {i}",
+                birthday=datetime.date(1990, 1, 1),
+                domestic_market="GB",
+                location_market="GB",
+                twitter=None if i % 3 == 0 else 100 * (i % 2),
+                twitter_info={"updated": "2024-01-08 10:00:00"},
+                youtube_info={"updated": "2024-01-08 10:00:00"},
+            )
+
+    def get_page(self, **params):
+        params = {
+            "columns[0][name]": "",
+            "columns[0][data]": "twitter",
+            "order[0][column]": "0",
+            "order[0][dir]": "desc",
+            "length": "3",
+            **params,
+        }
+        request = RequestFactory().get("/api/athletes", params)
+
+        return _athletes_api(request)
+
+    def test_keyset_pagination(self):
+        expected = sorted(
+            Athlete.objects.all(),
+            key=lambda obj: (obj.twitter is None, -(obj.twitter or 0), obj.pk),
+        )
+
+        pks = []
+        page = self.get_page(cursor="")
+        while True:
+            self.assertEqual(page["recordsTotal"], 7)
+            pks += [row["pk"] for row in page["data"]]
+            if not page["next_cursor"]:
+                break
+
+            page = self.get_page(cursor=page["next_cursor"])
+
+        self.assertEqual(pks, [obj.pk for obj in expected])
+
+    def test_not_valid_cursor(self):
+        first = self.get_page(cursor="")
+        self.assertEqual(self.get_page(cursor="not valid")["data"], first["data"])
+
+        keys = [["twitter", True], ["id", False]]
+        for cursor in ([keys, 5], [keys, None], ["keys", [1, 2]]):
+            with self.subTest(cursor):
+                cursor = _encode_cursor(*cursor)
+                self.assertEqual(self.get_page(cursor=cursor)["data"], first["data"])
+
+    def test_export(self):
+        self.client.force_login(User.objects.create_user("user"))
+        athletes = Athlete.objects.order_by("pk")
+
+        resp = self.client.get(
+            reverse("core:athletes_export"),
+            {"ids": f"{athletes[1].pk},{athletes[0].pk}"},
+        )
+        lines = b"".join(resp.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0].split(",")[:2], ["name", "domestic_market"])
+        self.assertEqual(
+            [line.split(",")[0] for line in lines[1:]], ["Player 0", "Player 1"]
+        )
+
+        resp = self.client.get(
+            reverse("core:athletes_export"),
+            {
+                "columns[0][name]": "",
+                "columns[0][data]": "name",
+                "order[0][column]": "0",
+                "order[0][dir]": "desc",
+            },
+        )
+        lines = b"".join(resp.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 8)
+        self.assertEqual(lines[1].split(",")[0], "Player 6")
+
+    def test_search(self):
+        athlete = Athlete.objects.get(name="Player 3")
+        athlete.name = "Zoë Player"
+        athlete.save()
+
+        page = self.get_page(**{"search[value]": "zoe KINGDOM"})
+        self.assertEqual([row["pk"] for row in page["data"]], [athlete.pk])
+        self.assertEqual(page["recordsFiltered"], 1)
+
+    @mock.patch("core.autocomplete._find", return_value=["Player 1"])
+    def test_autocomplete(self, find):
+        self.client.force_login(User.objects.create_user("user"))
+        url = reverse("core:autocomplete_api", args=["athlete"])
+
+        resp = self.client.get(url, {"q": "Player", "fields": "name"})
+        self.assertEqual(resp.json(), ["Player 1"])
+        self.client.get(url, {"q": "Player", "fields": "name"})
+        self.assertEqual(find.call_count, 1)  # cached
+
+        Athlete.objects.first().save()
+        self.client.get(url, {"q": "Player", "fields": "name"})
+        self.assertEqual(find.call_count, 2)
@@ -1,8 +1,19 @@
+import datetime
+
 from django.contrib.auth import get_user_model
 from django.test import TestCase
 from django.urls import reverse
 
-from core.models import Profile
+from core.models import (
+    Athlete,
+    AthletesList,
+    League,
+    LeaguesList,
+    Profile,
+    Team,
+    TeamsList,
+)
+from core.page_cache import invalidate_page
 
 User = get_user_model()
 
@@ -28,6 +39,31 @@ class AthletesViewTest(TestCase):
         resp = self.client.get(reverse("core:team_parse"))
         self.assertEqual(resp.status_code, 302)
 
+    def test_views_team_detail_page(self):
+        team = Team.objects.create(
+            wiki="https://en.wikipedia.org/wiki/Team",
+            name="Team",
+            latitude=51.5,
+            longitude=-0.1,
+            twitter_info={"updated": "2024-01-08 10:00:00"},
+            youtube_info={"updated": "2024-01-08 10:00:00"},
+        )
+        Athlete.objects.create(
+            wiki="https://en.wikipedia.org/wiki/Player",
+            name="Player",
+            birthday=datetime.date(1990, 1, 1),
+            domestic_market="GB",
+            location_market="GB",
+            team_model=team,
+            twitter_info={"updated": "2024-01-08 10:00:00"},
+            youtube_info={"updated": "2024-01-08 10:00:00"},
+        )
+
+        self.client.login(username="testuser", password=self.password)
+        resp = self.client.get(reverse("core:team", args=[team.pk]))
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.context["age_dataset"]["datasets"][0]["data"], [1])
+
     def test_views_league_page(self):
         resp = self.client.get(reverse("core:league_parse"))
         self.assertRedirects(resp, "/admin/login/?next=/league")
@@ -89,3 +125,111 @@ class AthletesViewTest(TestCase):
         self.client.login(username="testuser", password=self.password)
         resp = self.client.get(reverse("core:logout"))
         self.assertRedirects(resp, reverse("core:login"))
+
+
+class EntityPagesTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        info = {
+            "twitter_info": {"updated": "2024-01-08 10:00:00"},
+            "youtube_info": {"updated": "2024-01-08 10:00:00"},
+        }
+        cls.league = League.objects.create(
+            wiki="https://en.wikipedia.org/wiki/League", name="League", **info
+        )
+        cls.team = Team.objects.create(
+            wiki="https://en.wikipedia.org/wiki/Team",
+            name="Team",
+            league=cls.league,
+            latitude=51.5,
+            longitude=-0.1,
+            **info,
+        )
+        cls.athletes = [
+            Athlete.objects.create(
+                wiki=f"https://en.wikipedia.org/wiki/Player_{i}",
+                name=f"Player {i}",
+                birthday=datetime.date(1990, 1, 1),
+                domestic_market="GB",
+                location_market="GB",
+                team_model=cls.team,
+                **info,
+            )
+            for i in range(4)
+        ]
+        cls.teams = [
+            cls.team,
+            Team.objects.create(
+                wiki="https://en.wikipedia.org/wiki/Team_2",
+                name="Team 2",
+                latitude=51.5,
+                longitude=-0.1,
+                **info,
+            ),
+        ]
+
+        cls.user = User.objects.create_user(username="testuser")
+        Profile.objects.create(user=cls.user)
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def assertPageQueries(self, url, num):
+        """The number of queries doesn't depend on the number of user lists."""
+        self.client.get(url)  # cache page data
+
+        for i in range(3):
+            AthletesList.objects.create(name=str(i), user=self.user).athletes.add(
+                *self.athletes
+            )
+            TeamsList.objects.create(name=str(i), user=self.user).teams.add(*self.teams)
+            LeaguesList.objects.create(name=str(i), user=self.user).leagues.add(
+                self.league
+            )
+
+            with self.assertNumQueries(num):
+                resp = self.client.get(url)
+            self.assertEqual(resp.status_code, 200)
+
+        return resp
+
+    def assertCompareQueries(self, url, objs, num):
+        """Not cached objects are loaded with a fixed number of queries."""
+        for i in range(2, len(objs) + 1):
+            invalidate_page(objs[0]._meta.model_name, *[obj.pk for obj in objs])
+
+            ids = ",".join(str(obj.pk) for obj in objs[:i])
+            with self.assertNumQueries(num):
+                resp = self.client.get(f"{url}?ids={ids}")
+            self.assertEqual(resp.status_code, 200)
+
+        self.assertEqual(self.client.get(f"{url}?ids={objs[0].pk}").status_code, 400)
+
+        return f"{url}?ids={ids}"
+
+    def test_athlete_page(self):
+        resp = self.assertPageQueries(reverse("core:athlete", args=["Player_0"]), 4)
+        lists = resp.context["athlete"].user_athletes_lists
+        self.assertTrue(all(athletes_list.selected for athletes_list in lists))
+
+    def test_compare_athletes_page(self):
+        url = self.assertCompareQueries(
+            reverse("core:compare_athletes"), self.athletes, 5
+        )
+        resp = self.assertPageQueries(url, 4)
+        self.assertEqual(resp.context["athletes"], self.athletes)
+
+    def test_compare_teams_page(self):
+        url = self.assertCompareQueries(reverse("core:compare_teams"), self.teams, 6)
+        resp = self.assertPageQueries(url, 4)
+        self.assertEqual(
+            [team.age_dataset["datasets"][0]["data"] for team in resp.context["teams"]],
+            [[4], []],
+        )
+
+    def test_team_page(self):
+        resp = self.assertPageQueries(reverse("core:team", args=[self.team.pk]), 7)
+        self.assertEqual(resp.context["age_dataset"]["datasets"][0]["data"], [4])
+
+    def test_league_page(self):
+        self.assertPageQueries(reverse("core:league", args=[self.league.pk]), 5)
@@ -0,0 +1,59 @@
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from core import wikipedia
+
+
+def response(data):
+    res = mock.Mock(status_code=200)
+    res.json.return_value = data
+    return res
+
+
+class WikipediaTest(SimpleTestCase):
+    def test_titles_are_queried_in_batches(self):
+        urls = [f"https://en.wikipedia.org/wiki/Player_{i}" for i in range(60)]
+
+        def get(url, params):
+            titles = params["titles"].split("|")
+            pages = [{"title": t, "revisions": [{"revid": 1}]} for t in titles]
+            return response({"query": {"pages": pages}})
+
+        with mock.patch("core.wikipedia.http_client.get", side_effect=get) as api:
+            revisions = wikipedia.get_revisions(urls)
+
+        self.assertEqual(api.call_count, 2)
+        self.assertEqual(api.call_args[0][0], "https://en.wikipedia.org/w/api.php")
+        self.assertEqual(revisions, dict.fromkeys(urls, 1))
+
+    def test_pageviews(self):
+        url = "https://en.wikipedia.org/wiki/Kylian_Mbapp%C3%A9"
+        responses = [
+            response(
+                {
+                    "continue": {"continue": "||"},
+                    "query": {
+                        "redirects": [{"from": "Kylian Mbappé", "to": "Mbappé"}],
+                        "pages": [{"title": "Mbappé", "pageviews": {"2024-01-01": 10}}],
+                    },
+                }
+            ),
+            response(
+                {
+                    "query": {
+                        "pages": [
+                            {
+                                "title": "Mbappé",
+                                "pageviews": {"2024-01-02": 20, "2024-01-03": None},
+                            }
+                        ]
+                    }
+                }
+            ),
+        ]
+
+        with mock.patch("core.wikipedia.http_client.get", side_effect=responses):
+            views = wikipedia.get_pageviews([url])
+
+        self.assertEqual(views, {url: {"2024-01-01": 10, "2024-01-02": 20}})
@@ -0,0 +1,74 @@
+"""Statistic histories as date indexed numeric columns."""
+
+from itertools import islice
+from operator import sub
+
+
+class Series:
+    """Values of metrics by date (newest first), computed values are new lists."""
+
+    __slots__ = ("dates", "columns")
+
+    def __init__(self, dates, columns):
+        self.dates = tuple(dates)
+        self.columns = tuple(tuple(column) for column in columns)
+
+    @classmethod
+    def from_history(cls, history, *metrics, cast=int, default=None):
+        """
+        Series of the metrics from {date: {metric: value}}, newest first.
+
+        A missing value is the default, or without it the previous value of
+        the metric (dates before the first values of all metrics are skipped).
+        """
+        dates, columns = [], [[] for _ in metrics]
+        last = dict.fromkeys(metrics, default)
+        for date in reversed(history):
+            for metric in metrics:
+                value = history[date].get(metric, default)
+                if value is not None:
+                    last[metric] = value
+
+            if None not in last.values():
+                dates.append(date)
+                for column, metric in zip(columns, metrics):
+                    column.append(cast(last[metric]))
+
+        return cls(reversed(dates), (reversed(column) for column in columns))
+
+    def __len__(self):
+        return len(self.dates)
+
+    def _rows(self, dates, columns):
+        return [[d, list(values)] for d, values in zip(dates, zip(*columns))]
+
+    def stats(self):
+        """[[date, [values]]], newest first."""
+        return self._rows(self.dates, self.columns)
+
+    def deltas(self):
+        """[[date, [differences with the previous date]]], newest first."""
+        return self._rows(
+            self.dates,
+            (map(sub, column, islice(column, 1, None)) for column in self.columns),
+        )
+
+    def change(self, column=0):
+        """(previous date, percentage change of the latest value) or (False, 0)."""
+        values = self.columns[column] if self.columns else ()
+        if len(values) < 2 or values[1] == 0:
+            return False, 0
+
+        return self.dates[1], round((values[0] - values[1]) / values[1] * 100, 1)
+
+    def rolling(self, window, column=0):
+        """[[date, mean of the window ending at the date]], newest first."""
+        values = self.columns[column] if self.columns else ()
+        means = []
+        total = sum(values[:window])
+        for i in range(len(values) - window + 1):
+            if i:
+                total += values[i + window - 1] - values[i - 1]
+            means.append([self.dates[i], total / window])
+
+        return means
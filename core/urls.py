@@ -24,6 +24,7 @@ from core.views.pages import (
     country_page,
     ProfileView,
     compare_athletes_page,
+    compare_teams_page,
     teams_page,
 )
 
@@ -36,6 +37,7 @@ urlpatterns = [
     path("athletes_list", athletes_list_api, name="athletes_list"),
     path("athlete/<str:slug>", athlete_page, name="athlete"),
     path("compare/athletes", compare_athletes_page, name="compare_athletes"),
+    path("compare/teams", compare_teams_page, name="compare_teams"),
     path("api/athletes_list", add_athlete_to_lists_api, name="athletes_list"),
     path("team/<int:pk>", team_page, name="team"),
     path("league/<int:pk>", league_page, name="league"),
@@ -1,17 +1,22 @@
+import base64
 import csv
 import datetime
+import functools
+import hashlib
+import itertools
 import json
 import logging
 
 from django.contrib.auth.decorators import login_required
-from django.contrib.postgres.search import TrigramSimilarity
-from django.core import serializers
-from django.db.models import Case, CharField, F, Q, When
-from django.db.models.functions import Greatest
-from django.http import Http404, HttpResponse, JsonResponse, QueryDict
+from django.core.cache import cache
+from django.core.exceptions import FieldDoesNotExist, FieldError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import F, Q
+from django.http import Http404, JsonResponse, QueryDict, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
+from django.utils import translation
 
-from core.constans import CATEGORIES, COUNTRIES
+from core.autocomplete import autocomplete
 from core.forms import AthletesListForm
 from core.models import (
     Athlete,
@@ -22,42 +27,108 @@ from core.models import (
     Team,
     TeamsList,
 )
+from core.resolver import match_countries
+from core.search import search_filter
 
 log = logging.getLogger("athletes")
 
-
-def _serialize_qs(qs):
-    props = {}  # serialize removes properties, so we need to add them again
-
-    for obj in qs:
-        props[obj.id] = {
-            "age": getattr(obj, "age", None),
-            "market_export": getattr(obj, "market_export", None),
-            "slug": getattr(obj, "slug", None),
-            "twitter": obj.twitter_info.get("followers_count"),
-            "_domestic_market": getattr(obj, "domestic_market", None),
-            "_location_market": getattr(obj, "location_market", None),
+COUNT_CACHE_TIMEOUT = 5 * 60  # cache total and filtered rows counts
+EXPORT_CHUNK_SIZE = 2000
+EXPORT_FIELDS = [
+    "name",
+    "domestic_market",
+    "age",
+    "gender",
+    "location_market",
+    "team",
+    "category",
+    "marketability",
+    "optimal_campaign",
+    "market_export",
+    "instagram",
+    "twitter",
+]
+
+
+@functools.lru_cache
+def _get_choices(model, language):
+    """{field name: {value: label}} of the model fields with choices."""
+    with translation.override(language):
+        return {
+            field.name: {value: str(label) for value, label in field.flatchoices}
+            for field in model._meta.concrete_fields
+            if field.choices
         }
-        if hasattr(obj, "league"):
-            props[obj.id]["league"] = {
-                "pk": getattr(obj.league, "pk", None),
-                "name": getattr(obj.league, "name", None),
-            }
 
-        for field in Athlete._meta.get_fields():
-            try:
-                setattr(obj, field.name, getattr(obj, f"get_{field.name}_display")())
-            except AttributeError:
-                pass
 
-    data = json.loads(serializers.serialize("json", qs))
-    data = [
-        {**obj["fields"], **props.get(obj["pk"], {}), "pk": obj["pk"]} for obj in data
+def _get_values(qs, *names):
+    """Values of the loaded fields and fields needed for properties."""
+    opts = qs.model._meta
+    deferred, defer = qs.query.deferred_loading
+    fields = {field.name for field in opts.concrete_fields}
+
+    names = [
+        field.name
+        for field in opts.concrete_fields
+        if field.primary_key
+        or (field.name in deferred) != defer
+        or field.name in names
+        or field.name in ("wiki", "birthday", "domestic_market", "location_market")
     ]
+    related = ["league__name"] if "league" in fields else []
+
+    return qs.values(
+        *names, *related, twitter_followers=F("twitter_info__followers_count")
+    )
+
+
+def _serialize_rows(model, rows):
+    """Datatables rows from _get_values rows, choice values are replaced by labels."""
+    opts = model._meta
+    choices = _get_choices(model, translation.get_language())
+    fields = {field.name for field in opts.concrete_fields}
+    today = datetime.date.today()
+
+    data = []
+    for row in rows:
+        row = dict(row)
+        pk = row.pop(opts.pk.name)
+        props = {
+            "age": None,
+            "market_export": None,
+            "slug": row["wiki"].split("/")[-1],
+            "twitter": row.pop("twitter_followers"),
+            "_domestic_market": row.get("domestic_market"),
+            "_location_market": row.get("location_market"),
+        }
+
+        if "birthday" in fields:
+            birthday = row["birthday"]
+            props["age"] = (
+                today.year
+                - birthday.year
+                - ((today.month, today.day) < (birthday.month, birthday.day))
+            )
+
+        if "domestic_market" in fields:
+            props["market_export"] = row["domestic_market"] != row["location_market"]
+
+        if "league" in fields:
+            props["league"] = {"pk": row["league"], "name": row.pop("league__name")}
+
+        for name, labels in choices.items():
+            if name in row:
+                row[name] = labels.get(row[name], row[name])
+
+        data.append({**row, **props, "pk": pk})
 
     return data
 
 
+def _serialize_qs(qs):
+    return _serialize_rows(qs.model, _get_values(qs))
+
+
 def _process_datatables_params(querydict: dict) -> tuple:
     """Process datatables params."""
     search = querydict.get("search[value]", "")
@@ -124,22 +195,116 @@ def _process_datatables_params(querydict: dict) -> tuple:
     return draw, start, length, order, search, filters
 
 
-def _athletes_api(request):
-    """Return filtered/sorted/paginated list of athletes for datatables."""
-    draw, start, length, order, search, filters = _process_datatables_params(
-        request.GET
+def _get_count(qs, key):
+    """Cached count of the queryset rows."""
+    return cache.get_or_set(f"count_{key}", qs.count, COUNT_CACHE_TIMEOUT)
+
+
+def _get_filters_key(*filters):
+    """Cache key part for the filters."""
+    return hashlib.md5(json.dumps(filters, sort_keys=True).encode()).hexdigest()
+
+
+def _encode_cursor(keys, values):
+    data = json.dumps([keys, values], cls=DjangoJSONEncoder)
+
+    return base64.urlsafe_b64encode(data.encode()).decode()
+
+
+def _decode_cursor(cursor, keys):
+    """Sort values of the last row of the previous page, None if not valid."""
+    try:
+        cursor_keys, values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        if not isinstance(cursor_keys, list) or not isinstance(values, list):
+            return None
+    except (TypeError, ValueError):
+        return None
+
+    if cursor_keys != keys or len(values) != len(keys):
+        return None  # the cursor is for another ordering
+
+    return values
+
+
+def _keyset_paginate(qs, order, cursor, length):
+    """
+    Return rows of the page after the cursor and the cursor of the next page.
+
+    Rows are sorted by order fields (nulls last) and pk, so the page is
+    a range scan instead of OFFSET.
+    """
+    opts = qs.model._meta
+    keys = []  # [[field name, descending]]
+    for key in order:
+        name = key.lstrip("-")
+        try:
+            field = opts.pk if name == "pk" else opts.get_field(name)
+        except FieldDoesNotExist as e:
+            raise FieldError(f"Cannot order by {name}") from e
+
+        keys.append([field.name, key.startswith("-")])
+
+    if opts.pk.name not in (name for name, _ in keys):
+        keys.append([opts.pk.name, False])  # make the sort key unique
+
+    values = _decode_cursor(cursor, keys) if cursor else None
+    if values is not None:
+        after = Q(pk__in=[])
+        equal = Q()
+        for (name, desc), value in zip(keys, values):
+            if value is None:
+                # Nulls are the last, only next fields can be after.
+                equal &= Q(**{f"{name}__isnull": True})
+                continue
+
+            lookup = "lt" if desc else "gt"
+            after |= equal & (
+                Q(**{f"{name}__{lookup}": value}) | Q(**{f"{name}__isnull": True})
+            )
+            equal &= Q(**{name: value})
+
+        qs = qs.filter(after)
+
+    qs = qs.order_by(
+        *[
+            F(name).desc(nulls_last=True) if desc else F(name).asc(nulls_last=True)
+            for name, desc in keys
+        ]
     )
 
-    # Count all rows.
-    total = Athlete.objects.count()
+    rows = list(_get_values(qs, *(name for name, _ in keys))[: length + 1])
+    if len(rows) <= length:
+        return rows, None
 
-    # Form queryset.
+    rows = rows[:length]
+    next_cursor = _encode_cursor(keys, [rows[-1][name] for name, _ in keys])
+
+    return rows, next_cursor
+
+
+def _paginate(querydict, qs, draw, start, length, order, total, filtered):
+    """Paginate with offset, or with keyset if `cursor` param is given."""
+    result = {"draw": draw, "recordsTotal": total, "recordsFiltered": filtered}
+
+    if "cursor" in querydict:
+        rows, result["next_cursor"] = _keyset_paginate(
+            qs, order, querydict["cursor"], length
+        )
+    else:
+        rows = _get_values(qs.order_by(*order))[start : start + length]
+
+    result["data"] = _serialize_rows(qs.model, rows)
+
+    return result
+
+
+def _filter_athletes(request, filters, search):
+    """Athletes filtered by datatables params, returns (qs, list_id)."""
     qs = Athlete.objects.defer(
         "additional_info",
         "twitter_info",
         "youtube_info",
-        "wiki_views_info",
-        "site_views_info",
+        "search_document",
     )
 
     list_id = None
@@ -182,12 +347,7 @@ def _athletes_api(request):
                 if len(val) == 2 and val[0].isdigit() and val[1].isdigit():
                     qs = qs.filter(**{f"{field}__gte": val[0], f"{field}__lte": val[1]})
             elif field in ("domestic_market", "location_market"):
-                country_val = [
-                    code
-                    for code, name in COUNTRIES.items()
-                    if val.lower() in name.lower()
-                ]
-                qs = qs.filter(**{f"{field}__in": country_val})
+                qs = qs.filter(**{f"{field}__in": match_countries(val)})
             elif model_field.choices:
                 qs = qs.filter(**{f"{field}__in": val.split(",")})
             elif model_field.get_internal_type() == "BooleanField":
@@ -198,36 +358,31 @@ def _athletes_api(request):
     if search:
         # Smart search by name, domestic_market, gender,
         # location_market, team, category fields.
-        country_val = [
-            code for code, name in COUNTRIES.items() if search.lower() in name.lower()
-        ]
+        qs = qs.filter(search_filter(search))
+
+    return qs, list_id
 
-        qs = qs.filter(
-            Q(name__unaccent__icontains=search)
-            | Q(domestic_market__in=country_val)
-            | Q(gender__icontains=search)
-            | Q(location_market__in=country_val)
-            | Q(team__unaccent__icontains=search)
-            | Q(category__icontains=search)
-        )
+
+def _athletes_api(request):
+    """Return filtered/sorted/paginated list of athletes for datatables."""
+    draw, start, length, order, search, filters = _process_datatables_params(
+        request.GET
+    )
+
+    # Count all rows.
+    total = _get_count(Athlete.objects.all(), "athletes")
+
+    qs, list_id = _filter_athletes(request, filters, search)
 
     # Count filtered rows.
-    if filters or search or list_id:
+    if list_id:
         filtered = qs.count()
+    elif filters or search:
+        filtered = _get_count(qs, f"athletes_{_get_filters_key(filters, search)}")
     else:
         filtered = total  # no need to count filtered rows
 
-    qs = qs.order_by(*order)
-
-    # Pagination.
-    qs = qs[start : start + length]
-
-    return {
-        "draw": draw,
-        "recordsTotal": total,
-        "recordsFiltered": filtered,
-        "data": _serialize_qs(qs),
-    }
+    return _paginate(request.GET, qs, draw, start, length, order, total, filtered)
 
 
 @login_required
@@ -242,12 +397,10 @@ def _teams_api(request):
     )
 
     # Count all rows.
-    total = Team.objects.count()
+    total = _get_count(Team.objects.all(), "teams")
 
     # Form queryset.
-    qs = Team.objects.defer(
-        "additional_info", "youtube_info", "wiki_views_info", "site_views_info"
-    )
+    qs = Team.objects.defer("additional_info", "youtube_info", "search_document")
 
     list_id = None
     try:
@@ -275,12 +428,7 @@ def _teams_api(request):
                         twitter_info__followers_count__lte=val[1],
                     )
             elif field == "location_market":
-                country_val = [
-                    code
-                    for code, name in COUNTRIES.items()
-                    if val.lower() in name.lower()
-                ]
-                qs = qs.filter(**{f"{field}__in": country_val})
+                qs = qs.filter(**{f"{field}__in": match_countries(val)})
             elif field == "league":
                 qs = qs.filter(**{f"{field}__name__unaccent__icontains": val})
             elif model_field.choices:
@@ -293,42 +441,24 @@ def _teams_api(request):
     if search:
         # Smart search by name, gender,
         # location_market, league, category fields.
-        country_val = [
-            code for code, name in COUNTRIES.items() if search.lower() in name.lower()
-        ]
-
-        qs = qs.filter(
-            Q(name__unaccent__icontains=search)
-            | Q(gender__icontains=search)
-            | Q(location_market__in=country_val)
-            | Q(league__name__unaccent__icontains=search)
-            | Q(category__icontains=search)
-        )
+        qs = qs.filter(search_filter(search))
 
     # Count filtered rows.
-    if filters or search or list_id:
+    if list_id:
         filtered = qs.count()
+    elif filters or search:
+        filtered = _get_count(qs, f"teams_{_get_filters_key(filters, search)}")
     else:
         filtered = total  # no need to count filtered rows
 
-    qs.select_related("league")
+    qs = qs.select_related("league")
 
-    qs = qs.order_by(*order)
-
-    # Pagination.
-    qs = qs[start : start + length]
-
-    return {
-        "draw": draw,
-        "recordsTotal": total,
-        "recordsFiltered": filtered,
-        "data": _serialize_qs(qs),
-    }
+    return _paginate(request.GET, qs, draw, start, length, order, total, filtered)
 
 
 @login_required
 def teams_api(request):
-    return JsonResponse(_teams_api(teams_api))
+    return JsonResponse(_teams_api(request))
 
 
 @login_required
@@ -387,45 +517,52 @@ def athletes_list_api(request):
     raise Http404
 
 
+class _Echo:
+    """File-like object which returns written value, for csv.writer."""
+
+    def write(self, value):
+        return value
+
+
+def _iter_csv(model, rows, fields):
+    """Yield csv lines of serialized rows, serializing them by chunks."""
+    writer = csv.writer(_Echo())
+    yield writer.writerow(fields)
+
+    rows = iter(rows)
+    while chunk := list(itertools.islice(rows, EXPORT_CHUNK_SIZE)):
+        for data in _serialize_rows(model, chunk):
+            yield writer.writerow([data[key] for key in fields])
+
+
 @login_required
 def athletes_export_api(request):
-    """Export athletes to csv file."""
-    ids = request.GET.get("ids", "").split(",")
-    ids = [pk for pk in ids if pk.isdigit()]
-    ids = ids or [-1]  # not existing id
+    """
+    Export athletes to csv file.
+
+    Exports athletes from `ids` param or, without it, all athletes
+    filtered and sorted by datatables params.
+    """
+    if "ids" in request.GET:
+        ids = request.GET["ids"].split(",")
+        ids = [pk for pk in ids if pk.isdigit()]
+        qs = Athlete.objects.filter(pk__in=ids).defer(
+            "additional_info",
+            "twitter_info",
+            "youtube_info",
+            "search_document",
+        )
+        order = ["pk"]
+    else:
+        _, _, _, order, search, filters = _process_datatables_params(request.GET)
+        qs, _ = _filter_athletes(request, filters, search)
 
-    response = HttpResponse(content_type="text/csv")
-    response["Content-Disposition"] = 'attachment; filename="athletes.csv"'
+    rows = _get_values(qs.order_by(*order, "pk")).iterator(chunk_size=EXPORT_CHUNK_SIZE)
 
-    qs = Athlete.objects.filter(pk__in=ids).defer(
-        "additional_info",
-        "twitter_info",
-        "youtube_info",
-        "wiki_views_info",
-        "site_views_info",
+    response = StreamingHttpResponse(
+        _iter_csv(Athlete, rows, EXPORT_FIELDS), content_type="text/csv"
     )
-    content = _serialize_qs(qs)
-
-    fields = [
-        "name",
-        "domestic_market",
-        "age",
-        "gender",
-        "location_market",
-        "team",
-        "category",
-        "marketability",
-        "optimal_campaign",
-        "market_export",
-        "instagram",
-        "twitter",
-    ]
-
-    writer = csv.writer(response)
-    writer.writerow(fields)
-    for athletes in content:
-        row = [athletes[key] for key in fields]
-        writer.writerow(row)
+    response["Content-Disposition"] = 'attachment; filename="athletes.csv"'
 
     return response
 
@@ -565,8 +702,7 @@ def follow_api(request, class_name, pk):
 @login_required
 def autocomplete_api(request, class_name):
     """Autocomplete for athlete, team, league."""
-    limit = 5
-    result = set([])
+    result = []
 
     cls = {"league": League, "team": Team, "athlete": Athlete}.get(class_name)
 
@@ -575,63 +711,6 @@ def autocomplete_api(request, class_name):
         fields = request.GET.get("fields", "").split(",")
         fields = [] if fields == [""] else fields
 
-        # Search for similar name in database.
-        if (not fields and class_name == "athlete") or (
-            "name" in fields and "team" in fields
-        ):
-            # Search in name and team fields (2 fields).
-            result.update(
-                cls.objects.annotate(
-                    similarity_name=TrigramSimilarity("name", search),
-                    similarity_team=TrigramSimilarity("team", search),
-                    similarity=Greatest(F("similarity_name"), F("similarity_team")),
-                    value=Case(
-                        When(
-                            Q(similarity_team__gt=F("similarity_name")), then=F("team")
-                        ),
-                        default=F("name"),
-                        output_field=CharField(),
-                    ),
-                )
-                .filter(similarity__gt=0.1)
-                .order_by("-similarity")
-                .values_list("value", flat=True)[:limit]
-            )
-        elif "name" in fields or "team" in fields:
-            # Search in name or team fields (1 field).
-            field = "name" if "name" in fields else "team"
-
-            result.update(
-                cls.objects.annotate(similarity=TrigramSimilarity(field, search))
-                .filter(similarity__gt=0.1)
-                .order_by("-similarity")
-                .values_list(field, flat=True)[:limit]
-            )
+        result = autocomplete(cls, search, fields)
 
-        # Check categories.
-        if not fields or "category" in fields:
-            i = 0
-            for val in CATEGORIES.values():
-                if search.lower() in val.lower():
-                    result.add(val)
-                    i += 1
-                    if i >= limit:
-                        break
-
-        # Check countries.
-        if not fields or "country" in fields:
-            i = 0
-            for val in COUNTRIES.values():
-                if search.lower() in val.lower():
-                    result.add(val)
-                    i += 1
-                    if i >= limit:
-                        break
-
-        # Check genders.
-        if not fields or "gender" in fields:
-            for val in ("male", "female"):
-                if search.lower() in val:
-                    result.add(val)
-
-    return JsonResponse(list(result), safe=False)
+    return JsonResponse(result, safe=False)
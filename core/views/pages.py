@@ -4,16 +4,13 @@ import random
 from collections import Counter
 from urllib.parse import quote_plus, urlparse
 
-import requests
-from bs4 import BeautifulSoup
 from django.conf import settings
 from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth import get_user_model, login, logout
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.forms import AuthenticationForm
 from django.core.exceptions import PermissionDenied
-from django.db.models import Count, Prefetch, Sum
-from django.db.models.expressions import RawSQL
+from django.db.models import FilteredRelation, Prefetch, Q, Sum
 from django.http import (
     Http404,
     HttpResponseBadRequest,
@@ -25,23 +22,30 @@ from django.utils.decorators import method_decorator
 from django.utils.translation import gettext as _
 from django.views import View
 
+from core import http_client
 from core.constans import CATEGORIES, COUNTRIES, MAP_COUNTRIES, TIMEZONES
 from core.forms import AthletesListForm, AvatarForm, LeagueForm, TeamForm
 from core.models import (
     Athlete,
     AthletesList,
+    CountryStats,
     League,
     LeaguesList,
+    Metric,
     Profile,
     Team,
     TeamArticle,
     TeamsList,
 )
+from core.page_cache import get_pages_data
+from core.parsers import get_soup
 from core.tasks import parse_team
 
 User = get_user_model()
 log = logging.getLogger("athletes")
 
+COMPARE_LIMIT = 10
+
 
 class GetUserMixin:
     @staticmethod
@@ -79,7 +83,7 @@ class ParseTeamView(View):
         """Form submit."""
         form = TeamForm(data=request.POST)
         if form.is_valid():
-            result = parse_team(form.cleaned_data)
+            result = parse_team(form.cleaned_data, concurrent=True)
 
             form = TeamForm(initial=form.cleaned_data)
 
@@ -129,8 +133,8 @@ class ParseLeagueView(View):
             site = urlparse(wiki_url)
             site = f"{site.scheme}://{site.hostname}"
             log.info("parsing teams %s", wiki_url)
-            html = requests.get(wiki_url)
-            soup = BeautifulSoup(html.content, "html.parser")
+            html = http_client.get(wiki_url)
+            soup = get_soup(html.content)
             links = soup.select(selector)
 
             for link in links:
@@ -144,7 +148,7 @@ class ParseLeagueView(View):
                 cleaned_data["wiki"] = link["href"]
                 cleaned_data["league__pk"] = league.pk
                 cleaned_data.pop("selector", "")
-                parse_team.delay(cleaned_data, True)
+                parse_team.delay(cleaned_data, True, True)
 
             # Clean fields and add selector.
             form.cleaned_data["selector"] = selector
@@ -278,7 +282,7 @@ def map_page(request):
     category = request.GET.get("category", "").title()
     gender = request.GET.get("gender")
 
-    qs = Athlete.objects
+    qs = CountryStats.objects
     if category in CATEGORIES:
         # Filter by category.
         qs = qs.filter(category=category)
@@ -286,9 +290,9 @@ def map_page(request):
         # Filter by category.
         qs = qs.filter(gender=gender)
 
-    # Count how many athletes we have for each country.
-    cont = qs.values("location_market").annotate(total=Count("location_market"))
-    cont = {c["location_market"]: c["total"] for c in cont}
+    # How many athletes we have for each country.
+    cont = qs.values("country").annotate(total=Sum("athletes"))
+    cont = {c["country"]: c["total"] for c in cont}
 
     max_total = max(cont.values(), default=1)
     countries = MAP_COUNTRIES.copy()
@@ -307,27 +311,85 @@ def terms_page(request):
     return render(request, "terms.html")
 
 
-@login_required
-def athlete_page(request, slug):
-    """Athlete page."""
-    slug = "/" + quote_plus(slug, safe="(,)")
-    athlete = get_object_or_404(
-        Athlete.objects.prefetch_related("athletes_lists"), wiki__endswith=slug
+def _set_membership(user, objs):
+    """
+    Set follow state (subscribed) and the user lists (with selected flag if
+    the object is in the list) of the objects, one query each.
+    """
+    model_name = objs[0]._meta.model_name
+    lists_model, lists_attr = {
+        "athlete": (AthletesList, "user_athletes_lists"),
+        "team": (TeamsList, "user_teams_lists"),
+        "league": (LeaguesList, "user_league_lists"),
+    }[model_name]
+
+    followed = set(
+        Profile.objects.filter(
+            user=user, **{f"followed_{model_name}s__in": objs}
+        ).values_list(f"followed_{model_name}s", flat=True)
     )
-    for k, v in athlete.get_trend_info.items():
-        setattr(athlete, k, v)
 
-    athlete.subscribed = Profile.objects.filter(
-        user=request.user, followed_athletes=athlete
-    ).exists()
+    # One row for every list and the object in it (or None).
+    names = {}
+    members = set()
+    for pk, name, member in (
+        lists_model.objects.filter(user=user)
+        .annotate(
+            member=FilteredRelation(
+                f"{model_name}s", condition=Q(**{f"{model_name}s__in": objs})
+            )
+        )
+        .order_by("pk")
+        .values_list("pk", "name", "member")
+    ):
+        names[pk] = name
+        members.add((pk, member))
+
+    for obj in objs:
+        obj.subscribed = obj.pk in followed
+
+        user_lists = []
+        for pk, name in names.items():
+            user_list = lists_model(pk=pk, name=name)
+            user_list.selected = (pk, obj.pk) in members
+            user_lists.append(user_list)
+
+        setattr(obj, lists_attr, user_lists)
+
+
+def _get_pages_info(objs):
+    """Page info of the objects (of one model), metrics are loaded at once."""
+    return [obj.get_page_info() for obj in Metric.prefetch(objs)]
 
-    athlete.user_athletes_lists = AthletesList.objects.filter(user=request.user).only(
-        "pk", "name"
-    )
 
-    # Check if the athlete is in any list.
-    for athletes_list in athlete.user_athletes_lists:
-        athletes_list.selected = athletes_list in athlete.athletes_lists.all()
+def _set_pages_info(objs, build=_get_pages_info):
+    """Set cached page info attributes of the objects."""
+    for obj, info in zip(objs, get_pages_data(objs, build)):
+        for k, v in info.items():
+            setattr(obj, k, v)
+
+
+def _get_compared(request, qs):
+    """Objects to compare (from ids param) in the requested order."""
+    ids = request.GET.get("ids", "").split(",")
+    ids = list(dict.fromkeys(int(pk) for pk in ids if pk.isdigit()))
+    if not 2 <= len(ids) <= COMPARE_LIMIT:
+        return None
+
+    objs = qs.in_bulk(ids)
+    if len(objs) != len(ids):
+        raise Http404
+
+    return [objs[pk] for pk in ids]
+
+
+@login_required
+def athlete_page(request, slug):
+    """Athlete page."""
+    slug = "/" + quote_plus(slug, safe="(,)")
+    athlete = get_object_or_404(Athlete, wiki__endswith=slug)
+    _set_pages_info([athlete])
+    _set_membership(request.user, [athlete])
 
     return render(
         request,
@@ -340,59 +402,48 @@ def athlete_page(request, slug):
 
 @login_required
 def compare_athletes_page(request):
-    """Compare 2 athletes page."""
-    args = {}
+    """Compare athletes page."""
+    athletes = _get_compared(request, Athlete.objects.all())
+    if athletes is None:
+        return HttpResponseBadRequest(f"Need 2-{COMPARE_LIMIT} athletes to compare")
 
-    ids = request.GET.get("ids", "").split(",")
-    ids = [pk for pk in ids if pk.isdigit()]
-    if len(ids) != 2:
-        return HttpResponseBadRequest("Need 2 athletes to compare")
+    _set_pages_info(athletes)
+    _set_membership(request.user, athletes)
 
-    for i, _id in enumerate(ids):
-        athlete = get_object_or_404(
-            Athlete.objects.prefetch_related("athletes_lists"), pk=_id
-        )
+    return render(request, "compare_athletes.html", {"athletes": athletes})
 
-        for k, v in athlete.get_trend_info.items():
-            setattr(athlete, k, v)
 
-        athlete.subscribed = Profile.objects.filter(
-            user=request.user, followed_athletes=athlete
-        ).exists()
-
-        athlete.user_athletes_lists = AthletesList.objects.filter(
-            user=request.user
-        ).only("pk", "name")
-
-        # Check if the athlete is in any list.
-        for athl_list in athlete.user_athletes_lists:
-            athl_list.selected = athl_list in athlete.athletes_lists.all()
+@login_required
+def compare_teams_page(request):
+    """Compare teams page."""
+    teams = _get_compared(request, Team.objects.select_related("league"))
+    if teams is None:
+        return HttpResponseBadRequest(f"Need 2-{COMPARE_LIMIT} teams to compare")
 
-        args[f"athlete{i + 1}"] = athlete
+    _set_pages_info(teams, _get_teams_info)
+    _set_membership(request.user, teams)
 
-    return render(request, "compare_athletes.html", args)
+    return render(request, "compare_teams.html", {"teams": teams})
 
 
-@login_required
-def team_page(request, pk):
-    """Team page."""
-    team = get_object_or_404(Team, pk=pk)
-    for k, v in team.get_trend_info.items():
-        setattr(team, k, v)
+def _get_teams_info(teams):
+    """Teams page info with the squad statistic."""
+    squads = {team.pk: [] for team in teams}
+    for athlete in Athlete.objects.filter(team_model__in=teams).only(
+        "team_model", "birthday", "domestic_market"
+    ):
+        squads[athlete.team_model_id].append(athlete)
 
-    team.subscribed = Profile.objects.filter(
-        user=request.user, followed_teams=team
-    ).exists()
+    infos = _get_pages_info(teams)
+    for team, info in zip(teams, infos):
+        info.update(_get_squad_info(squads[team.pk]))
 
-    team.user_teams_lists = TeamsList.objects.filter(user=request.user).only(
-        "pk", "name"
-    )
+    return infos
 
-    # Check if the athlete is in any list.
-    for teams_list in team.user_teams_lists:
-        teams_list.selected = teams_list in team.teams_lists.all()
 
-    athletes = Athlete.objects.filter(team_model=team).only("name", "wiki")
+def _get_squad_info(athletes):
+    """Squad age and domestic_market statistic."""
+    info = {}
 
     # Collect squad age statistic.
     counter = Counter()
@@ -403,7 +454,7 @@ def team_page(request, pk):
     total = sum(counter.values())
     counter = sorted(counter.items())
 
-    age_dataset = {
+    info["age_dataset"] = {
         "datasets": [
             {
                 "data": [c[1] for c in counter],
@@ -424,7 +475,7 @@ def team_page(request, pk):
     total = sum(counter.values())
     counter = sorted(counter.items())
 
-    domestic_market_dataset = {
+    info["domestic_market_dataset"] = {
         "datasets": [
             {
                 "data": [c[1] for c in counter],
@@ -438,6 +489,18 @@ def team_page(request, pk):
         "labels": [f"{c[0]} ({round(c[1] * 100 / total, 1)}%)" for c in counter],
     }
 
+    return info
+
+
+@login_required
+def team_page(request, pk):
+    """Team page."""
+    team = get_object_or_404(Team, pk=pk)
+    _set_pages_info([team], _get_teams_info)
+    _set_membership(request.user, [team])
+
+    athletes = Athlete.objects.filter(team_model=team).only("name", "wiki")
+
     news = TeamArticle.objects.filter(team=team).order_by("-publishedAt")[:10]
 
     return render(
@@ -446,8 +509,8 @@ def team_page(request, pk):
         {
             "team": team,
             "athletes": athletes,
-            "age_dataset": age_dataset,
-            "domestic_market_dataset": domestic_market_dataset,
+            "age_dataset": team.age_dataset,
+            "domestic_market_dataset": team.domestic_market_dataset,
             "news": news,
         },
     )
@@ -457,20 +520,8 @@ def team_page(request, pk):
 def league_page(request, pk):
     """League page."""
     league = get_object_or_404(League, pk=pk)
-    for k, v in league.get_trend_info.items():
-        setattr(league, k, v)
-
-    league.subscribed = Profile.objects.filter(
-        user=request.user, followed_leagues=league
-    ).exists()
-
-    league.user_league_lists = LeaguesList.objects.filter(user=request.user).only(
-        "pk", "name"
-    )
-
-    # Check if the athlete is in any list.
-    for league_list in league.user_league_lists:
-        league_list.selected = league_list in league.leagues_lists.all()
+    _set_pages_info([league])
+    _set_membership(request.user, [league])
 
     teams = Team.objects.filter(league=league).only("name", "wiki")
 
@@ -494,20 +545,7 @@ def country_page(request, code):
 
     name = COUNTRIES[code]
 
-    window = RawSQL("to_timestamp(avg(extract(epoch from birthday)))", [])
-    window.get_group_by_cols = lambda: []
-
-    stats = (
-        Athlete.objects.filter(location_market=code)
-        .values(
-            "category",
-        )
-        .annotate(
-            twitter=Sum("twitter"),
-            athletes=Count("location_market"),
-            birthday=window,
-        )
-    )
+    stats = CountryStats.get_stats(country=code)
     today = datetime.date.today()
     for row in stats:
         row["age"] = (
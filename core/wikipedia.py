@@ -0,0 +1,110 @@
+"""MediaWiki Action API client, pages are queried in batches of titles."""
+
+import logging
+import urllib.parse
+from collections import defaultdict
+
+from core import http_client
+
+log = logging.getLogger("athletes")
+
+BATCH_SIZE = 50  # max titles per query request
+PAGEVIEWS_DAYS = 7
+
+
+def get_title(url):
+    """Page title of the wiki url."""
+    path = urllib.parse.urlparse(url).path
+    return urllib.parse.unquote(path.split("/wiki/", 1)[-1]).replace("_", " ")
+
+
+def _merge(page, data):
+    """Merge page data of a continued request."""
+    for key, val in data.items():
+        if isinstance(val, dict) and isinstance(page.get(key), dict):
+            page[key].update(val)
+        else:
+            page[key] = val
+
+
+def _query_batch(api_url, titles, params):
+    """{title: page} of up to BATCH_SIZE titles (redirects are followed)."""
+    params = {
+        "action": "query",
+        "format": "json",
+        "formatversion": 2,
+        "redirects": 1,
+        "titles": "|".join(titles),
+        **params,
+    }
+    pages, renamed = {}, {}
+
+    while True:
+        res = http_client.get(api_url, params=params)
+        if res.status_code != 200:
+            log.warning("Failed wiki query %s (%s)", api_url, res.status_code)
+            break
+
+        data = res.json()
+        query = data.get("query", {})
+        for item in query.get("normalized", []) + query.get("redirects", []):
+            renamed[item["from"]] = item["to"]
+
+        for page in query.get("pages", []):
+            _merge(pages.setdefault(page["title"], {}), page)
+
+        if "continue" not in data:
+            break
+
+        params.update(data["continue"])
+
+    result = {}
+    for title in titles:
+        resolved = title
+        while resolved in renamed and renamed[resolved] != resolved:
+            resolved = renamed[resolved]
+
+        page = pages.get(resolved)
+        if page and not page.get("missing"):
+            result[title] = page
+
+    return result
+
+
+def query(urls, **params):
+    """{url: page} of the query API, BATCH_SIZE titles per request."""
+    sites = defaultdict(dict)
+    for url in dict.fromkeys(urls):
+        site = urllib.parse.urlparse(url)
+        sites[f"{site.scheme}://{site.hostname}/w/api.php"][get_title(url)] = url
+
+    result = {}
+    for api_url, titles in sites.items():
+        titles = list(titles.items())
+        for i in range(0, len(titles), BATCH_SIZE):
+            batch = dict(titles[i : i + BATCH_SIZE])
+            pages = _query_batch(api_url, list(batch), params)
+            result.update((batch[title], page) for title, page in pages.items())
+
+    return result
+
+
+def get_revisions(urls):
+    """{url: id of the latest revision} of existing pages."""
+    return {
+        url: page["revisions"][0]["revid"]
+        for url, page in query(urls, prop="revisions", rvprop="ids").items()
+        if page.get("revisions")
+    }
+
+
+def get_pageviews(urls, days=PAGEVIEWS_DAYS):
+    """{url: {date: views}} of the last days, not counted days are skipped."""
+    return {
+        url: {
+            date: views
+            for date, views in page.get("pageviews", {}).items()
+            if views is not None
+        }
+        for url, page in query(urls, prop="pageviews", pvipdays=days).items()
+    }
@@ -6,7 +6,7 @@ $(document).ready( function () {
     let $athletes_compare_link = $('a#athletes-compare-link');
     let $athletes_list_form = $('#add-athletes-list form');
     let $athletes_lists_form = $('.athlete-page .athletes_lists_form');
-    let $teams_lists_form = $('.team-page #teams_lists_form');
+    let $teams_lists_form = $('.team-page .teams_lists_form');
     let ids;
     let e;
 
@@ -282,9 +282,9 @@ $(document).ready( function () {
         event.preventDefault();
 
         $.ajax({
-            url: $teams_lists_form.attr('action'),
+            url: $(this).attr('action'),
             type: 'POST',
-            data: $teams_lists_form.serialize(),
+            data: $(this).serialize(),
             dataType: 'json'
         });
     });